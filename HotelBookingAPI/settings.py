@@ -112,6 +112,53 @@ DATABASES = {
 }
 
 
+# Cache
+# The default cache holds throttle counters, change counters and cached
+# responses, so every worker must share it: set CACHE_URL to redis://host:6379/0
+# in production. file:///some/dir, or db://table_name after `manage.py
+# createcachetable`, share it between local processes without Redis.
+# locmem:// keeps a cache per process, which is only right for a single
+# worker; it is what an unset CACHE_URL means with DEBUG on, and with DEBUG
+# off it has to be asked for by name.
+
+
+def cache_from_url(url: str, *, debug: bool) -> dict:
+    """Translate a CACHE_URL into a CACHES entry."""
+    if not url and not debug:
+        raise RuntimeError(
+            "CACHE_URL must be set when DEBUG is off: ETags, throttles and cached responses "
+            "go stale between workers that each keep their own cache. Use redis://host:6379/0, "
+            "or locmem:// for a deployment with a single worker."
+        )
+    scheme, _, rest = url.partition("://")
+    if not url or scheme == "locmem":
+        return {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": rest}
+    if scheme in {"redis", "rediss"}:
+        return {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": url}
+    if scheme == "file":
+        return {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": rest}
+    if scheme == "db":
+        return {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": rest}
+    raise RuntimeError(f"Unsupported CACHE_URL scheme {scheme!r}.")
+
+
+CACHES = {
+    "default": cache_from_url(os.getenv("CACHE_URL", ""), debug=DEBUG),
+    # A small per-process level in front of the shared cache, for rendered
+    # catalogue responses (see hotel.response_cache). Nothing that must be
+    # shared between workers goes here.
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "local",
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "500"))},
+    },
+}
+# Seconds a rendered catalogue response for anonymous clients is kept. Keys
+# embed the tables' change counters, so a write replaces them at once; 0
+# disables the response cache.
+CATALOGUE_CACHE_TTL = int(os.getenv("CATALOGUE_CACHE_TTL", "300"))
+
+
 # REST framework
 
 REST_FRAMEWORK = {
@@ -207,6 +254,41 @@ STORAGES = {
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# Bookings
+# How concurrent requests for the same room type are kept apart. "locking"
+# locks every candidate room before reading occupancy, which is correct on any
+# backend but serialises all bookings of a type. "optimistic" takes no locks
+# and lets the unique (room, night) constraint reject the loser, who moves on
+# to the next room; it is meant for PostgreSQL, where independent rooms then
+# never wait on each other. "skip_locked" sits in between: it locks only the
+# room it takes and passes over rooms other bookings have locked.
+RESERVATION_ENGINE = os.getenv("RESERVATION_ENGINE", "locking")
+if RESERVATION_ENGINE not in {"locking", "optimistic", "skip_locked"}:
+    raise RuntimeError(f"Unknown RESERVATION_ENGINE {RESERVATION_ENGINE!r}.")
+# Minutes an unpaid booking holds its rooms. The invoice is made payable for as
+# long, and `manage.py expire_pending_bookings` cancels what is still unpaid.
+BOOKING_HOLD_MINUTES = int(os.getenv("BOOKING_HOLD_MINUTES", "30"))
+# Which free room a booking gets. "first_free" takes the lowest room number;
+# "best_fit" takes the room whose neighbouring stays the new one fits between
+# most snugly, so the calendar is left with fewer short gaps nobody can book.
+ROOM_ASSIGNMENT_STRATEGY = os.getenv("ROOM_ASSIGNMENT_STRATEGY", "first_free")
+if ROOM_ASSIGNMENT_STRATEGY not in {"first_free", "best_fit"}:
+    raise RuntimeError(f"Unknown ROOM_ASSIGNMENT_STRATEGY {ROOM_ASSIGNMENT_STRATEGY!r}.")
+
+
+# Availability reads can be answered from an index each worker keeps in
+# memory, rebuilt whenever a booking changes a hotel's occupancy. The change
+# counters live in the default cache, so with several workers that cache must
+# be shared, or a worker would not notice bookings made by the others.
+AVAILABILITY_INDEX = env_bool("AVAILABILITY_INDEX", False)
+# Upper bound on the life of an index, in case a change slipped past the
+# counters (a bulk UPDATE, say).
+AVAILABILITY_INDEX_MAX_AGE = int(os.getenv("AVAILABILITY_INDEX_MAX_AGE", "300"))
+# Seconds an availability answer is served from the cache. Entries are keyed by
+# the same counters, so a booking invalidates them at once; 0 disables caching.
+AVAILABILITY_CACHE_TTL = int(os.getenv("AVAILABILITY_CACHE_TTL", "60"))
+
+
 # Payments
 # PAYMENT_PROVIDER selects the implementation in hotel/payments/. "fake" keeps
 # the whole booking flow working locally and in tests without network access.
@@ -216,8 +298,35 @@ PAYMENT_CURRENCY_CODE = int(os.getenv("PAYMENT_CURRENCY_CODE", "980"))  # ISO 42
 _default_base_url = f"https://{RENDER_HOSTNAME}" if RENDER_HOSTNAME else "http://localhost:8000"
 PUBLIC_BASE_URL = (os.getenv("PUBLIC_BASE_URL") or _default_base_url).rstrip("/")
 
+# "sync" requests the invoice while the guest waits for POST /bookings/ to
+# return. "outbox" only records that an invoice is due, in the booking's own
+# transaction, and `manage.py run_payment_outbox` requests it; the guest polls
+# the booking until its payment link appears.
+PAYMENT_INVOICE_MODE = os.getenv("PAYMENT_INVOICE_MODE", "sync")
+if PAYMENT_INVOICE_MODE not in {"sync", "outbox"}:
+    raise RuntimeError(f"Unknown PAYMENT_INVOICE_MODE {PAYMENT_INVOICE_MODE!r}.")
+# Attempts the outbox worker makes before the booking is cancelled.
+PAYMENT_OUTBOX_MAX_ATTEMPTS = int(os.getenv("PAYMENT_OUTBOX_MAX_ATTEMPTS", "5"))
+# `manage.py reconcile_payments` asks the provider about payments pending for
+# longer than this, in case their webhook was lost, making at most
+# PAYMENT_RECONCILE_RATE status requests per second.
+PAYMENT_RECONCILE_AFTER_MINUTES = int(os.getenv("PAYMENT_RECONCILE_AFTER_MINUTES", "10"))
+PAYMENT_RECONCILE_RATE = float(os.getenv("PAYMENT_RECONCILE_RATE", "10"))
+
 MONOBANK_TOKEN = os.getenv("MONOBANK_TOKEN", "")
 MONOBANK_API_URL = os.getenv("MONOBANK_API_URL", "https://api.monobank.ua")
+# "sync" applies each payment webhook while the provider waits for the answer.
+# "inbox" stores the verified event and answers at once; `manage.py
+# process_webhook_inbox` applies the stored events in batches.
+PAYMENT_WEBHOOK_MODE = os.getenv("PAYMENT_WEBHOOK_MODE", "sync")
+if PAYMENT_WEBHOOK_MODE not in {"sync", "inbox"}:
+    raise RuntimeError(f"Unknown PAYMENT_WEBHOOK_MODE {PAYMENT_WEBHOOK_MODE!r}.")
+
+# After this many consecutive failed calls Monobank is not called at all for
+# MONOBANK_CIRCUIT_RESET_SECONDS: bookings fail fast instead of each waiting
+# out a timeout while the acquirer is down.
+MONOBANK_CIRCUIT_FAILURES = int(os.getenv("MONOBANK_CIRCUIT_FAILURES", "5"))
+MONOBANK_CIRCUIT_RESET_SECONDS = float(os.getenv("MONOBANK_CIRCUIT_RESET_SECONDS", "30"))
 # Signature checking can only be disabled explicitly, and never outside DEBUG.
 MONOBANK_VERIFY_WEBHOOK = env_bool("MONOBANK_VERIFY_WEBHOOK", True)
 
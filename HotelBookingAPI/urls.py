@@ -8,6 +8,7 @@ from drf_spectacular.views import (
 )
 from rest_framework.routers import DefaultRouter
 
+from hotel import async_views
 from hotel.views import (
     AmenityViewSet,
     BookingViewSet,
@@ -16,10 +17,14 @@ from hotel.views import (
     ReviewViewSet,
     RoomTypeViewSet,
     RoomViewSet,
+    availability_calendar,
     available_room_types,
+    batch_availability,
+    flexible_availability,
     health,
     payment_success,
     payment_webhook,
+    search_availability,
 )
 
 router = DefaultRouter()
@@ -38,10 +43,38 @@ payment_urls = [
     path("payments/success/", payment_success, name="payment-success"),
 ]
 
+# Async twins of the public read endpoints, for ASGI workers (see hotel.async_views).
+async_urls = [
+    path("health/", async_views.health, name="async-health"),
+    path("hotels/", async_views.hotel_list, name="async-hotel-list"),
+    path("rooms/", async_views.room_list, name="async-room-list"),
+    path(
+        "availability/room-types/",
+        async_views.available_room_types,
+        name="async-available-room-types",
+    ),
+    path("availability/search/", async_views.search_availability, name="async-availability-search"),
+    path(
+        "availability/calendar/",
+        async_views.availability_calendar,
+        name="async-availability-calendar",
+    ),
+    path(
+        "availability/flexible/",
+        async_views.flexible_availability,
+        name="async-availability-flexible",
+    ),
+]
+
 api_v1 = [
     path("health/", health, name="health"),
     *payment_urls,
     path("availability/room-types/", available_room_types, name="available-room-types"),
+    path("availability/search/", search_availability, name="availability-search"),
+    path("availability/calendar/", availability_calendar, name="availability-calendar"),
+    path("availability/flexible/", flexible_availability, name="availability-flexible"),
+    path("availability/batch/", batch_availability, name="availability-batch"),
+    path("async/", include(async_urls)),
     path("user/", include("user.urls")),
     path("", include(router.urls)),
     # OpenAPI schema and the two documentation UIs rendered from it.
@@ -0,0 +1,104 @@
+"""Replay a seeded stream of booking requests against each room-assignment strategy.
+
+Reports, per strategy, the share of requests turned away although the hotel
+had enough free nights overall, and the time spent choosing a room. The
+simulation runs in memory on the same ordering functions the booking service
+uses, so no database is needed:
+
+    python benchmarks/assignment.py --rooms 40 --days 120 --requests 1600 --seed 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from hotel.occupancy import BEST_FIT_REACH, best_fit_order  # noqa: E402
+
+SEASON_START = date(2026, 6, 1)
+
+
+def _stream(seed: int, requests: int, days: int) -> list[tuple[date, date]]:
+    """Stays that arrive in random order, mostly short, spread over the season."""
+    rng = random.Random(seed)
+    stays = []
+    for _ in range(requests):
+        nights = min(1 + int(rng.expovariate(1 / 2.5)), 14)
+        first = rng.randrange(0, days - nights)
+        check_in = SEASON_START + timedelta(days=first)
+        stays.append((check_in, check_in + timedelta(days=nights)))
+    return stays
+
+
+def _first_free(free, check_in, check_out, held):
+    return free
+
+
+def _best_fit(free, check_in, check_out, held):
+    reach = timedelta(days=BEST_FIT_REACH)
+    nearby = [
+        (room, night)
+        for room in free
+        for night in held[room]
+        if check_in - reach <= night < check_out + reach
+    ]
+    return best_fit_order(
+        free, check_in=check_in, check_out=check_out, held=nearby, reach=BEST_FIT_REACH
+    )
+
+
+STRATEGIES = {"first_free": _first_free, "best_fit": _best_fit}
+
+
+def simulate(strategy, rooms: int, stays: list[tuple[date, date]]) -> tuple[int, int, float]:
+    """Returns (rejected, rejected with capacity to spare, seconds spent choosing)."""
+    held: dict[int, set[date]] = {room: set() for room in range(rooms)}
+    taken_per_night: dict[date, int] = {}
+    rejected = fragmented = 0
+    choosing = 0.0
+    for check_in, check_out in stays:
+        nights = [check_in + timedelta(days=n) for n in range((check_out - check_in).days)]
+        started = time.perf_counter()
+        free = [room for room in range(rooms) if held[room].isdisjoint(nights)]
+        ordered = strategy(free, check_in, check_out, held) if free else []
+        choosing += time.perf_counter() - started
+
+        if not ordered:
+            rejected += 1
+            # Every night had a room free, just never the same room throughout.
+            if all(taken_per_night.get(night, 0) < rooms for night in nights):
+                fragmented += 1
+            continue
+        held[ordered[0]].update(nights)
+        for night in nights:
+            taken_per_night[night] = taken_per_night.get(night, 0) + 1
+    return rejected, fragmented, choosing
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=40)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--requests", type=int, default=1600)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    stays = _stream(args.seed, args.requests, args.days)
+    print(f"{args.requests} requests, {args.rooms} rooms, {args.days} days, seed {args.seed}")
+    print(f"{'strategy':<12}{'rejected':>10}{'with room':>11}{'µs/request':>12}")
+    for name, strategy in STRATEGIES.items():
+        rejected, fragmented, choosing = simulate(strategy, args.rooms, stays)
+        print(
+            f"{name:<12}{rejected / len(stays):>10.1%}{fragmented / len(stays):>11.1%}"
+            f"{choosing / len(stays) * 1e6:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
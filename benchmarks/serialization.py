@@ -0,0 +1,100 @@
+"""Time a page of rooms through RoomSerializer and through RoomProjection.
+
+Both paths read the same rows, queries included, so the difference is what a
+list request saves per row. The catalogue is seeded into an in-memory SQLite
+database, so nothing needs to be running:
+
+    python benchmarks/serialization.py --rows 100 --amenities 4 --repeat 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DEBUG", "True")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "HotelBookingAPI.settings_test")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+
+from hotel.models import Amenity, Hotel, Room, RoomType  # noqa: E402
+from hotel.projections import RoomProjection  # noqa: E402
+from hotel.serializers import RoomSerializer  # noqa: E402
+
+
+def _seed(rows: int, amenities: int) -> None:
+    call_command("migrate", verbosity=0)
+    features = Amenity.objects.bulk_create(
+        Amenity(name=f"Amenity {number}", description="Included.") for number in range(amenities)
+    )
+    room_type = RoomType.objects.create(name="Double")
+    hotels = Hotel.objects.bulk_create(
+        Hotel(name=f"Hotel {number}", location="Odesa") for number in range(max(rows // 20, 1))
+    )
+    rooms = Room.objects.bulk_create(
+        Room(
+            hotel=hotels[number % len(hotels)],
+            room_number=number,
+            room_type=room_type,
+            price_per_night=Decimal("80.00") + number,
+            max_guests=2,
+        )
+        for number in range(rows)
+    )
+    Room.amenities.through.objects.bulk_create(
+        Room.amenities.through(room_id=room.pk, amenity_id=feature.pk)
+        for room in rooms
+        for feature in features
+    )
+
+
+def _serialized(rows: int) -> list:
+    queryset = Room.objects.select_related("hotel", "room_type").prefetch_related("amenities")
+    return RoomSerializer(queryset[:rows], many=True).data
+
+
+def _projected(rows: int) -> list:
+    projection = RoomProjection()
+    return projection.represent(projection.rows(Room.objects.all()[:rows]))
+
+
+def _time(render, rows: int, repeat: int) -> float:
+    """Median seconds for one page."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render(rows)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100, help="Rooms on the page.")
+    parser.add_argument("--amenities", type=int, default=4, help="Amenities per room.")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    _seed(args.rows, args.amenities)
+    assert _projected(args.rows) == list(_serialized(args.rows))
+
+    print(f"{args.rows} rooms, {args.amenities} amenities each, median of {args.repeat}")
+    for label, render in (("RoomSerializer", _serialized), ("RoomProjection", _projected)):
+        seconds = _time(render, args.rows, args.repeat)
+        print(
+            f"  {label:<15} {seconds * 1000:8.2f} ms/page {seconds / args.rows * 1e6:8.1f} µs/row"
+        )
+
+
+if __name__ == "__main__":
+    main()
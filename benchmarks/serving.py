@@ -0,0 +1,125 @@
+"""Load a running server with concurrent keep-alive clients and report throughput and latency.
+
+Compares the sync worker profile with the ASGI one. Start the server with each
+profile in turn, throttling lifted, and point the same load at it:
+
+    THROTTLE_ANON=1000000/min WEB_WORKER_CLASS=sync gunicorn -c gunicorn.conf.py
+    python benchmarks/serving.py --path /api/v1/hotels/ --clients 200
+
+    THROTTLE_ANON=1000000/min WEB_WORKER_CLASS=uvicorn gunicorn -c gunicorn.conf.py
+    python benchmarks/serving.py --path /api/v1/async/hotels/ --clients 200
+
+Every client is one connection on one event loop, so thousands of them cost
+this process nothing but sockets. ``--slow`` makes each client wait that many
+milliseconds between reading a response and sending its next request, as a
+phone on a poor network would; against sync workers such clients hold a
+worker each for as long as they keep the connection open.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+async def _client(host, port, path, deadline, slow, latencies, errors):
+    request = (
+        f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nAccept: application/json\r\n\r\n"
+    ).encode()
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            errors[type(exc).__name__] = errors.get(type(exc).__name__, 0) + 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+        if slow:
+            await asyncio.sleep(slow)
+    if writer is not None:
+        writer.close()
+
+
+async def _read_response(reader) -> tuple[int, bool]:
+    """Read one response off the connection; returns (status, connection kept alive)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise asyncio.IncompleteReadError(b"", None)
+    status = int(status_line.split()[1])
+    length, chunked, keep_alive = 0, False, True
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding":
+            chunked = "chunked" in value
+        elif name == "connection":
+            keep_alive = value != "close"
+    if chunked:
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+def _percentile(ordered: list[float], share: float) -> float:
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+async def run(url: str, clients: int, seconds: float, slow: float) -> None:
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    latencies: list[float] = []
+    errors: dict = {}
+    started = time.perf_counter()
+    deadline = started + seconds
+    await asyncio.gather(
+        *(
+            _client(parts.hostname, parts.port or 80, path, deadline, slow, latencies, errors)
+            for _ in range(clients)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    if not latencies:
+        print(f"No responses; errors: {errors}")
+        return
+    ordered = sorted(latencies)
+    print(f"{url} with {clients} clients for {elapsed:.1f}s")
+    print(f"  requests/s  {len(ordered) / elapsed:10.1f}")
+    print(f"  p50         {_percentile(ordered, 0.50) * 1000:10.1f} ms")
+    print(f"  p99         {_percentile(ordered, 0.99) * 1000:10.1f} ms")
+    print(f"  errors      {sum(errors.values()):10d} {errors or ''}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/api/v1/async/hotels/")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--slow", type=float, default=0, help="Milliseconds between requests.")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.base_url + args.path, args.clients, args.seconds, args.slow / 1000))
+
+
+if __name__ == "__main__":
+    main()
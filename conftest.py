@@ -9,7 +9,7 @@ from decimal import Decimal
 
 import pytest
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
+from django.core.cache import caches
 from django.utils import timezone
 from rest_framework.test import APIClient
 
@@ -17,11 +17,22 @@ from hotel.models import Amenity, Hotel, Room, RoomType
 
 
 @pytest.fixture(autouse=True)
-def _clear_throttle_cache():
-    """DRF stores throttle counters in the cache; keep tests independent."""
-    cache.clear()
+def _clear_caches():
+    """Throttle counters, change counters and rendered responses live in the caches."""
+    for cache in caches.all():
+        cache.clear()
     yield
-    cache.clear()
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture
+def commit(django_capture_on_commit_callbacks):
+    """Run on-commit hooks straight away: change counters are only moved on commit.
+
+    Use as ``with commit(): ...`` around the writes a test makes.
+    """
+    return lambda: django_capture_on_commit_callbacks(execute=True)
 
 
 @pytest.fixture
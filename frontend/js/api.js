@@ -222,6 +222,10 @@
       return request("GET", "/bookings/", {});
     },
 
+    booking: function (id) {
+      return request("GET", "/bookings/" + id + "/", {});
+    },
+
     createBooking: function (payload) {
       return request("POST", "/bookings/", { body: payload });
     },
@@ -267,14 +267,8 @@
   }
 
   function drawHotel(hotel, rooms, reviews) {
-    /* The availability endpoint answers with room types, not prices, so the
-     * cheapest room of each type is derived from the room list. */
-    var priceByType = {};
     var amenities = {};
     rooms.forEach(function (room) {
-      var current = priceByType[room.room_type];
-      var price = Number(room.price_per_night);
-      if (current === undefined || price < current) priceByType[room.room_type] = price;
       (room.amenities_detail || []).forEach(function (a) {
         amenities[a.name] = true;
       });
@@ -337,9 +331,9 @@
     var availForm = document.getElementById("availform");
     availForm.addEventListener("submit", function (event) {
       event.preventDefault();
-      loadAvailability(hotel, priceByType);
+      loadAvailability(hotel);
     });
-    loadAvailability(hotel, priceByType);
+    loadAvailability(hotel);
 
     var addReview = document.getElementById("reviewform");
     if (addReview) {
@@ -397,7 +391,7 @@
     );
   }
 
-  function loadAvailability(hotel, priceByType) {
+  function loadAvailability(hotel) {
     var box = document.getElementById("availability");
     var values = form("availform");
     var nights = nightsBetween(values.check_in, values.check_out);
@@ -426,14 +420,14 @@
           '<p class="muted small">' + plural(nights, "night") + "</p>" +
           types
             .map(function (type) {
-              var price = priceByType[type.id];
-              var total = price === undefined ? null : price * nights;
+              /* Prices are those of the cheapest free room of the type. */
               return (
                 '<div class="roomtype"><div><strong>' + esc(type.name) + "</strong>" +
-                (total === null
-                  ? ""
-                  : '<div class="price">' + money(total) +
-                    " <span>total · " + money(price) + "/night</span></div>") +
+                '<div class="price">' + money(type.min_total_price) +
+                " <span>total · " + money(type.min_price_per_night) + "/night</span></div>" +
+                (type.free_rooms <= 2
+                  ? '<div class="muted small">Only ' + plural(type.free_rooms, "room") + " left</div>"
+                  : "") +
                 "</div>" +
                 '<button class="btn btn--primary" data-book="' + type.id + '">Book</button></div>'
               );
@@ -497,12 +491,40 @@
         }
         list.innerHTML = '<div class="stack">' + page.results.map(bookingCard).join("") + "</div>";
         wireBookingActions();
+        awaitPaymentLinks(page.results, 0);
       })
       .catch(function (err) {
         list.innerHTML = '<p class="notice notice--bad">' + esc(err.message) + "</p>";
       });
   }
 
+  /* With PAYMENT_INVOICE_MODE=outbox the invoice is requested after the
+   * booking is made, so a fresh booking arrives without its payment link.
+   * Poll such bookings until the link is there, then redraw the list. */
+  var LINK_POLL_MS = 1500;
+  var LINK_POLL_TRIES = 40;
+
+  function awaitingLink(booking) {
+    var payment = booking.payment || {};
+    return booking.status === "pending" && payment.status === "pending" && !payment.payment_url;
+  }
+
+  function awaitPaymentLinks(bookings, tries) {
+    var waiting = bookings.filter(awaitingLink);
+    if (!waiting.length || tries >= LINK_POLL_TRIES) return;
+    setTimeout(function () {
+      if (window.location.hash !== "#/bookings") return;
+      Promise.all(waiting.map(function (booking) { return Api.booking(booking.id); }))
+        .then(function (fresh) {
+          if (fresh.every(awaitingLink)) awaitPaymentLinks(fresh, tries + 1);
+          else renderBookings();
+        })
+        .catch(function () {
+          awaitPaymentLinks(waiting, tries + 1);
+        });
+    }, LINK_POLL_MS);
+  }
+
   function bookingCard(booking) {
     var payment = booking.payment || {};
     var rooms = (booking.rooms || [])
@@ -512,6 +534,9 @@
       .join(", ");
 
     var actions = [];
+    if (awaitingLink(booking)) {
+      actions.push('<span class="muted small">Preparing the payment link…</span>');
+    }
     if (payment.status === "pending" && payment.payment_url) {
       actions.push(
         '<a class="btn btn--primary" href="' + esc(payment.payment_url) + '">Pay ' +
@@ -21,6 +21,18 @@ bind = f"0.0.0.0:{_env('PORT', '8000')}"
 workers = int(_env("WEB_CONCURRENCY", "3"))
 timeout = int(_env("WEB_TIMEOUT", "60"))
 
+# "sync" serves the WSGI app, one request per worker at a time. "uvicorn"
+# serves the ASGI app from an event loop: the /api/v1/async/ endpoints then
+# hold no thread while they wait, and the sync views run in a thread pool.
+WORKER_PROFILES = {
+    "sync": ("sync", "HotelBookingAPI.wsgi:application"),
+    "uvicorn": ("uvicorn_worker.UvicornWorker", "HotelBookingAPI.asgi:application"),
+}
+_profile = _env("WEB_WORKER_CLASS", "sync")
+if _profile not in WORKER_PROFILES:
+    raise RuntimeError(f"Unknown WEB_WORKER_CLASS {_profile!r}.")
+worker_class, wsgi_app = WORKER_PROFILES[_profile]
+
 # Logs go to the container's stdout/stderr for the platform to collect.
 accesslog = "-"
 errorlog = "-"
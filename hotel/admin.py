@@ -1,6 +1,17 @@
 from django.contrib import admin
 
-from .models import Amenity, Booking, Hotel, Payment, Review, Room, RoomType
+from .models import (
+    Amenity,
+    Booking,
+    Hotel,
+    Payment,
+    PaymentOutbox,
+    Review,
+    Room,
+    RoomType,
+    WebhookInbox,
+)
+from .services import sync_room_nights
 
 
 class RoomInline(admin.TabularInline):
@@ -12,18 +23,11 @@ class RoomInline(admin.TabularInline):
 
 @admin.register(Hotel)
 class HotelAdmin(admin.ModelAdmin):
-    list_display = ("name", "location", "room_count")
+    list_display = ("name", "location", "room_count", "average_rating", "review_count")
     search_fields = ("name", "location")
     list_filter = ("location",)
     inlines = (RoomInline,)
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).prefetch_related("rooms")
-
-    @admin.display(description="rooms")
-    def room_count(self, obj):
-        return obj.rooms.count()
-
 
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
@@ -69,11 +73,26 @@ class BookingAdmin(admin.ModelAdmin):
     filter_horizontal = ("rooms",)
     inlines = (PaymentInline,)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Rooms and status are both editable here, outside the booking service
+        # that normally keeps the held nights in step with them.
+        sync_room_nights(form.instance)
+
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
-    list_display = ("id", "booking", "provider", "amount", "status", "created_at", "paid_at")
-    list_filter = ("status", "provider")
+    list_display = (
+        "id",
+        "booking",
+        "provider",
+        "amount",
+        "status",
+        "refund_due",
+        "created_at",
+        "paid_at",
+    )
+    list_filter = ("status", "refund_due", "provider")
     search_fields = ("reference", "provider_invoice_id")
     list_select_related = ("booking",)
     # Payments mirror an external ledger; edit them there, not here.
@@ -87,6 +106,22 @@ class PaymentAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(PaymentOutbox)
+class PaymentOutboxAdmin(admin.ModelAdmin):
+    list_display = ("payment", "attempts", "next_attempt_at", "last_error", "created_at")
+    list_select_related = ("payment",)
+    # Rows belong to the outbox worker; the admin is for looking, not editing.
+    readonly_fields = ("payment", "attempts", "last_error", "created_at")
+
+
+@admin.register(WebhookInbox)
+class WebhookInboxAdmin(admin.ModelAdmin):
+    list_display = ("provider", "provider_invoice_id", "status", "received_at", "processed_at")
+    list_filter = ("provider", "status")
+    search_fields = ("provider_invoice_id", "reference")
+    readonly_fields = ("provider", "provider_invoice_id", "reference", "status", "payload")
+
+
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ("hotel", "user", "rating", "created_at")
@@ -0,0 +1,266 @@
+"""Async twins of the public read endpoints, for ASGI workers.
+
+Mounted under ``/api/v1/async/`` with the query parameters and response bodies
+of their sync counterparts in :mod:`hotel.views`. Served by an ASGI worker
+(``WEB_WORKER_CLASS=uvicorn``, see ``gunicorn.conf.py``), a request waiting on
+the database or the cache holds no thread, so one process can keep thousands
+of slow clients connected.
+
+DRF has no async views, so these are plain Django ones. Query strings are
+validated by the same serializers and filtersets, and anonymous clients are
+throttled with DRF's ``anon`` rate as on the sync side. The catalogue lists
+use the async ORM directly. The availability answers come from the same
+service functions as the sync endpoints, called through ``sync_to_async`` —
+which is what the async ORM does with each query anyway — rather than kept
+as a second, async copy of the booking logic.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.db.models import Q
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from django_filters.filterset import filterset_factory
+from rest_framework.settings import api_settings
+from rest_framework.throttling import AnonRateThrottle
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import services, versions
+from .models import Hotel, Room
+from .serializers import (
+    AvailabilityCalendarSerializer,
+    AvailabilityQuerySerializer,
+    AvailabilitySearchQuerySerializer,
+    AvailableRoomTypeSerializer,
+    CalendarQuerySerializer,
+    FlexibleQuerySerializer,
+    FlexibleStaySerializer,
+    HotelAvailabilitySerializer,
+    HotelSerializer,
+    RoomSerializer,
+)
+from .views import HotelViewSet, RoomViewSet
+
+logger = logging.getLogger(__name__)
+
+HotelFilter = filterset_factory(Hotel, fields=["location"])
+RoomFilter = filterset_factory(Room, fields=["hotel", "room_type", "is_available", "max_guests"])
+
+
+def _throttle_wait(request) -> float | None:
+    """Seconds to wait before the next request, or ``None`` if it may go ahead."""
+    throttle = AnonRateThrottle()
+    if throttle.allow_request(request, None):
+        return None
+    return throttle.wait()
+
+
+def _is_valid(form) -> bool:
+    # Validation may look related rows up (a hotel id, say), which the ORM
+    # will only do outside the event loop.
+    return form.is_valid()
+
+
+def _available_room_types(**query) -> list:
+    # The service hands back a lazy queryset: evaluate it here, off the loop.
+    return list(services.available_room_types(**query))
+
+
+def _ordering(request, viewset) -> list[str]:
+    """Same terms as DRF's OrderingFilter: the listed fields, else the default.
+
+    Empty when the viewset has no default either, which leaves the model's
+    ``Meta.ordering`` in place, as the filter does.
+    """
+    terms = [term.strip() for term in request.GET.get("ordering", "").split(",")]
+    ordering = [term for term in terms if term.removeprefix("-") in viewset.ordering_fields]
+    return ordering or list(getattr(viewset, "ordering", None) or ())
+
+
+async def _refuse(request) -> JsonResponse | None:
+    """The response for a throttled client, or ``None`` to carry on."""
+    wait = await sync_to_async(_throttle_wait)(request)
+    if wait is None:
+        return None
+    response = JsonResponse({"detail": "Request was throttled."}, status=429)
+    if wait:
+        response["Retry-After"] = str(int(wait) + 1)
+    return response
+
+
+async def _validated(serializer_class, request):
+    """``(validated_data, None)``, or ``(None, a 400 response)`` like DRF's."""
+    query = serializer_class(data=request.GET)
+    if await sync_to_async(_is_valid)(query):
+        return query.validated_data, None
+    return None, JsonResponse(query.errors, status=400)
+
+
+async def _paginated(request, queryset, serializer_class) -> JsonResponse:
+    """One page of ``queryset`` in the shape of DRF's ``PageNumberPagination``."""
+    size = api_settings.PAGE_SIZE
+    try:
+        number = int(request.GET.get("page", 1))
+    except ValueError:
+        number = 0
+    count = await queryset.acount()
+    pages = max(-(-count // size), 1)
+    if not 1 <= number <= pages:
+        return JsonResponse({"detail": "Invalid page."}, status=404)
+
+    offset = (number - 1) * size
+    rows = [row async for row in queryset[offset : offset + size]]
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, "page", number + 1) if number < pages else None
+    previous_url = None
+    if number == 2:
+        previous_url = remove_query_param(url, "page")
+    elif number > 2:
+        previous_url = replace_query_param(url, "page", number - 1)
+    return JsonResponse(
+        {
+            "count": count,
+            "next": next_url,
+            "previous": previous_url,
+            "results": serializer_class(rows, many=True).data,
+        }
+    )
+
+
+@require_GET
+async def health(request):
+    try:
+        await sync_to_async(connection.ensure_connection)()
+    except OperationalError:
+        logger.exception("Health check failed: database unreachable")
+        return JsonResponse({"status": "error", "database": "unreachable"}, status=503)
+    return JsonResponse({"status": "ok", "database": "ok"})
+
+
+@require_GET
+async def hotel_list(request):
+    if refused := await _refuse(request):
+        return refused
+    filters = HotelFilter(request.GET, queryset=Hotel.objects.all())
+    if not await sync_to_async(_is_valid)(filters):
+        return JsonResponse(filters.errors, status=400)
+    hotels = filters.qs
+    # Same matching as DRF's SearchFilter: every term in some field.
+    for term in request.GET.get("search", "").replace(",", " ").split():
+        hotels = hotels.filter(
+            Q(name__icontains=term) | Q(location__icontains=term) | Q(description__icontains=term)
+        )
+    if ordering := _ordering(request, HotelViewSet):
+        hotels = hotels.order_by(*ordering)
+    return await _paginated(request, hotels, HotelSerializer)
+
+
+@require_GET
+async def room_list(request):
+    if refused := await _refuse(request):
+        return refused
+    filters = RoomFilter(
+        request.GET,
+        queryset=Room.objects.select_related("hotel", "room_type").prefetch_related("amenities"),
+    )
+    if not await sync_to_async(_is_valid)(filters):
+        return JsonResponse(filters.errors, status=400)
+    rooms = filters.qs
+    if ordering := _ordering(request, RoomViewSet):
+        rooms = rooms.order_by(*ordering)
+    return await _paginated(request, rooms, RoomSerializer)
+
+
+@require_GET
+async def available_room_types(request):
+    if refused := await _refuse(request):
+        return refused
+    data, invalid = await _validated(AvailabilityQuerySerializer, request)
+    if invalid:
+        return invalid
+    hotel = data["hotel"]
+    guests = data["adults"] + data["children"]
+
+    # The sync view's cache entries, so the two sides warm each other.
+    version = await sync_to_async(versions.get)(versions.occupancy_key(hotel.pk))
+    cache_key = ":".join(
+        str(part)
+        for part in (
+            "availability:room-types",
+            hotel.pk,
+            version,
+            data["check_in"],
+            data["check_out"],
+            guests,
+        )
+    )
+    payload = await cache.aget(cache_key)
+    if payload is None:
+        room_types = await sync_to_async(_available_room_types)(
+            hotel=hotel, check_in=data["check_in"], check_out=data["check_out"], guests=guests
+        )
+        payload = list(AvailableRoomTypeSerializer(room_types, many=True).data)
+        await cache.aset(cache_key, payload, settings.AVAILABILITY_CACHE_TTL)
+    return JsonResponse(payload, safe=False)
+
+
+@require_GET
+async def search_availability(request):
+    if refused := await _refuse(request):
+        return refused
+    data, invalid = await _validated(AvailabilitySearchQuerySerializer, request)
+    if invalid:
+        return invalid
+    hotels = await sync_to_async(services.search_availability)(
+        location=data["location"],
+        check_in=data["check_in"],
+        check_out=data["check_out"],
+        guests=data["adults"] + data["children"],
+    )
+    return JsonResponse(HotelAvailabilitySerializer(hotels, many=True).data, safe=False)
+
+
+@require_GET
+async def availability_calendar(request):
+    if refused := await _refuse(request):
+        return refused
+    data, invalid = await _validated(CalendarQuerySerializer, request)
+    if invalid:
+        return invalid
+    room_types = await sync_to_async(services.availability_calendar)(
+        hotel=data["hotel"],
+        start=data["start"],
+        days=data["days"],
+        guests=data["adults"] + data["children"],
+    )
+    calendar = {
+        "hotel": data["hotel"].pk,
+        "start": data["start"],
+        "days": data["days"],
+        "room_types": room_types,
+    }
+    return JsonResponse(AvailabilityCalendarSerializer(calendar).data)
+
+
+@require_GET
+async def flexible_availability(request):
+    if refused := await _refuse(request):
+        return refused
+    data, invalid = await _validated(FlexibleQuerySerializer, request)
+    if invalid:
+        return invalid
+    stays = await sync_to_async(services.flexible_availability)(
+        hotel=data["hotel"],
+        room_type=data["room_type"],
+        check_in=data["check_in"],
+        check_out=data["check_out"],
+        flex_days=data["flex_days"],
+        guests=data["adults"] + data["children"],
+    )
+    return JsonResponse(FlexibleStaySerializer(stays, many=True).data, safe=False)
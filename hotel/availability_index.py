@@ -0,0 +1,150 @@
+"""An optional in-process index of who holds which room, for availability reads.
+
+With ``settings.AVAILABILITY_INDEX`` on, each worker keeps, per hotel, the
+rooms and a sorted list of the upcoming stays of every room. Availability
+questions are then answered by bisecting those lists instead of by an
+anti-join in the database.
+
+The index is loaded lazily, the first time a hotel is asked about, and is
+rebuilt whenever the hotel's occupancy counter (see :mod:`hotel.versions`) has
+moved on since it was loaded. Every code path that takes, releases or edits a
+room bumps that counter, and :data:`MAX_AGE` bounds how long a missed bump
+can go unnoticed. Only reads go through here: the binding check made while
+reserving a room always runs against the database.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import versions
+from .models import Booking, Room
+
+
+@dataclass(frozen=True)
+class IndexedRoom:
+    id: int
+    room_type_id: int
+    room_number: int
+    price_per_night: Decimal
+    max_guests: int
+    is_available: bool
+
+
+@dataclass
+class _RoomStays:
+    """The stays of one room, sorted by check-in.
+
+    A room's stays never overlap — the unique (room, night) constraint sees to
+    that — so sorting by check-in also sorts by check-out, and the one stay
+    that could overlap a new one is the last to start before it ends.
+    """
+
+    check_ins: list[date] = field(default_factory=list)
+    check_outs: list[date] = field(default_factory=list)
+
+    def is_free(self, check_in: date, check_out: date) -> bool:
+        position = bisect_left(self.check_ins, check_out)
+        return position == 0 or self.check_outs[position - 1] <= check_in
+
+
+@dataclass
+class _HotelIndex:
+    version: int
+    loaded_at: float
+    # Stays that ended before this day are not loaded, so the index cannot
+    # answer for dates before it.
+    horizon: date
+    rooms: list[IndexedRoom]
+    stays: dict[int, _RoomStays]
+
+
+_indexes: dict[int, _HotelIndex] = {}
+_lock = threading.Lock()
+
+
+def _load(hotel_id: int, version: int) -> _HotelIndex:
+    horizon = timezone.localdate()
+    rooms = [
+        IndexedRoom(**values)
+        for values in Room.objects.filter(hotel_id=hotel_id)
+        .order_by("room_number")
+        .values(
+            "id", "room_type_id", "room_number", "price_per_night", "max_guests", "is_available"
+        )
+    ]
+    held = (
+        Booking.rooms.through.objects.filter(
+            room__hotel_id=hotel_id, booking__check_out__gt=horizon
+        )
+        .exclude(booking__status__in=Booking.RELEASING_STATUSES)
+        .order_by("room_id", "booking__check_in")
+        .values_list("room_id", "booking__check_in", "booking__check_out")
+    )
+    stays: dict[int, _RoomStays] = {}
+    for room_id, check_in, check_out in held:
+        room_stays = stays.setdefault(room_id, _RoomStays())
+        room_stays.check_ins.append(check_in)
+        room_stays.check_outs.append(check_out)
+    return _HotelIndex(
+        version=version, loaded_at=time.monotonic(), horizon=horizon, rooms=rooms, stays=stays
+    )
+
+
+def _fresh_index(hotel_id: int) -> _HotelIndex:
+    version = versions.get(versions.occupancy_key(hotel_id))
+    index = _indexes.get(hotel_id)
+    if index is None or index.version != version or _expired(index):
+        with _lock:
+            index = _indexes.get(hotel_id)
+            if index is None or index.version != version or _expired(index):
+                index = _indexes[hotel_id] = _load(hotel_id, version)
+    return index
+
+
+def _expired(index: _HotelIndex) -> bool:
+    return (
+        time.monotonic() - index.loaded_at > settings.AVAILABILITY_INDEX_MAX_AGE
+        or index.horizon != timezone.localdate()
+    )
+
+
+def free_rooms(
+    *,
+    hotel_id: int,
+    room_type_id: int | None,
+    check_in: date,
+    check_out: date,
+    guests: int,
+) -> list[IndexedRoom] | None:
+    """Bookable rooms, in room-number order, or ``None`` to fall back to SQL.
+
+    ``None`` means the index cannot answer: it is switched off, or the stay
+    starts before the earliest day it has loaded.
+    """
+    if not settings.AVAILABILITY_INDEX or check_in < timezone.localdate():
+        return None
+    index = _fresh_index(hotel_id)
+    empty = _RoomStays()
+    return [
+        room
+        for room in index.rooms
+        if room.is_available
+        and room.max_guests >= guests
+        and (room_type_id is None or room.room_type_id == room_type_id)
+        and index.stays.get(room.id, empty).is_free(check_in, check_out)
+    ]
+
+
+def clear() -> None:
+    """Drop every loaded index; the next question reloads from the database."""
+    with _lock:
+        _indexes.clear()
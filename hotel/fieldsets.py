@@ -0,0 +1,74 @@
+"""Sparse fieldsets (``?fields=``) and expansion (``?expand=``) on read requests.
+
+``?fields=id,check_in,check_out`` returns only those fields of each object;
+without it, every field is returned, as before. ``?expand=hotel`` replaces a
+related object's id with the object itself, for the fields a serializer lists
+in ``expandable_fields``, and implies the field in a ``?fields=`` selection.
+
+Both apply to the top-level objects of ``GET`` responses only: a write is
+always answered in full. Viewsets ask :func:`wants` and :func:`expands`
+which related rows the response will need, so that fields a client leaves
+out cost neither their joins nor their prefetch queries.
+"""
+
+from __future__ import annotations
+
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def _names(request, param: str) -> frozenset[str] | None:
+    raw = request.query_params.get(param)
+    if raw is None:
+        return None
+    return frozenset(name.strip() for name in raw.split(",") if name.strip())
+
+
+def selection(request) -> tuple[frozenset[str] | None, frozenset[str]]:
+    """The fields asked for (``None`` for all of them) and the fields to expand."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None, frozenset()
+    return _names(request, FIELDS_PARAM), _names(request, EXPAND_PARAM) or frozenset()
+
+
+def wants(request, *names: str) -> bool:
+    """Whether the response will contain any of the fields ``names``."""
+    fields, expand = selection(request)
+    return fields is None or any(name in fields or name in expand for name in names)
+
+
+def expands(request, name: str) -> bool:
+    return name in selection(request)[1]
+
+
+class SparseFieldsetMixin:
+    """Serializer side: drop unselected fields and swap in expanded ones.
+
+    ``expandable_fields`` maps a field name to the serializer class that
+    represents the related object when ``?expand=`` names it.
+    """
+
+    expandable_fields: dict[str, type[serializers.Serializer]] = {}
+
+    def _is_top_level(self) -> bool:
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_top_level():
+            return fields
+        selected, expand = selection(self.context.get("request"))
+        expand = expand & self.expandable_fields.keys()
+        for name in expand:
+            fields[name] = self.expandable_fields[name](read_only=True)
+        if selected is not None:
+            fields = {
+                name: field for name, field in fields.items() if name in selected or name in expand
+            }
+        return fields
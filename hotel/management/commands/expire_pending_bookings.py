@@ -0,0 +1,31 @@
+"""Cancel bookings whose guests never paid, and give their rooms back.
+
+Meant to run every minute or so from cron (or any scheduler):
+
+    python manage.py expire_pending_bookings
+
+A booking expires ``BOOKING_HOLD_MINUTES`` after it was made. Overlapping runs
+are harmless: each skips the rows another is working on.
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from hotel.services import expire_pending_bookings
+
+
+class Command(BaseCommand):
+    help = "Cancel pending bookings that outlived the payment hold and release their rooms."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Bookings expired per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        expired = expire_pending_bookings(batch_size=options["batch_size"])
+        self.stdout.write(f"Expired {expired} unpaid booking(s).")
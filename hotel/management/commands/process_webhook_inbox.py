@@ -0,0 +1,50 @@
+"""Apply payment webhooks stored with ``PAYMENT_WEBHOOK_MODE=inbox``.
+
+Runs until stopped, as a process of its own next to the web workers:
+
+    python manage.py process_webhook_inbox --batch-size 200
+
+Several can run at once; each skips the events another has locked. ``--once``
+works off the backlog and exits, for running from a scheduler instead.
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from hotel.services import process_webhook_inbox
+
+
+class Command(BaseCommand):
+    help = "Apply stored payment webhook events in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=200, help="Events applied per transaction."
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the inbox is empty.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once the inbox is empty instead of waiting."
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        try:
+            while True:
+                picked = process_webhook_inbox(batch_size=options["batch_size"])
+                processed += picked
+                if picked:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Applied {processed} webhook events.")
@@ -0,0 +1,32 @@
+"""Recompute the review and room summaries stored on each hotel.
+
+They are kept current as reviews and rooms are saved, but bulk updates, raw
+SQL and fixtures loaded with ``loaddata`` go around that. Safe to run at any
+time:
+
+    python manage.py rebuild_hotel_stats
+    python manage.py rebuild_hotel_stats --hotel 3 --hotel 7
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from hotel import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the rating, review, room and price summaries stored on hotels."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hotel",
+            type=int,
+            action="append",
+            dest="hotels",
+            help="Only this hotel; may be given more than once. Defaults to all.",
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = stats.rebuild(options["hotels"])
+        self.stdout.write(f"Rebuilt the summaries of {rebuilt} hotels.")
@@ -0,0 +1,54 @@
+"""Settle pending payments whose webhook was lost, by asking the provider.
+
+Run it every few minutes from cron or any scheduler:
+
+    python manage.py reconcile_payments --workers 8 --rate 10
+
+Payments pending for longer than ``PAYMENT_RECONCILE_AFTER_MINUTES`` are
+checked; status requests are spread over ``--workers`` threads and kept under
+``--rate`` per second, the acquirer's limit.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from hotel.services import reconcile_payments
+
+
+class Command(BaseCommand):
+    help = "Ask the payment provider about payments still pending and apply the answers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=settings.PAYMENT_RECONCILE_AFTER_MINUTES,
+            help="Only check payments pending for at least this many minutes.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=8, help="Status requests made concurrently."
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=settings.PAYMENT_RECONCILE_RATE,
+            help="Status requests per second, at most.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=200, help="Payments checked per round."
+        )
+
+    def handle(self, *args, **options):
+        checked, settled, failed = reconcile_payments(
+            older_than=timedelta(minutes=options["older_than"]),
+            workers=options["workers"],
+            rate=options["rate"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            f"Checked {checked} pending payments: {settled} settled, {failed} unchecked."
+        )
@@ -0,0 +1,53 @@
+"""Request the invoices of bookings made with ``PAYMENT_INVOICE_MODE=outbox``.
+
+Runs until stopped, as a process of its own next to the web workers:
+
+    python manage.py run_payment_outbox --workers 8
+
+Several can run at once; each leases the entries it picks. ``--once`` works
+off what is due and exits, for running from a scheduler instead.
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from hotel.services import process_payment_outbox
+
+
+class Command(BaseCommand):
+    help = "Create pending payment invoices from the outbox, several at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=8, help="Invoice requests made concurrently."
+        )
+        parser.add_argument("--batch-size", type=int, default=32, help="Entries picked per round.")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when nothing is due.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once nothing is due instead of waiting."
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        try:
+            while True:
+                picked = process_payment_outbox(
+                    batch_size=options["batch_size"], workers=options["workers"]
+                )
+                processed += picked
+                if picked:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Worked off {processed} outbox entries.")
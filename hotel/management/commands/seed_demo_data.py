@@ -18,6 +18,7 @@ from django.db import transaction
 from django.utils import timezone
 
 from hotel.models import Amenity, Booking, Hotel, Payment, Review, Room, RoomType
+from hotel.services import sync_room_nights
 
 AMENITIES = [
     ("Free WiFi", "High-speed wireless internet throughout the building."),
@@ -207,6 +208,7 @@ class Command(BaseCommand):
                     status=Booking.Status.CONFIRMED,
                 )
                 booking.rooms.add(room)
+                sync_room_nights(booking)
                 Payment.objects.create(
                     booking=booking,
                     provider="fake",
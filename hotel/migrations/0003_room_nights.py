@@ -0,0 +1,51 @@
+# Generated by Django 5.2.17 on 2026-10-16 22:50
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def hold_existing_nights(apps, schema_editor):
+    """Record the nights of every booking that still holds its rooms."""
+    Booking = apps.get_model("hotel", "Booking")
+    RoomNight = apps.get_model("hotel", "RoomNight")
+
+    nights = []
+    for booking in Booking.objects.exclude(status="cancelled").prefetch_related("rooms"):
+        for room in booking.rooms.all():
+            for offset in range((booking.check_out - booking.check_in).days):
+                nights.append(
+                    RoomNight(
+                        room=room,
+                        booking=booking,
+                        night=booking.check_in + timedelta(days=offset),
+                    )
+                )
+    # Any overlap already in the data predates the constraint; the first
+    # booking keeps the night rather than the migration failing.
+    RoomNight.objects.bulk_create(nights, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('night', models.DateField()),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_nights', to='hotel.booking')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='held_nights', to='hotel.room')),
+            ],
+            options={
+                'ordering': ['room', 'night'],
+                'constraints': [models.UniqueConstraint(fields=('room', 'night'), name='one_booking_per_room_night')],
+            },
+        ),
+        migrations.RunPython(hold_existing_nights, migrations.RunPython.noop),
+    ]
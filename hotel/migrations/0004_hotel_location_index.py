@@ -0,0 +1,18 @@
+# Generated by Django 5.2.17 on 2026-10-16 22:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0003_room_nights'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='hotel',
+            name='location',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
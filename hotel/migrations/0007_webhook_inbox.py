@@ -0,0 +1,32 @@
+# Generated by Django 5.2.17 on 2026-10-16 23:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0006_payment_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookInbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=50)),
+                ('provider_invoice_id', models.CharField(blank=True, max_length=100)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(max_length=20)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'webhook inbox',
+                'ordering': ['received_at'],
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['received_at'], name='webhook_inbox_backlog')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'provider_invoice_id', 'reference', 'status'), name='one_inbox_event_per_invoice_status')],
+            },
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.17 on 2026-10-16 23:19
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def summarise_existing_hotels(apps, schema_editor):
+    """Fill the new columns from the reviews and rooms already there."""
+    Hotel = apps.get_model("hotel", "Hotel")
+    Review = apps.get_model("hotel", "Review")
+    Room = apps.get_model("hotel", "Room")
+
+    stats = {hotel_id: {} for hotel_id in Hotel.objects.values_list("pk", flat=True)}
+    for row in Review.objects.values("hotel", "rating").annotate(n=Count("pk")).order_by():
+        stats[row["hotel"]][f"ratings_{row['rating']}"] = row["n"]
+    for row in Room.objects.values("hotel").annotate(n=Count("pk")).order_by():
+        stats[row["hotel"]]["room_count"] = row["n"]
+    cheapest = (
+        Room.objects.filter(is_available=True)
+        .values("hotel")
+        .annotate(price=Min("price_per_night"))
+        .order_by()
+    )
+    for row in cheapest:
+        stats[row["hotel"]]["min_price_per_night"] = row["price"]
+    for row in Review.objects.values("hotel").annotate(total=Sum("rating")).order_by():
+        stats[row["hotel"]]["rating_sum"] = row["total"]
+
+    for hotel_id, values in stats.items():
+        count = sum(values.get(f"ratings_{rating}", 0) for rating in range(1, 6))
+        if count:
+            values["review_count"] = count
+            values["average_rating"] = values["rating_sum"] / count
+        if values:
+            Hotel.objects.filter(pk=hotel_id).update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0007_webhook_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='average_rating',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='min_price_per_night',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='ratings_1',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='ratings_2',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='ratings_3',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='ratings_4',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='ratings_5',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='review_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='room_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(summarise_existing_hotels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.17 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0009_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='refund_due',
+            field=models.BooleanField(default=False),
+        ),
+    ]
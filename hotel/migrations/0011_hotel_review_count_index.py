@@ -0,0 +1,17 @@
+# Generated by Django 5.2.17 on 2026-10-16 23:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0010_payment_refund_due'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['review_count', 'id'], name='hotel_hotel_review__f14996_idx'),
+        ),
+    ]
@@ -0,0 +1,129 @@
+"""Reusable viewset behaviour."""
+
+from __future__ import annotations
+
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from . import fieldsets, response_cache, versions
+
+
+class ConditionalGetMixin:
+    """Strong ``ETag`` and ``Last-Modified`` on list and detail responses.
+
+    A response is derived from the tables in :attr:`conditional_models` and
+    from the request URL, so its validators are too: the ETag hashes the URL
+    with those tables' change counters (see :func:`hotel.versions.touch`),
+    and Last-Modified is the latest of their writes. Both are known from one
+    cache read, so a client that already holds the current representation is
+    answered ``304 Not Modified`` before any queryset is built, let alone
+    evaluated.
+
+    Only JSON responses get validators: the browsable API renders the
+    current user and a CSRF token, and is not byte-for-byte repeatable.
+    """
+
+    conditional_models: tuple = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+    def _fingerprint(self, request) -> tuple[str, int]:
+        """A hash of the URL and the tables' counters, and the latest write's time."""
+        stamps = versions.stamps([versions.table_key(model) for model in self.conditional_models])
+        # Parameter order does not change the response (DRF sorts them in the
+        # links it builds), so it does not change the fingerprint either.
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        url = request.build_absolute_uri(request.path) + (f"?{query}" if query else "")
+        digest = hashlib.sha256("\n".join([url, *map(str, stamps)]).encode()).hexdigest()
+        return digest[:32], max(stamps) // 1_000_000_000
+
+    def _respond(self, handler, request, fingerprint, *args, **kwargs):
+        return handler(request, *args, **kwargs)
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return handler(request, *args, **kwargs)
+
+        # Read before the data: a write landing in between makes the response
+        # newer than its ETag, which costs a client one extra download. Read
+        # after, the ETag could vouch for data the response does not contain.
+        fingerprint, last_modified = self._fingerprint(request)
+        etag = quote_etag(fingerprint)
+        headers = {"ETag": etag, "Last-Modified": http_date(last_modified)}
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            for name, value in headers.items():
+                not_modified[name] = value
+            return not_modified
+
+        response = self._respond(handler, request, fingerprint, *args, **kwargs)
+        if response.status_code == 200:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+
+class CachedResponseMixin(ConditionalGetMixin):
+    """Serve anonymous JSON list and detail responses already rendered.
+
+    The rendered bytes are kept in :mod:`hotel.response_cache` under the same
+    fingerprint as the ETag, so a write to any of :attr:`conditional_models`
+    moves every affected response to a new key, and the signal handlers that
+    move the counters are all the invalidation there is. A hit skips the
+    queryset, the serializer and the renderer. Authenticated requests are
+    never served from, or stored in, the cache.
+    """
+
+    def _respond(self, handler, request, fingerprint, *args, **kwargs):
+        if request.user.is_authenticated or not settings.CATALOGUE_CACHE_TTL:
+            return handler(request, *args, **kwargs)
+        key = f"response:{fingerprint}"
+        cached = response_cache.get(key)
+        if cached is not None:
+            content_type, content = cached
+            return HttpResponse(content, content_type=content_type)
+        self._store_response_as = key
+        return handler(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, "_store_response_as", None)
+        if key and response.status_code == 200:
+            response.render()
+            response_cache.set(
+                key, (response["Content-Type"], response.content), settings.CATALOGUE_CACHE_TTL
+            )
+        return response
+
+
+class ProjectedListMixin:
+    """List pages rendered by :attr:`projection_class` (see :mod:`hotel.projections`).
+
+    Same filters, ordering and pagination as ``ListModelMixin``; only the
+    rows are read with ``values()`` and rendered without the serializer.
+    ``?expand=`` embeds whole serializers, so those requests take the
+    serializer path.
+    """
+
+    projection_class = None
+
+    def list(self, request, *args, **kwargs):
+        fields, expand = fieldsets.selection(request)
+        if self.projection_class is None or expand:
+            return super().list(request, *args, **kwargs)
+        projection = self.projection_class(fields)
+        rows = projection.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(projection.represent(rows))
+        return self.get_paginated_response(projection.represent(page))
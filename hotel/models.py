@@ -3,6 +3,7 @@ from decimal import Decimal
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 
 class Amenity(models.Model):
@@ -21,9 +22,26 @@ class Amenity(models.Model):
 
 class Hotel(models.Model):
     name = models.CharField(max_length=255)
-    location = models.CharField(max_length=255)
+    # Indexed for the city-wide availability search, which filters on it.
+    location = models.CharField(max_length=255, db_index=True)
     description = models.TextField(blank=True)
 
+    # Summaries of the hotel's reviews and rooms, kept current by hotel.stats
+    # so that listing and sorting hotels reads no other table.
+    rating_sum = models.IntegerField(default=0, editable=False)
+    review_count = models.IntegerField(default=0, editable=False)
+    average_rating = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    ratings_1 = models.IntegerField(default=0, editable=False)
+    ratings_2 = models.IntegerField(default=0, editable=False)
+    ratings_3 = models.IntegerField(default=0, editable=False)
+    ratings_4 = models.IntegerField(default=0, editable=False)
+    ratings_5 = models.IntegerField(default=0, editable=False)
+    room_count = models.IntegerField(default=0, editable=False)
+    # The cheapest room in service; null while there is none.
+    min_price_per_night = models.DecimalField(
+        max_digits=8, decimal_places=2, null=True, blank=True, editable=False, db_index=True
+    )
+
     class Meta:
         ordering = ["name"]
         constraints = [
@@ -31,10 +49,17 @@ class Hotel(models.Model):
                 fields=["name", "location"], name="unique_hotel_name_per_location"
             )
         ]
+        # The catalogue sorts by review count; the id breaks its many ties.
+        indexes = [models.Index(fields=["review_count", "id"])]
 
     def __str__(self):
         return f"{self.name} ({self.location})"
 
+    @property
+    def rating_histogram(self) -> dict[int, int]:
+        """Reviews per star rating, from 1 to 5."""
+        return {rating: getattr(self, f"ratings_{rating}") for rating in range(1, 6)}
+
 
 class RoomType(models.Model):
     """A bookable category of room. Guests pick a type, not a specific room."""
@@ -112,6 +137,12 @@ class Booking(models.Model):
         indexes = [
             models.Index(fields=["check_in", "check_out"]),
             models.Index(fields=["user", "status"]),
+            # The expiry sweep: pending bookings, oldest first.
+            models.Index(fields=["status", "created_at"]),
+            # Cursor pages of the booking list (hotel.pagination): a guest's
+            # own bookings, and all of them for staff.
+            models.Index(fields=["user", "-created_at", "-id"]),
+            models.Index(fields=["-created_at", "-id"]),
         ]
 
     def __str__(self):
@@ -134,6 +165,31 @@ class Booking(models.Model):
     RELEASING_STATUSES = (Status.CANCELLED,)
 
 
+class RoomNight(models.Model):
+    """One night of one room, held by a booking.
+
+    Materialises the nights of every booking that still holds its rooms, so an
+    availability check probes at most a stay's worth of rows per room instead
+    of scanning booking history. Rows are written and deleted by the booking
+    service as bookings are reserved and released.
+    """
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="held_nights")
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name="room_nights")
+    night = models.DateField()
+
+    class Meta:
+        ordering = ["room", "night"]
+        constraints = [
+            # The database's own guard against double booking: whatever the
+            # application gets wrong, a room-night can only be sold once.
+            models.UniqueConstraint(fields=["room", "night"], name="one_booking_per_room_night")
+        ]
+
+    def __str__(self):
+        return f"Room {self.room_id} on {self.night} (booking #{self.booking_id})"
+
+
 class Payment(models.Model):
     class Status(models.TextChoices):
         PENDING = "pending", "Pending"
@@ -155,14 +211,83 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     paid_at = models.DateTimeField(null=True, blank=True)
+    # Paid after its booking was cancelled, with the rooms gone meanwhile:
+    # the guest is owed the money back.
+    refund_due = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["-created_at"]
+        # Cursor pages of the payments ledger (hotel.pagination).
+        indexes = [models.Index(fields=["-created_at", "-id"])]
 
     def __str__(self):
         return f"Payment for booking #{self.booking_id} - {self.status}"
 
 
+class PaymentOutbox(models.Model):
+    """An invoice still to be requested from the provider, for a pending payment.
+
+    Written in the same transaction as the booking when invoices are created
+    off the request path, and worked off by ``manage.py run_payment_outbox``.
+    The row is deleted once the invoice exists or the payment has given up.
+    """
+
+    payment = models.OneToOneField(Payment, on_delete=models.CASCADE, related_name="outbox")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Also serves as a lease: a worker that picks the row moves it forward, so
+    # another worker only retries it if the first one died mid-call.
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["next_attempt_at"]
+        verbose_name_plural = "payment outbox"
+
+    def __str__(self):
+        return f"Invoice for payment #{self.payment_id} (attempt {self.attempts + 1})"
+
+
+class WebhookInbox(models.Model):
+    """A verified payment webhook, stored to be applied later by a worker.
+
+    With ``PAYMENT_WEBHOOK_MODE=inbox`` the webhook endpoint only records the
+    event and answers; ``manage.py process_webhook_inbox`` applies events in
+    batches. A provider retrying an event it already delivered hits the unique
+    constraint and is ignored.
+    """
+
+    provider = models.CharField(max_length=50)
+    provider_invoice_id = models.CharField(max_length=100, blank=True)
+    reference = models.CharField(max_length=100, blank=True)
+    # One of Payment.Status, as translated by the provider.
+    status = models.CharField(max_length=20)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["received_at"]
+        verbose_name_plural = "webhook inbox"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "provider_invoice_id", "reference", "status"],
+                name="one_inbox_event_per_invoice_status",
+            )
+        ]
+        indexes = [
+            # Only the backlog is ever scanned, so only the backlog is indexed.
+            models.Index(
+                fields=["received_at"],
+                condition=models.Q(processed_at__isnull=True),
+                name="webhook_inbox_backlog",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.provider_invoice_id or self.reference}: {self.status}"
+
+
 class Review(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="reviews"
@@ -180,6 +305,11 @@ class Review(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["user", "hotel"], name="one_review_per_user_per_hotel")
         ]
+        # Cursor pages of the reviews, of one hotel or of all (hotel.pagination).
+        indexes = [
+            models.Index(fields=["hotel", "-created_at", "-id"]),
+            models.Index(fields=["-created_at", "-id"]),
+        ]
 
     def __str__(self):
         return f"Review by {self.user} for {self.hotel.name} ({self.rating}/5)"
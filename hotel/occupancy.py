@@ -0,0 +1,149 @@
+"""Occupancy arithmetic done in memory, once the rows have been loaded.
+
+Nothing here touches the database. Callers fetch the stays they need in one
+query and pass them in as plain tuples, so the cost of these functions grows
+with the number of stays rather than with the number of days asked about.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Hashable, Iterable, Mapping, Sequence
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+try:
+    import numpy
+except ImportError:  # Optional: the pure-Python pass gives the same answer.
+    numpy = None
+
+# How far either side of a stay best-fit assignment looks for neighbouring stays.
+BEST_FIT_REACH = 14
+
+
+def free_counts(
+    *,
+    start: date,
+    days: int,
+    capacity: Mapping[Hashable, int],
+    stays: Iterable[tuple[Hashable, date, date]],
+) -> dict[Hashable, list[int]]:
+    """Free rooms per key for each of ``days`` days from ``start``.
+
+    ``capacity`` maps a key (a room type, say) to its number of rooms, and
+    each stay is a ``(key, check_in, check_out)`` tuple for one room. A
+    difference array records +1 on the first day a stay covers and -1 on its
+    check-out day; a running sum over it then gives the rooms taken each day.
+    Stays are clipped to the window, and keys missing from ``capacity`` are
+    ignored.
+    """
+    keys = list(capacity)
+    row_of = {key: row for row, key in enumerate(keys)}
+
+    rows, starts, ends = [], [], []
+    for key, check_in, check_out in stays:
+        row = row_of.get(key)
+        if row is None:
+            continue
+        first = max((check_in - start).days, 0)
+        last = min((check_out - start).days, days)
+        if first < last:
+            rows.append(row)
+            starts.append(first)
+            ends.append(last)
+
+    if numpy is not None:
+        taken = _taken_numpy(len(keys), days, rows, starts, ends)
+    else:
+        taken = _taken_python(len(keys), days, rows, starts, ends)
+    return {key: [capacity[key] - count for count in taken[row]] for row, key in enumerate(keys)}
+
+
+def _taken_python(height, days, rows, starts, ends) -> list[list[int]]:
+    # One spare column takes the -1 of stays running to the end of the window.
+    diff = [[0] * (days + 1) for _ in range(height)]
+    for row, first, last in zip(rows, starts, ends, strict=True):
+        diff[row][first] += 1
+        diff[row][last] -= 1
+    return [list(accumulate(line[:days])) for line in diff]
+
+
+def _taken_numpy(height, days, rows, starts, ends) -> list[list[int]]:
+    diff = numpy.zeros((height, days + 1), dtype=numpy.int64)
+    rows = numpy.asarray(rows, dtype=numpy.intp)
+    # add.at, unlike fancy-index assignment, accumulates repeated positions.
+    numpy.add.at(diff, (rows, numpy.asarray(starts, dtype=numpy.intp)), 1)
+    numpy.add.at(diff, (rows, numpy.asarray(ends, dtype=numpy.intp)), -1)
+    return numpy.cumsum(diff[:, :days], axis=1).tolist()
+
+
+def free_windows(
+    *,
+    first_start: date,
+    starts: int,
+    nights: int,
+    prices: Mapping[Hashable, Decimal],
+    held: Iterable[tuple[Hashable, date]],
+) -> list[tuple[date, int, Decimal]]:
+    """Stays of ``nights`` nights that some room can take, by start date.
+
+    Tries each of ``starts`` consecutive start dates from ``first_start``.
+    ``prices`` maps every candidate room to its nightly price and ``held``
+    lists the ``(room, night)`` pairs already taken. For every start date with
+    a free room the result holds ``(start, free_rooms, cheapest_price)``.
+
+    Each room's nights become a prefix sum of taken nights, so whether the
+    room is free for a window is one subtraction: sliding the window along
+    costs nothing extra per start date.
+    """
+    span = starts + nights - 1
+    taken = {room: [0] * span for room in prices}
+    for room, night in held:
+        offset = (night - first_start).days
+        if room in taken and 0 <= offset < span:
+            taken[room][offset] = 1
+
+    free = [0] * starts
+    cheapest: list[Decimal | None] = [None] * starts
+    for room, nights_taken in taken.items():
+        before = [0, *accumulate(nights_taken)]
+        price = prices[room]
+        for start in range(starts):
+            if before[start + nights] == before[start]:
+                free[start] += 1
+                if cheapest[start] is None or price < cheapest[start]:
+                    cheapest[start] = price
+    return [
+        (first_start + timedelta(days=start), free[start], cheapest[start])
+        for start in range(starts)
+        if free[start]
+    ]
+
+
+def best_fit_order(
+    candidates: Sequence[Hashable],
+    *,
+    check_in: date,
+    check_out: date,
+    held: Iterable[tuple[Hashable, date]],
+    reach: int,
+) -> list[Hashable]:
+    """Free ``candidates`` ordered by how snugly a stay would fit between bookings.
+
+    ``held`` lists the ``(room, night)`` pairs taken up to ``reach`` nights on
+    either side of the stay. A room scores the empty nights the stay would
+    leave between it and the stays before and after it, with no stay within
+    reach counting as ``reach``. The lowest score wins: a stay that closes a
+    gap exactly scores 0, and the nights it leaves behind are as few as
+    possible. Ties keep the order of ``candidates``.
+    """
+    before = dict.fromkeys(candidates, reach)
+    after = dict.fromkeys(candidates, reach)
+    for room, night in held:
+        if room not in before:
+            continue
+        if night < check_in:
+            before[room] = min(before[room], (check_in - night).days - 1)
+        elif night >= check_out:
+            after[room] = min(after[room], (night - check_out).days)
+    return sorted(candidates, key=lambda room: before[room] + after[room])
@@ -6,7 +6,11 @@ project depends only on the :class:`PaymentProvider` interface.
 
 from __future__ import annotations
 
+import threading
+
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 
 from .base import (
     Invoice,
@@ -24,13 +28,23 @@ _PROVIDERS: dict[str, type[PaymentProvider]] = {
 }
 
 
+_instances: dict[str, PaymentProvider] = {}
+_instances_lock = threading.Lock()
+
+
 def get_payment_provider(name: str | None = None) -> PaymentProvider:
-    """Instantiate the configured provider.
+    """The configured provider, one instance per process.
 
-    Raises :class:`PaymentError` for an unknown name so a typo in the
-    environment fails loudly instead of silently skipping payments.
+    Providers hold pooled connections and circuit-breaker state, which only
+    help if every request shares them. Raises :class:`PaymentError` for an
+    unknown name so a typo in the environment fails loudly instead of
+    silently skipping payments.
     """
     provider_name = (name or settings.PAYMENT_PROVIDER).lower()
+    provider = _instances.get(provider_name)
+    if provider is not None:
+        return provider
+
     try:
         provider_class = _PROVIDERS[provider_name]
     except KeyError:
@@ -38,7 +52,19 @@ def get_payment_provider(name: str | None = None) -> PaymentProvider:
         raise PaymentError(
             f"Unknown PAYMENT_PROVIDER {provider_name!r}. Available: {known}."
         ) from None
-    return provider_class()
+    with _instances_lock:
+        if provider_name not in _instances:
+            _instances[provider_name] = provider_class()
+        return _instances[provider_name]
+
+
+@receiver(setting_changed)
+def _forget_providers(*, setting, **kwargs):
+    # Instances read their credentials once; a test that overrides them needs
+    # a fresh one.
+    if setting.startswith(("PAYMENT_", "MONOBANK_")):
+        with _instances_lock:
+            _instances.clear()
 
 
 __all__ = [
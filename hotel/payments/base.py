@@ -32,6 +32,8 @@ class InvoiceRequest:
     description: str
     redirect_url: str
     webhook_url: str
+    # Seconds the invoice stays payable, where the provider supports a limit.
+    validity: int | None = None
 
 
 @dataclass(frozen=True)
@@ -60,3 +62,11 @@ class PaymentProvider(ABC):
     @abstractmethod
     def parse_webhook(self, payload: Mapping[str, object]) -> WebhookEvent:
         """Translate a provider payload into a :class:`WebhookEvent`."""
+
+    @abstractmethod
+    def get_invoice_status(self, provider_invoice_id: str) -> WebhookEvent:
+        """Ask the provider where an invoice stands, as if it had sent a webhook."""
+
+    @abstractmethod
+    def cancel_invoice(self, provider_invoice_id: str) -> None:
+        """Withdraw an unpaid invoice, so that its payment link stops working."""
@@ -38,6 +38,15 @@ class FakePaymentProvider(PaymentProvider):
         # the internet, and production must not select it.
         return True
 
+    def get_invoice_status(self, provider_invoice_id: str) -> WebhookEvent:
+        # Fake invoices are only ever settled by posting a webhook by hand, so
+        # as far as the provider knows they are all still open.
+        return WebhookEvent(provider_invoice_id=provider_invoice_id, reference="", status="pending")
+
+    def cancel_invoice(self, provider_invoice_id: str) -> None:
+        # Nothing to withdraw: a fake invoice is paid only by a hand-made webhook.
+        return None
+
     def parse_webhook(self, payload: Mapping[str, object]) -> WebhookEvent:
         raw_status = str(payload.get("status", "")).lower()
         return WebhookEvent(
@@ -0,0 +1,115 @@
+"""HTTP plumbing shared by provider integrations: pooled sessions, breakers, rate limits."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def pooled_session(*, retries: int = 2, backoff: float = 0.3, pool_size: int = 10):
+    """A :class:`requests.Session` that keeps connections alive and retries safely.
+
+    Only idempotent requests are retried after the server has seen them, on
+    connection resets and on 429/5xx answers, with exponential, jittered
+    backoff that honours ``Retry-After``. A request that never reached the
+    server — a refused connection — is retried whatever its method, since
+    nothing can have happened twice.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        backoff_jitter=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        # Hand the last response back instead of raising, so callers see the
+        # provider's own error and raise_for_status() decides.
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class CircuitOpen(Exception):
+    """The circuit breaker is refusing calls for now."""
+
+
+class CircuitBreaker:
+    """Stop calling a dependency that keeps failing, and try again later.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    :meth:`before_call` raises :class:`CircuitOpen` straight away, so callers
+    fail fast instead of each waiting out a timeout. Once ``reset_after``
+    seconds have passed a single trial call is let through: its success closes
+    the circuit, its failure opens it again for another period. Thread-safe;
+    one breaker is meant to be shared by every thread of a process.
+    """
+
+    def __init__(self, *, failure_threshold: int = 5, reset_after: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_after or self._trial_running:
+                raise CircuitOpen(
+                    f"{self._failures} consecutive failures; retrying after "
+                    f"{max(self.reset_after - waited, 0):.0f}s"
+                )
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class RateLimiter:
+    """Space calls out to at most ``rate`` per second, across threads.
+
+    Each :meth:`acquire` reserves the next free slot and sleeps until it comes,
+    so a pool of threads sharing one limiter keeps to the rate however many of
+    them there are. There is no burst allowance: a provider's limit is usually
+    counted over a short window.
+    """
+
+    def __init__(self, rate: float):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.interval = 1 / rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
@@ -7,6 +7,8 @@ from __future__ import annotations
 
 import base64
 import logging
+import threading
+import time
 from collections.abc import Mapping
 
 import requests
@@ -17,6 +19,7 @@ from django.conf import settings
 from django.core.cache import cache
 
 from .base import Invoice, InvoiceRequest, PaymentError, PaymentProvider, WebhookEvent
+from .http import CircuitBreaker, CircuitOpen, pooled_session
 
 logger = logging.getLogger(__name__)
 
@@ -33,24 +36,74 @@ _STATUS_MAP = {
 
 _PUBKEY_CACHE_KEY = "monobank:pubkey"
 _PUBKEY_CACHE_TTL = 60 * 60  # The key rotates rarely; an hour is plenty.
-_REQUEST_TIMEOUT = 15
+# How long a worker trusts the key it parsed before looking at the cache again.
+_PUBKEY_MEMORY_TTL = 5 * 60
+# A signature that does not verify may mean the key was rotated, but also that
+# someone is posting forgeries: refetch for it at most this often.
+_PUBKEY_REFETCH_INTERVAL = 60
+_SIGNATURE_ALGORITHM = ec.ECDSA(hashes.SHA256())
+# Connecting should be quick; answering an invoice request may not be.
+_REQUEST_TIMEOUT = (5, 15)
 
 
 class MonobankPaymentProvider(PaymentProvider):
     name = "monobank"
 
-    def __init__(self, token: str | None = None, api_url: str | None = None):
+    def __init__(
+        self,
+        token: str | None = None,
+        api_url: str | None = None,
+        *,
+        breaker: CircuitBreaker | None = None,
+    ):
         self.token = token if token is not None else settings.MONOBANK_TOKEN
         self.api_url = (api_url or settings.MONOBANK_API_URL).rstrip("/")
         if not self.token:
             raise PaymentError(
                 "MONOBANK_TOKEN is not configured. Set it, or use PAYMENT_PROVIDER=fake."
             )
+        # One instance serves the whole process (see get_payment_provider), so
+        # its connections are reused and its breaker sees every call.
+        self._session = pooled_session()
+        self._session.headers.update(self._headers)
+        self._breaker = breaker or CircuitBreaker(
+            failure_threshold=settings.MONOBANK_CIRCUIT_FAILURES,
+            reset_after=settings.MONOBANK_CIRCUIT_RESET_SECONDS,
+        )
+        self._key: ec.EllipticCurvePublicKey | None = None
+        self._key_loaded_at = 0.0
+        self._key_lock = threading.Lock()
 
     @property
     def _headers(self) -> dict[str, str]:
         return {"X-Token": self.token, "Content-Type": "application/json"}
 
+    def _call(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Make a request through the shared session, guarded by the circuit breaker.
+
+        Network errors and 5xx answers count against the acquirer; a 4xx is
+        our own mistake and does not. Raises :class:`PaymentError` at once
+        while the circuit is open.
+        """
+        try:
+            self._breaker.before_call()
+        except CircuitOpen as exc:
+            raise PaymentError(f"Monobank is unavailable ({exc}).") from exc
+
+        try:
+            response = self._session.request(
+                method, f"{self.api_url}{path}", timeout=_REQUEST_TIMEOUT, **kwargs
+            )
+        except requests.RequestException:
+            self._breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self._breaker.record_failure()
+        else:
+            self._breaker.record_success()
+        response.raise_for_status()
+        return response
+
     def create_invoice(self, request: InvoiceRequest) -> Invoice:
         payload = {
             # Monobank expects the minor currency unit (kopecks).
@@ -63,16 +116,11 @@ class MonobankPaymentProvider(PaymentProvider):
             "redirectUrl": request.redirect_url,
             "webHookUrl": request.webhook_url,
         }
+        if request.validity is not None:
+            payload["validity"] = request.validity
 
         try:
-            response = requests.post(
-                f"{self.api_url}/api/merchant/invoice/create",
-                json=payload,
-                headers=self._headers,
-                timeout=_REQUEST_TIMEOUT,
-            )
-            response.raise_for_status()
-            data = response.json()
+            data = self._call("POST", "/api/merchant/invoice/create", json=payload).json()
         except requests.RequestException as exc:
             raise PaymentError(f"Monobank invoice request failed: {exc}") from exc
         except ValueError as exc:
@@ -85,6 +133,28 @@ class MonobankPaymentProvider(PaymentProvider):
 
         return Invoice(provider_invoice_id=invoice_id, payment_url=page_url)
 
+    def get_invoice_status(self, provider_invoice_id: str) -> WebhookEvent:
+        try:
+            data = self._call(
+                "GET", "/api/merchant/invoice/status", params={"invoiceId": provider_invoice_id}
+            ).json()
+        except requests.RequestException as exc:
+            raise PaymentError(f"Monobank status request failed: {exc}") from exc
+        except ValueError as exc:
+            raise PaymentError("Monobank returned a non-JSON response") from exc
+        if not isinstance(data, dict) or "status" not in data:
+            raise PaymentError(f"Unexpected Monobank response: {data!r}")
+        # The status answer has the same shape as the webhook body.
+        return self.parse_webhook({**data, "invoiceId": provider_invoice_id})
+
+    def cancel_invoice(self, provider_invoice_id: str) -> None:
+        try:
+            self._call(
+                "POST", "/api/merchant/invoice/remove", json={"invoiceId": provider_invoice_id}
+            )
+        except requests.RequestException as exc:
+            raise PaymentError(f"Monobank invoice removal failed: {exc}") from exc
+
     def verify_webhook(self, body: bytes, headers: Mapping[str, str]) -> bool:
         """Check the X-Sign header: ECDSA/SHA-256 over the raw request body."""
         if not settings.MONOBANK_VERIFY_WEBHOOK:
@@ -99,34 +169,56 @@ class MonobankPaymentProvider(PaymentProvider):
             return False
 
         try:
-            public_key = self._public_key()
-            public_key.verify(base64.b64decode(signature), body, ec.ECDSA(hashes.SHA256()))
+            decoded = base64.b64decode(signature)
+            try:
+                self._public_key().verify(decoded, body, _SIGNATURE_ALGORITHM)
+            except InvalidSignature:
+                # Perhaps the key has been rotated: check against a fresh copy,
+                # unless the one in hand is itself fresh.
+                if time.monotonic() - self._key_loaded_at < _PUBKEY_REFETCH_INTERVAL:
+                    raise
+                self._public_key(refresh=True).verify(decoded, body, _SIGNATURE_ALGORITHM)
         except (InvalidSignature, ValueError, TypeError) as exc:
             logger.warning("Monobank webhook rejected: %s", exc)
             return False
         return True
 
-    def _public_key(self) -> ec.EllipticCurvePublicKey:
-        """Fetch (and cache) the merchant public key used to sign webhooks."""
-        pem = cache.get(_PUBKEY_CACHE_KEY)
-        if pem is None:
-            try:
-                response = requests.get(
-                    f"{self.api_url}/api/merchant/pubkey",
-                    headers=self._headers,
-                    timeout=_REQUEST_TIMEOUT,
-                )
-                response.raise_for_status()
-                key_b64 = response.json()["key"]
-            except (requests.RequestException, ValueError, KeyError) as exc:
-                raise PaymentError(f"Could not fetch Monobank public key: {exc}") from exc
-            pem = base64.b64decode(key_b64)
-            cache.set(_PUBKEY_CACHE_KEY, pem, _PUBKEY_CACHE_TTL)
-
-        key = serialization.load_pem_public_key(pem)
-        if not isinstance(key, ec.EllipticCurvePublicKey):
-            raise PaymentError("Monobank public key is not an EC key")
-        return key
+    def _public_key(self, *, refresh: bool = False) -> ec.EllipticCurvePublicKey:
+        """The merchant public key used to sign webhooks, parsed and kept in memory.
+
+        The parsed key is reused for :data:`_PUBKEY_MEMORY_TTL`; after that the
+        PEM is read back from the shared cache, and only fetched from the API
+        when the cache has none. Threads that miss together wait for one of
+        them to load it. ``refresh`` skips both caches and fetches the key
+        anew, unless another thread did so while this one waited.
+        """
+        asked_at = time.monotonic()
+        key = self._key
+        if key is not None and not refresh and asked_at - self._key_loaded_at < _PUBKEY_MEMORY_TTL:
+            return key
+
+        with self._key_lock:
+            loaded_at = self._key_loaded_at
+            if self._key is not None and (
+                loaded_at >= asked_at
+                or (not refresh and time.monotonic() - loaded_at < _PUBKEY_MEMORY_TTL)
+            ):
+                return self._key
+
+            pem = None if refresh else cache.get(_PUBKEY_CACHE_KEY)
+            if pem is None:
+                try:
+                    key_b64 = self._call("GET", "/api/merchant/pubkey").json()["key"]
+                except (requests.RequestException, ValueError, KeyError) as exc:
+                    raise PaymentError(f"Could not fetch Monobank public key: {exc}") from exc
+                pem = base64.b64decode(key_b64)
+                cache.set(_PUBKEY_CACHE_KEY, pem, _PUBKEY_CACHE_TTL)
+
+            key = serialization.load_pem_public_key(pem)
+            if not isinstance(key, ec.EllipticCurvePublicKey):
+                raise PaymentError("Monobank public key is not an EC key")
+            self._key, self._key_loaded_at = key, time.monotonic()
+            return key
 
     def parse_webhook(self, payload: Mapping[str, object]) -> WebhookEvent:
         raw_status = str(payload.get("status", "")).lower()
@@ -0,0 +1,169 @@
+"""List pages built from ``values()`` rows instead of model instances.
+
+Serializing a page through a ``ModelSerializer`` builds a model instance per
+row, then walks every field of every row through ``get_attribute`` and
+``to_representation``; on the catalogue lists that costs more CPU than the
+queries do. A projection reads just the columns the serializer shows, in the
+same query, and writes each output dict directly: plain columns are copied,
+only the values whose JSON form differs from the database's (decimals,
+datetimes) go through the serializer's own field, and a room's amenities
+arrive in one extra query for the whole page.
+
+Each projection must render exactly what its ``serializer_class`` renders;
+``hotel/tests/test_projections.py`` holds them to it byte for byte. A field
+added to the serializer and not to its projection stops the projection's
+class from being defined, rather than failing the list request that first
+asks for it.
+"""
+
+from __future__ import annotations
+
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+
+from .models import Room
+from .serializers import HotelSerializer, ReviewSerializer, RoomSerializer
+from .stats import RATINGS
+
+# Fields whose JSON form is not the value the database driver hands back.
+_FORMATTED = (serializers.DecimalField, serializers.DateTimeField, serializers.DateField)
+
+
+class Projection:
+    """Renders rows of :meth:`rows` as ``serializer_class`` renders instances."""
+
+    serializer_class: type[serializers.Serializer]
+    # Output field -> values() lookup, for the fields copied off a row.
+    columns: dict[str, str] = {}
+    # Computed field -> the lookups it reads.
+    computed_lookups: dict[str, tuple[str, ...]] = {}
+    # Read whatever the fields: the id, and what cursor pagination orders by.
+    required_lookups: tuple[str, ...] = ("id",)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        readable = {
+            name for name, field in cls.serializer_class().fields.items() if not field.write_only
+        }
+        missing = readable - cls.columns.keys() - cls.computed_lookups.keys()
+        if missing:
+            raise ImproperlyConfigured(
+                f"{cls.__name__} does not project {', '.join(sorted(missing))} "
+                f"of {cls.serializer_class.__name__}."
+            )
+
+    def __init__(self, fields: frozenset[str] | None = None):
+        declared = self.serializer_class().fields
+        self.fields = [
+            name
+            for name, field in declared.items()
+            if not field.write_only and (fields is None or name in fields)
+        ]
+        self._formatters = {
+            name: declared[name].to_representation
+            for name in self.columns
+            if isinstance(declared[name], _FORMATTED)
+        }
+
+    def rows(self, queryset):
+        lookups = list(self.required_lookups)
+        for name in self.fields:
+            if name in self.columns:
+                lookups.append(self.columns[name])
+            else:
+                lookups.extend(self.computed_lookups.get(name, ()))
+        return queryset.prefetch_related(None).values(*dict.fromkeys(lookups))
+
+    def represent(self, rows) -> list[dict]:
+        rows = list(rows)
+        getters = [(name, self._getter(name, rows)) for name in self.fields]
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+    def _getter(self, name, rows):
+        if name not in self.columns:
+            return self.computed(name, rows)
+        lookup = self.columns[name]
+        formatter = self._formatters.get(name)
+        if formatter is None:
+            return itemgetter(lookup)
+        return lambda row: None if row[lookup] is None else formatter(row[lookup])
+
+    def computed(self, name: str, rows: list[dict]):
+        """A function of a row for field ``name``, which is not a plain column."""
+        raise NotImplementedError(name)
+
+
+class HotelProjection(Projection):
+    serializer_class = HotelSerializer
+    columns = {
+        "id": "id",
+        "name": "name",
+        "location": "location",
+        "description": "description",
+        "average_rating": "average_rating",
+        "review_count": "review_count",
+        "room_count": "room_count",
+        "min_price_per_night": "min_price_per_night",
+    }
+    computed_lookups = {"rating_histogram": tuple(f"ratings_{rating}" for rating in RATINGS)}
+
+    def computed(self, name, rows):
+        if name != "rating_histogram":
+            return super().computed(name, rows)
+        # DictField's keys are strings.
+        return lambda row: {str(rating): row[f"ratings_{rating}"] for rating in RATINGS}
+
+
+class RoomProjection(Projection):
+    serializer_class = RoomSerializer
+    columns = {
+        "id": "id",
+        "hotel": "hotel_id",
+        "hotel_name": "hotel__name",
+        "room_number": "room_number",
+        "room_type": "room_type_id",
+        "room_type_name": "room_type__name",
+        "price_per_night": "price_per_night",
+        "is_available": "is_available",
+        "max_guests": "max_guests",
+    }
+    # Read by a query of their own, for the whole page.
+    computed_lookups = {"amenities": (), "amenities_detail": ()}
+
+    def computed(self, name, rows):
+        if name not in ("amenities", "amenities_detail"):
+            return super().computed(name, rows)
+        if not hasattr(self, "_amenities"):
+            self._amenities = {}
+            # Ordered as Amenity's Meta.ordering orders the prefetch.
+            links = (
+                Room.amenities.through.objects.filter(room_id__in=[row["id"] for row in rows])
+                .order_by("amenity__name")
+                .values_list("room_id", "amenity_id", "amenity__name", "amenity__description")
+            )
+            for room_id, *amenity in links:
+                self._amenities.setdefault(room_id, []).append(amenity)
+        if name == "amenities":
+            return lambda row: [pk for pk, _, _ in self._amenities.get(row["id"], ())]
+        return lambda row: [
+            {"id": pk, "name": title, "description": description}
+            for pk, title, description in self._amenities.get(row["id"], ())
+        ]
+
+
+class ReviewProjection(Projection):
+    serializer_class = ReviewSerializer
+    # The reviews page with a cursor, on these (hotel.pagination).
+    required_lookups = ("id", "created_at", "rating")
+    columns = {
+        "id": "id",
+        "user": "user_id",
+        "username": "user__username",
+        "hotel": "hotel_id",
+        "rating": "rating",
+        "comment": "comment",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+    }
@@ -0,0 +1,27 @@
+"""Rendered responses, kept in two levels: this process, then the shared cache.
+
+The per-process level answers repeat requests without a network round trip;
+the shared level lets one worker reuse what another has rendered. Keys are
+expected to embed whatever versions the content depends on, so an entry is
+never invalidated, only superseded, and both levels can hold it for the same
+time.
+"""
+
+from __future__ import annotations
+
+from django.core.cache import caches
+
+
+def get(key: str):
+    local = caches["local"]
+    value = local.get(key)
+    if value is None:
+        value = caches["default"].get(key)
+        if value is not None:
+            local.set(key, value)
+    return value
+
+
+def set(key: str, value, timeout: int) -> None:  # noqa: A001 - mirrors the cache API
+    caches["default"].set(key, value, timeout)
+    caches["local"].set(key, value, timeout)
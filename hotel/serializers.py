@@ -3,42 +3,83 @@ from __future__ import annotations
 from django.utils import timezone
 from rest_framework import serializers
 
+from .fieldsets import SparseFieldsetMixin
 from .models import Amenity, Booking, Hotel, Payment, Review, Room, RoomType
 from .payments import PaymentError
 from .services import NoRoomAvailable, create_booking, find_available_rooms
 
 # Guard against typos like a 2027 check-out on a 2025 check-in.
 MAX_STAY_NIGHTS = 30
+# A year ahead is as far as any date picker needs to look.
+MAX_CALENDAR_DAYS = 366
+# "Around these dates" means within a week either way.
+MAX_FLEX_DAYS = 7
+# A group larger than this is a block booking, arranged with the hotel directly.
+MAX_ROOMS_PER_BOOKING = 10
+# Enough for a channel manager's sweep, small enough to answer in one request.
+MAX_BATCH_QUERIES = 500
 
 
-class AmenitySerializer(serializers.ModelSerializer):
+class AmenitySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Amenity
         fields = ("id", "name", "description")
 
 
-class HotelSerializer(serializers.ModelSerializer):
-    average_rating = serializers.FloatField(read_only=True)
-    review_count = serializers.IntegerField(read_only=True)
+class HotelSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
 
     class Meta:
         model = Hotel
-        fields = ("id", "name", "location", "description", "average_rating", "review_count")
+        fields = (
+            "id",
+            "name",
+            "location",
+            "description",
+            "average_rating",
+            "review_count",
+            "rating_histogram",
+            "room_count",
+            "min_price_per_night",
+        )
+        read_only_fields = ("average_rating", "review_count", "room_count", "min_price_per_night")
 
 
-class RoomTypeSerializer(serializers.ModelSerializer):
+class RoomTypeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = RoomType
         fields = ("id", "name", "description")
 
 
-class RoomSerializer(serializers.ModelSerializer):
+class AvailableRoomTypeSerializer(RoomTypeSerializer):
+    """A room type with free rooms for a stay, and what the stay would cost."""
+
+    free_rooms = serializers.IntegerField(read_only=True)
+    min_price_per_night = serializers.DecimalField(max_digits=8, decimal_places=2, read_only=True)
+    max_price_per_night = serializers.DecimalField(max_digits=8, decimal_places=2, read_only=True)
+    min_total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    max_total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta(RoomTypeSerializer.Meta):
+        fields = (
+            *RoomTypeSerializer.Meta.fields,
+            "free_rooms",
+            "min_price_per_night",
+            "max_price_per_night",
+            "min_total_price",
+            "max_total_price",
+        )
+
+
+class RoomSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Readable nested output, but plain ids on write."""
 
     hotel_name = serializers.CharField(source="hotel.name", read_only=True)
     room_type_name = serializers.CharField(source="room_type.name", read_only=True)
     amenities_detail = AmenitySerializer(source="amenities", many=True, read_only=True)
 
+    expandable_fields = {"hotel": HotelSerializer, "room_type": RoomTypeSerializer}
+
     class Meta:
         model = Room
         fields = (
@@ -67,7 +108,7 @@ class RoomSummarySerializer(serializers.ModelSerializer):
         fields = ("id", "room_number", "hotel_name", "room_type_name", "price_per_night")
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = (
@@ -95,14 +136,30 @@ class BookingPaymentSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingLineSerializer(serializers.Serializer):
+    room_type = serializers.PrimaryKeyRelatedField(queryset=RoomType.objects.all())
+    count = serializers.IntegerField(min_value=1, max_value=MAX_ROOMS_PER_BOOKING)
+
+
+class BookingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     hotel = serializers.PrimaryKeyRelatedField(queryset=Hotel.objects.all())
-    room_type = serializers.PrimaryKeyRelatedField(queryset=RoomType.objects.all(), write_only=True)
+    room_type = serializers.PrimaryKeyRelatedField(
+        queryset=RoomType.objects.all(), write_only=True, required=False
+    )
+    lines = BookingLineSerializer(
+        many=True,
+        write_only=True,
+        required=False,
+        allow_empty=False,
+        help_text="For a group: rooms to book per room type, instead of `room_type`.",
+    )
     hotel_name = serializers.CharField(source="hotel.name", read_only=True)
     rooms = RoomSummarySerializer(many=True, read_only=True)
     payment = BookingPaymentSerializer(read_only=True)
     nights = serializers.IntegerField(read_only=True)
 
+    expandable_fields = {"hotel": HotelSerializer}
+
     class Meta:
         model = Booking
         fields = (
@@ -110,6 +167,7 @@ class BookingSerializer(serializers.ModelSerializer):
             "hotel",
             "hotel_name",
             "room_type",
+            "lines",
             "check_in",
             "check_out",
             "nights",
@@ -135,19 +193,54 @@ class BookingSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 {"check_out": f"A stay cannot exceed {MAX_STAY_NIGHTS} nights."}
             )
+        if ("room_type" in attrs) == ("lines" in attrs):
+            raise serializers.ValidationError("Give either room_type or lines.")
 
         # Advisory check so the client gets a clear 400 instead of a surprise
         # later; the binding check happens under a row lock in the service.
-        available = find_available_rooms(
-            hotel=attrs["hotel"],
-            room_type=attrs["room_type"],
-            check_in=check_in,
-            check_out=check_out,
-            guests=guests,
-        )
-        if not available.exists():
+        if "room_type" in attrs:
+            available = find_available_rooms(
+                hotel=attrs["hotel"],
+                room_type=attrs["room_type"],
+                check_in=check_in,
+                check_out=check_out,
+                guests=guests,
+            )
+            if not available.exists():
+                raise serializers.ValidationError(
+                    "No available rooms of the requested type for these dates and party size."
+                )
+            return attrs
+
+        wanted: dict[RoomType, int] = {}
+        for line in attrs["lines"]:
+            wanted[line["room_type"]] = wanted.get(line["room_type"], 0) + line["count"]
+        if sum(wanted.values()) > MAX_ROOMS_PER_BOOKING:
+            raise serializers.ValidationError(
+                {"lines": f"A booking cannot hold more than {MAX_ROOMS_PER_BOOKING} rooms."}
+            )
+        beds = 0
+        for room_type, count in wanted.items():
+            # The largest free rooms, to tell whether the group could fit at all.
+            sleeps = list(
+                find_available_rooms(
+                    hotel=attrs["hotel"],
+                    room_type=room_type,
+                    check_in=check_in,
+                    check_out=check_out,
+                    guests=1,
+                )
+                .order_by("-max_guests")
+                .values_list("max_guests", flat=True)[:count]
+            )
+            if len(sleeps) < count:
+                raise serializers.ValidationError(
+                    {"lines": f"Fewer than {count} rooms of type {room_type.name!r} are free."}
+                )
+            beds += sum(sleeps)
+        if beds < guests:
             raise serializers.ValidationError(
-                "No available rooms of the requested type for these dates and party size."
+                {"lines": f"These rooms cannot sleep a party of {guests}."}
             )
         return attrs
 
@@ -156,7 +249,10 @@ class BookingSerializer(serializers.ModelSerializer):
             return create_booking(
                 user=validated_data["user"],
                 hotel=validated_data["hotel"],
-                room_type=validated_data["room_type"],
+                room_type=validated_data.get("room_type"),
+                lines=[
+                    (line["room_type"], line["count"]) for line in validated_data.get("lines", ())
+                ],
                 check_in=validated_data["check_in"],
                 check_out=validated_data["check_out"],
                 adults=validated_data["adults"],
@@ -169,10 +265,12 @@ class BookingSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f"Could not initiate payment: {exc}") from exc
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     username = serializers.CharField(source="user.username", read_only=True)
 
+    expandable_fields = {"hotel": HotelSerializer}
+
     class Meta:
         model = Review
         fields = (
@@ -199,7 +297,21 @@ class ReviewSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class AvailabilityQuerySerializer(serializers.Serializer):
+class StayQuerySerializer(serializers.Serializer):
+    """The dates and party size shared by every availability query."""
+
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    adults = serializers.IntegerField(min_value=1, default=1)
+    children = serializers.IntegerField(min_value=0, default=0)
+
+    def validate(self, attrs):
+        if attrs["check_out"] <= attrs["check_in"]:
+            raise serializers.ValidationError({"check_out": "Check-out must be after check-in."})
+        return attrs
+
+
+class AvailabilityQuerySerializer(StayQuerySerializer):
     """Validates the query string of the availability endpoint.
 
     Previously these parameters were parsed inline, so any malformed value
@@ -207,12 +319,130 @@ class AvailabilityQuerySerializer(serializers.Serializer):
     """
 
     hotel = serializers.PrimaryKeyRelatedField(queryset=Hotel.objects.all())
+
+
+class AvailabilitySearchQuerySerializer(StayQuerySerializer):
+    location = serializers.CharField(max_length=255)
+
+
+class BatchQuerySerializer(StayQuerySerializer):
+    # A plain id rather than a related field, which would look each hotel up
+    # on its own; the batch checks them all with one query instead.
+    hotel = serializers.IntegerField(min_value=1)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs["check_in"] < timezone.localdate():
+            raise serializers.ValidationError({"check_in": "Check-in date cannot be in the past."})
+        if (attrs["check_out"] - attrs["check_in"]).days > MAX_STAY_NIGHTS:
+            raise serializers.ValidationError(
+                {"check_out": f"A stay cannot exceed {MAX_STAY_NIGHTS} nights."}
+            )
+        return attrs
+
+
+class AvailabilityBatchSerializer(serializers.Serializer):
+    queries = BatchQuerySerializer(many=True, allow_empty=False, max_length=MAX_BATCH_QUERIES)
+
+    def validate_queries(self, queries):
+        known = set(
+            Hotel.objects.filter(pk__in={query["hotel"] for query in queries}).values_list(
+                "pk", flat=True
+            )
+        )
+        # Keyed by position, like DRF's own errors for the items of a list.
+        errors = {
+            position: {"hotel": [f'Invalid pk "{query["hotel"]}" - object does not exist.']}
+            for position, query in enumerate(queries)
+            if query["hotel"] not in known
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        # The held nights are read across each hotel's queries at once, so
+        # the span between its first check-in and last check-out is bounded.
+        windows: dict[int, tuple] = {}
+        for query in queries:
+            first, last = windows.get(query["hotel"], (query["check_in"], query["check_out"]))
+            windows[query["hotel"]] = (min(first, query["check_in"]), max(last, query["check_out"]))
+        for hotel, (first, last) in windows.items():
+            if (last - first).days > MAX_CALENDAR_DAYS:
+                raise serializers.ValidationError(
+                    f"The queries for hotel {hotel} span more than {MAX_CALENDAR_DAYS} days."
+                )
+        return queries
+
+
+class FlexibleQuerySerializer(StayQuerySerializer):
+    hotel = serializers.PrimaryKeyRelatedField(queryset=Hotel.objects.all())
+    room_type = serializers.PrimaryKeyRelatedField(
+        queryset=RoomType.objects.all(), required=False, default=None
+    )
+    flex_days = serializers.IntegerField(min_value=1, max_value=MAX_FLEX_DAYS, default=3)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if (attrs["check_out"] - attrs["check_in"]).days > MAX_STAY_NIGHTS:
+            raise serializers.ValidationError(
+                {"check_out": f"A stay cannot exceed {MAX_STAY_NIGHTS} nights."}
+            )
+        return attrs
+
+
+class FlexibleStaySerializer(serializers.Serializer):
+    """A start date near the requested one with a free room, and its price."""
+
     check_in = serializers.DateField()
     check_out = serializers.DateField()
+    offset = serializers.IntegerField(help_text="Days from the requested check-in.")
+    free_rooms = serializers.IntegerField()
+    min_price_per_night = serializers.DecimalField(max_digits=8, decimal_places=2)
+    min_total_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class RoomTypeAvailabilitySerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    free_rooms = serializers.IntegerField()
+    min_price_per_night = serializers.DecimalField(max_digits=8, decimal_places=2)
+
+
+class HotelAvailabilitySerializer(serializers.Serializer):
+    """One hotel in a location-wide availability search."""
+
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    location = serializers.CharField()
+    min_price_per_night = serializers.DecimalField(max_digits=8, decimal_places=2)
+    room_types = RoomTypeAvailabilitySerializer(many=True)
+
+
+class CalendarQuerySerializer(serializers.Serializer):
+    hotel = serializers.PrimaryKeyRelatedField(queryset=Hotel.objects.all())
+    start = serializers.DateField(default=timezone.localdate)
+    days = serializers.IntegerField(min_value=1, max_value=MAX_CALENDAR_DAYS, default=90)
     adults = serializers.IntegerField(min_value=1, default=1)
     children = serializers.IntegerField(min_value=0, default=0)
 
-    def validate(self, attrs):
-        if attrs["check_out"] <= attrs["check_in"]:
-            raise serializers.ValidationError({"check_out": "Check-out must be after check-in."})
-        return attrs
+
+class RoomTypeCalendarSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    total_rooms = serializers.IntegerField()
+    free = serializers.ListField(
+        child=serializers.IntegerField(), help_text="Free rooms on each day from `start`."
+    )
+
+
+class AvailabilityCalendarSerializer(serializers.Serializer):
+    hotel = serializers.IntegerField()
+    start = serializers.DateField()
+    days = serializers.IntegerField()
+    room_types = RoomTypeCalendarSerializer(many=True)
+
+
+class AvailabilityBatchResultSerializer(serializers.Serializer):
+    results = serializers.ListField(
+        child=AvailableRoomTypeSerializer(many=True),
+        help_text="One list of available room types per query, in the order asked.",
+    )
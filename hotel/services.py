@@ -8,15 +8,42 @@ from __future__ import annotations
 
 import logging
 import uuid
-from datetime import date
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 
 from django.conf import settings
-from django.db import connection, transaction
-from django.db.models import QuerySet
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import (
+    Count,
+    DecimalField,
+    Exists,
+    ExpressionWrapper,
+    Max,
+    Min,
+    OuterRef,
+    Q,
+    QuerySet,
+    Value,
+)
 from django.utils import timezone
 
-from .models import Booking, Hotel, Payment, Room, RoomType
-from .payments import InvoiceRequest, PaymentError, WebhookEvent, get_payment_provider
+from . import availability_index, versions
+from .models import (
+    Booking,
+    Hotel,
+    Payment,
+    PaymentOutbox,
+    Room,
+    RoomNight,
+    RoomType,
+    WebhookInbox,
+)
+from .occupancy import BEST_FIT_REACH, best_fit_order, free_counts, free_windows
+from .payments import Invoice, InvoiceRequest, PaymentError, WebhookEvent, get_payment_provider
+from .payments.http import RateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -25,15 +52,18 @@ class NoRoomAvailable(Exception):
     """No room of the requested type is free for the requested dates."""
 
 
-def _for_update(queryset: QuerySet) -> QuerySet:
+def _for_update(queryset: QuerySet, *, skip_locked: bool = False) -> QuerySet:
     """Lock the selected rows, where the backend can.
 
     SQLite has no SELECT ... FOR UPDATE and raises if asked for one, but it
     serialises write transactions anyway, so skipping the lock is safe there.
+    With ``skip_locked``, rows another transaction has locked are left out of
+    the result instead of waited for, on backends that support it.
     """
-    if connection.features.has_select_for_update:
-        return queryset.select_for_update()
-    return queryset
+    if not connection.features.has_select_for_update:
+        return queryset
+    skip_locked = skip_locked and connection.features.has_select_for_update_skip_locked
+    return queryset.select_for_update(skip_locked=skip_locked)
 
 
 def rooms_matching(*, hotel: Hotel, room_type: RoomType | None, guests: int) -> QuerySet[Room]:
@@ -44,17 +74,54 @@ def rooms_matching(*, hotel: Hotel, room_type: RoomType | None, guests: int) ->
     return queryset
 
 
-def _occupied_room_ids(check_in: date, check_out: date) -> QuerySet:
-    """Ids of rooms held by a booking overlapping the requested nights.
+def _held_nights(check_in: date, check_out: date) -> QuerySet[RoomNight]:
+    """Nights of the requested stay that a booking already holds.
 
-    Two stays overlap when each starts before the other ends. Cancelled
-    bookings release their rooms and are therefore ignored.
+    Only bookings that still hold their rooms have nights on record, so
+    cancelled stays need no filtering here. The check-out date is not a night
+    of the stay, which is what lets back-to-back stays share a room.
     """
-    return (
-        Booking.objects.exclude(status__in=Booking.RELEASING_STATUSES)
-        .filter(check_in__lt=check_out, check_out__gt=check_in)
-        .values_list("rooms__id", flat=True)
-    )
+    return RoomNight.objects.filter(night__gte=check_in, night__lt=check_out)
+
+
+def _without_held_nights(rooms: QuerySet[Room], check_in: date, check_out: date) -> QuerySet[Room]:
+    """Narrow ``rooms`` to those free for every night of the stay."""
+    return rooms.filter(~Exists(_held_nights(check_in, check_out).filter(room=OuterRef("pk"))))
+
+
+def _stay_nights(check_in: date, check_out: date) -> list[date]:
+    return [check_in + timedelta(days=offset) for offset in range((check_out - check_in).days)]
+
+
+def _hold_nights(booking: Booking, rooms: Iterable[Room]) -> None:
+    """Record every night of the booking against each of the given rooms.
+
+    Raises :class:`NoRoomAvailable` if one of those nights is already held:
+    the unique (room, night) constraint rejects the insert.
+    """
+    nights = _stay_nights(booking.check_in, booking.check_out)
+    try:
+        with transaction.atomic():
+            RoomNight.objects.bulk_create(
+                RoomNight(room=room, booking=booking, night=night)
+                for room in rooms
+                for night in nights
+            )
+    except IntegrityError as exc:
+        raise NoRoomAvailable("The room was taken for the selected dates.") from exc
+
+
+def sync_room_nights(booking: Booking) -> None:
+    """Bring the nights a booking holds in line with its rooms and status.
+
+    For bookings written outside this module — demo data, the admin — which
+    bypass the reservation path that normally records the nights.
+    """
+    with transaction.atomic():
+        booking.room_nights.all().delete()
+        if booking.status not in Booking.RELEASING_STATUSES:
+            _hold_nights(booking, booking.rooms.all())
+        versions.bump_on_commit(versions.occupancy_key(booking.hotel_id))
 
 
 def find_available_rooms(
@@ -70,17 +137,32 @@ def find_available_rooms(
     A single query replaces the previous per-room Python loop. This is the
     read-only view used by the availability endpoint and by serializer
     validation; committing to a room goes through :func:`_reserve`, which locks
-    first.
+    first. With the in-process availability index switched on, the answer
+    comes from there and the query is a primary-key lookup.
     """
-    return rooms_matching(hotel=hotel, room_type=room_type, guests=guests).exclude(
-        id__in=_occupied_room_ids(check_in, check_out)
+    indexed = availability_index.free_rooms(
+        hotel_id=hotel.pk,
+        room_type_id=room_type.pk if room_type is not None else None,
+        check_in=check_in,
+        check_out=check_out,
+        guests=guests,
+    )
+    if indexed is not None:
+        return Room.objects.filter(id__in=[room.id for room in indexed])
+    return _without_held_nights(
+        rooms_matching(hotel=hotel, room_type=room_type, guests=guests), check_in, check_out
     )
 
 
 def available_room_types(
     *, hotel: Hotel, check_in: date, check_out: date, guests: int
 ) -> QuerySet[RoomType]:
-    """Room types with at least one bookable room for the requested stay."""
+    """Room types with at least one bookable room for the requested stay.
+
+    Each type is annotated with ``free_rooms``, the lowest and highest nightly
+    price among them, and what the stay costs in the cheapest and the dearest
+    of them, all computed by one query grouped by room type.
+    """
     available = find_available_rooms(
         hotel=hotel,
         room_type=None,
@@ -88,48 +170,446 @@ def available_room_types(
         check_out=check_out,
         guests=guests,
     )
-    return RoomType.objects.filter(
-        id__in=available.values_list("room_type_id", flat=True)
-    ).distinct()
+    nights = Value((check_out - check_in).days)
+    stay_price = DecimalField(max_digits=10, decimal_places=2)
+    # Filtering on the relation before annotating makes the aggregates count
+    # only the rooms that passed the filter.
+    return (
+        RoomType.objects.filter(rooms__in=available)
+        .annotate(
+            free_rooms=Count("rooms"),
+            min_price_per_night=Min("rooms__price_per_night"),
+            max_price_per_night=Max("rooms__price_per_night"),
+        )
+        .annotate(
+            min_total_price=ExpressionWrapper(
+                Min("rooms__price_per_night") * nights, output_field=stay_price
+            ),
+            max_total_price=ExpressionWrapper(
+                Max("rooms__price_per_night") * nights, output_field=stay_price
+            ),
+        )
+        .order_by("name")
+    )
 
 
-@transaction.atomic
-def _reserve(
+def batch_available_room_types(queries: list[dict]) -> list[list[dict]]:
+    """:func:`available_room_types` for many stays at once, answered in order.
+
+    Each query is a dict with ``hotel_id``, ``check_in``, ``check_out`` and
+    ``guests``. However many there are, two queries fetch everything: the
+    in-service rooms of every hotel involved, and the nights held among them
+    between each hotel's earliest check-in and latest check-out. Each answer
+    is a list of dicts shaped like the annotated room types.
+
+    The callers bound that window: ``AvailabilityBatchSerializer`` refuses a
+    hotel whose queries span more than ``MAX_CALENDAR_DAYS``.
+    """
+    if not queries:
+        return []
+
+    windows: dict[int, tuple[date, date]] = {}
+    for query in queries:
+        first, last = windows.get(query["hotel_id"], (query["check_in"], query["check_out"]))
+        windows[query["hotel_id"]] = (
+            min(first, query["check_in"]),
+            max(last, query["check_out"]),
+        )
+
+    rooms_by_hotel: dict[int, list[dict]] = defaultdict(list)
+    for room in (
+        Room.objects.filter(hotel_id__in=windows, is_available=True)
+        .order_by("room_type__name", "room_number")
+        .values(
+            "id",
+            "hotel_id",
+            "room_type_id",
+            "room_type__name",
+            "room_type__description",
+            "price_per_night",
+            "max_guests",
+        )
+    ):
+        rooms_by_hotel[room["hotel_id"]].append(room)
+
+    in_windows = Q()
+    for hotel_id, (first, last) in windows.items():
+        in_windows |= Q(room__hotel_id=hotel_id, night__gte=first, night__lt=last)
+    held: dict[int, list[date]] = defaultdict(list)
+    for room_id, night in (
+        RoomNight.objects.filter(in_windows).order_by("night").values_list("room_id", "night")
+    ):
+        held[room_id].append(night)
+
+    answers = []
+    for query in queries:
+        nights = (query["check_out"] - query["check_in"]).days
+        types: dict[int, dict] = {}
+        for room in rooms_by_hotel[query["hotel_id"]]:
+            if room["max_guests"] < query["guests"]:
+                continue
+            room_nights = held[room["id"]]
+            # The first held night on or after check-in must come after the stay.
+            position = bisect_left(room_nights, query["check_in"])
+            if position < len(room_nights) and room_nights[position] < query["check_out"]:
+                continue
+            price = room["price_per_night"]
+            entry = types.get(room["room_type_id"])
+            if entry is None:
+                types[room["room_type_id"]] = {
+                    "id": room["room_type_id"],
+                    "name": room["room_type__name"],
+                    "description": room["room_type__description"],
+                    "free_rooms": 1,
+                    "min_price_per_night": price,
+                    "max_price_per_night": price,
+                }
+            else:
+                entry["free_rooms"] += 1
+                entry["min_price_per_night"] = min(entry["min_price_per_night"], price)
+                entry["max_price_per_night"] = max(entry["max_price_per_night"], price)
+        for entry in types.values():
+            entry["min_total_price"] = entry["min_price_per_night"] * nights
+            entry["max_total_price"] = entry["max_price_per_night"] * nights
+        answers.append(list(types.values()))
+    return answers
+
+
+def search_availability(
+    *, location: str, check_in: date, check_out: date, guests: int
+) -> list[dict]:
+    """Hotels in a location with a free room for the stay, by hotel name.
+
+    One grouped query yields a row per (hotel, room type) with the number of
+    free rooms and the lowest nightly price; the rows are then folded into one
+    entry per hotel. Hotels with nothing free do not appear at all.
+    """
+    rooms = Room.objects.filter(hotel__location=location, is_available=True, max_guests__gte=guests)
+    rows = (
+        _without_held_nights(rooms, check_in, check_out)
+        .values("hotel_id", "hotel__name", "hotel__location", "room_type_id", "room_type__name")
+        .annotate(free_rooms=Count("id"), min_price_per_night=Min("price_per_night"))
+        .order_by("hotel__name", "hotel_id", "room_type__name")
+    )
+
+    hotels: dict[int, dict] = {}
+    for row in rows:
+        hotel = hotels.setdefault(
+            row["hotel_id"],
+            {
+                "id": row["hotel_id"],
+                "name": row["hotel__name"],
+                "location": row["hotel__location"],
+                "min_price_per_night": row["min_price_per_night"],
+                "room_types": [],
+            },
+        )
+        hotel["min_price_per_night"] = min(hotel["min_price_per_night"], row["min_price_per_night"])
+        hotel["room_types"].append(
+            {
+                "id": row["room_type_id"],
+                "name": row["room_type__name"],
+                "free_rooms": row["free_rooms"],
+                "min_price_per_night": row["min_price_per_night"],
+            }
+        )
+    return list(hotels.values())
+
+
+def availability_calendar(*, hotel: Hotel, start: date, days: int, guests: int) -> list[dict]:
+    """Free rooms of each type in a hotel for every day of a window.
+
+    Two queries regardless of the window's length: one counts the matching
+    rooms per type, the other fetches each room booked during the window with
+    the dates of its booking. The per-day counts are then computed in memory.
+    """
+    rooms = rooms_matching(hotel=hotel, room_type=None, guests=guests)
+    room_types = list(
+        rooms.values("room_type_id", "room_type__name")
+        .annotate(total_rooms=Count("id"))
+        .order_by("room_type__name")
+    )
+    end = start + timedelta(days=days)
+    stays = (
+        Booking.rooms.through.objects.filter(
+            room__in=rooms, booking__check_in__lt=end, booking__check_out__gt=start
+        )
+        .exclude(booking__status__in=Booking.RELEASING_STATUSES)
+        .values_list("room__room_type_id", "booking__check_in", "booking__check_out")
+    )
+    free = free_counts(
+        start=start,
+        days=days,
+        capacity={row["room_type_id"]: row["total_rooms"] for row in room_types},
+        stays=stays,
+    )
+    return [
+        {
+            "id": row["room_type_id"],
+            "name": row["room_type__name"],
+            "total_rooms": row["total_rooms"],
+            "free": free[row["room_type_id"]],
+        }
+        for row in room_types
+    ]
+
+
+def flexible_availability(
     *,
-    user,
     hotel: Hotel,
-    room_type: RoomType,
+    room_type: RoomType | None,
     check_in: date,
     check_out: date,
-    adults: int,
-    children: int,
-) -> Booking:
-    """Claim a room and record the booking together with a pending payment.
+    flex_days: int,
+    guests: int,
+) -> list[dict]:
+    """Every stay of the requested length starting within ``flex_days`` of
+    ``check_in`` that has a free room, nearest to the requested dates first.
+
+    Two queries cover the whole widened window — the candidate rooms with
+    their prices, and the nights already held among them — and each start
+    date is then checked in memory. Start dates in the past are skipped.
+    """
+    nights = (check_out - check_in).days
+    first_start = max(check_in - timedelta(days=flex_days), timezone.localdate())
+    last_start = check_in + timedelta(days=flex_days)
+    if first_start > last_start:
+        return []
+    starts = (last_start - first_start).days + 1
+
+    rooms = rooms_matching(hotel=hotel, room_type=room_type, guests=guests)
+    prices = dict(rooms.values_list("id", "price_per_night"))
+    held = RoomNight.objects.filter(
+        room__in=rooms,
+        night__gte=first_start,
+        night__lt=last_start + timedelta(days=nights),
+    ).values_list("room_id", "night")
+
+    windows = [
+        {
+            "check_in": start,
+            "check_out": start + timedelta(days=nights),
+            "offset": (start - check_in).days,
+            "free_rooms": free,
+            "min_price_per_night": price,
+            "min_total_price": price * nights,
+        }
+        for start, free, price in free_windows(
+            first_start=first_start, starts=starts, nights=nights, prices=prices, held=held
+        )
+    ]
+    # Nearest first; of two equally near, the earlier one.
+    windows.sort(key=lambda window: (abs(window["offset"]), window["offset"]))
+    return windows
+
+
+def _first_free(free: list[Room], *, check_in: date, check_out: date, held) -> list[Room]:
+    return free
+
+
+def _best_fit(free: list[Room], *, check_in: date, check_out: date, held) -> list[Room]:
+    return best_fit_order(
+        free, check_in=check_in, check_out=check_out, held=held, reach=BEST_FIT_REACH
+    )
+
 
-    Availability is re-checked here, inside the transaction and under a row
-    lock: the check performed during serializer validation is only advisory,
-    because another request may take the last room in between.
+# Order in which free rooms are handed out; see ROOM_ASSIGNMENT_STRATEGY.
+_ASSIGNMENT_STRATEGIES = {
+    "first_free": _first_free,
+    "best_fit": _best_fit,
+}
+
+
+def _free_candidates(
+    candidates: list[Room], booking: Booking, wanted: dict[int, int]
+) -> list[Room]:
+    """The candidates that hold none of the booking's nights, best first.
+
+    Which is best is up to ``settings.ROOM_ASSIGNMENT_STRATEGY``. Strategies
+    other than ``first_free`` look at the nights held around the stay too,
+    which the same query reads along with the stay's own. When the rooms the
+    strategy would pick cannot sleep the party between them, the largest
+    come first instead, as the serializer's advisory check counted them.
+    """
+    check_in, check_out = booking.check_in, booking.check_out
+    strategy = settings.ROOM_ASSIGNMENT_STRATEGY
+    reach = timedelta(days=0 if strategy == "first_free" else BEST_FIT_REACH)
+    by_id = {candidate.id: candidate for candidate in candidates}
+    held = [
+        (by_id[room_id], night)
+        for room_id, night in _held_nights(check_in - reach, check_out + reach)
+        .filter(room__in=candidates)
+        .values_list("room_id", "night")
+    ]
+    occupied = {room.id for room, night in held if check_in <= night < check_out}
+    free = [candidate for candidate in candidates if candidate.id not in occupied]
+    free = _ASSIGNMENT_STRATEGIES[strategy](free, check_in=check_in, check_out=check_out, held=held)
+    picked = _pick(free, wanted) or []
+    if sum(room.max_guests for room in picked) < booking.adults + booking.children:
+        # Stable, so rooms of one size keep the strategy's order.
+        free.sort(key=lambda room: -room.max_guests)
+    return free
+
+
+def _pick(free: list[Room], wanted: dict[int, int]) -> list[Room] | None:
+    """The first ``wanted[type]`` rooms of each type from ``free``, or ``None``."""
+    picked = []
+    for room_type_id, count in wanted.items():
+        of_type = [room for room in free if room.room_type_id == room_type_id][:count]
+        if len(of_type) < count:
+            return None
+        picked.extend(of_type)
+    return picked
+
+
+def _claim_locked(
+    booking: Booking, candidates: QuerySet[Room], wanted: dict[int, int]
+) -> list[Room] | None:
+    """Pick rooms with every candidate locked, so competing requests queue up.
 
     Order matters. Every candidate room is locked *before* occupancy is read,
     not as part of the same statement. A competing transaction can only commit
     its booking while holding these same rows, so by the time the lock is ours
     its work is committed and the following query — a new statement, and so a
     new snapshot under READ COMMITTED — sees it. Filtering and locking in one
-    statement would not be enough: the ``NOT IN`` subquery is evaluated when the
+    statement would not be enough: the occupancy subquery is evaluated when the
     statement starts, which is before the lock is granted.
+
+    The candidates of every room type are locked by that one statement, in
+    room-number order, so two group bookings cannot deadlock on each other.
     """
-    candidates = list(
-        _for_update(
-            rooms_matching(hotel=hotel, room_type=room_type, guests=adults + children)
-        ).order_by("room_number")
-    )
-    occupied = set(_occupied_room_ids(check_in, check_out))
-    room = next((candidate for candidate in candidates if candidate.id not in occupied), None)
+    locked = list(_for_update(candidates))
+    picked = _pick(_free_candidates(locked, booking, wanted), wanted)
+    if picked is None:
+        return None
+    _hold_nights(booking, picked)
+    return picked
 
-    if room is None:
-        raise NoRoomAvailable(
-            f"No available rooms of type {room_type.name!r} for the selected dates."
-        )
+
+def _claim_optimistically(
+    booking: Booking, candidates: QuerySet[Room], wanted: dict[int, int]
+) -> list[Room] | None:
+    """Pick rooms without locking anything, and let the database referee.
+
+    Occupancy is read from an unlocked snapshot and the nights of each free
+    room are inserted straight away. If a concurrent booking got there first,
+    the unique (room, night) constraint rejects the insert and the next
+    candidate is tried. Requests for different rooms never wait on each other;
+    two requests for the same room wait only for each other's insert.
+    """
+    missing = dict(wanted)
+    picked = []
+    for room in _free_candidates(list(candidates), booking, wanted):
+        if not missing.get(room.room_type_id):
+            continue
+        try:
+            _hold_nights(booking, [room])
+        except NoRoomAvailable:
+            continue
+        missing[room.room_type_id] -= 1
+        picked.append(room)
+    if any(missing.values()):
+        # The nights already held go with the rolled-back transaction.
+        return None
+    return picked
+
+
+def _claim_skipping_locked(
+    booking: Booking, candidates: QuerySet[Room], wanted: dict[int, int]
+) -> list[Room] | None:
+    """Pick rooms locking only the ones taken, and pass over rooms others hold.
+
+    Occupancy is read from an unlocked snapshot, and then each free room in
+    turn is locked on its own with SKIP LOCKED. A room another transaction
+    has locked is being booked by it, so it is skipped rather than waited for.
+    Once the lock is ours, the competing transaction that held it has
+    finished, and a fresh read of the room's nights — a new statement, and so
+    a new snapshot — tells whether it took the room first. Requests for the
+    same type but different dates lock different rooms and never queue.
+
+    A room skipped that way may still be free on our nights, the other
+    booking being for other dates. Rather than turn the request away while
+    such rooms remain, it waits for their locks, taken in one statement in
+    room-number order as the locking engine takes them, and reads again.
+    """
+    missing = dict(wanted)
+    picked = []
+
+    def take(room: Room) -> bool:
+        if _held_nights(booking.check_in, booking.check_out).filter(room=room).exists():
+            return False
+        try:
+            _hold_nights(booking, [room])
+        except NoRoomAvailable:
+            # Only when engines are mixed: a lock-free writer beat us to it.
+            return False
+        missing[room.room_type_id] -= 1
+        picked.append(room)
+        return True
+
+    skipped = []
+    for room in _free_candidates(list(candidates), booking, wanted):
+        if not missing.get(room.room_type_id):
+            continue
+        if not _for_update(Room.objects.filter(pk=room.pk), skip_locked=True).exists():
+            skipped.append(room)
+            continue
+        take(room)
+    if skipped and any(missing.values()):
+        waited_for = Room.objects.filter(pk__in=[room.pk for room in skipped])
+        list(_for_update(waited_for.order_by("room_number")))
+        for room in skipped:
+            if missing.get(room.room_type_id):
+                take(room)
+    if any(missing.values()):
+        return None
+    return picked
+
+
+_RESERVATION_ENGINES = {
+    "locking": _claim_locked,
+    "optimistic": _claim_optimistically,
+    "skip_locked": _claim_skipping_locked,
+}
+
+
+def _wanted_rooms(lines: Iterable[tuple[RoomType, int]]) -> dict[int, int]:
+    """Rooms to claim per room type id, with repeated types added together."""
+    wanted: dict[int, int] = {}
+    for room_type, count in lines:
+        wanted[room_type.pk] = wanted.get(room_type.pk, 0) + count
+    return wanted
+
+
+@transaction.atomic
+def _reserve(
+    *,
+    user,
+    hotel: Hotel,
+    lines: list[tuple[RoomType, int]],
+    check_in: date,
+    check_out: date,
+    adults: int,
+    children: int,
+) -> Booking:
+    """Claim the rooms and record the booking together with a pending payment.
+
+    Availability is re-checked here, inside the transaction: the check
+    performed during serializer validation is only advisory, because another
+    request may take the last room in between. ``settings.RESERVATION_ENGINE``
+    decides how competing requests are kept apart — by locking the candidate
+    rooms, or optimistically — and either way the nights written for each room
+    are the database's own check: should two transactions ever pick the same
+    room, the second insert fails on the unique (room, night) constraint
+    instead of selling the room twice.
+
+    A single room must sleep the whole party. The rooms of a group only have
+    to sleep it between them.
+    """
+    claim = _RESERVATION_ENGINES[settings.RESERVATION_ENGINE]
+    wanted = _wanted_rooms(lines)
+    guests = adults + children
+    group = sum(wanted.values()) > 1
 
     booking = Booking.objects.create(
         user=user,
@@ -140,10 +620,22 @@ def _reserve(
         children=children,
         status=Booking.Status.PENDING,
     )
-    booking.rooms.add(room)
+    candidates = rooms_matching(hotel=hotel, room_type=None, guests=1 if group else guests)
+    rooms = claim(booking, candidates.filter(room_type__in=wanted).order_by("room_number"), wanted)
+    # Raising rolls the transaction back, booking row and held nights included.
+    if rooms is None:
+        if not group:
+            raise NoRoomAvailable(
+                f"No available rooms of type {lines[0][0].name!r} for the selected dates."
+            )
+        raise NoRoomAvailable("Not enough rooms of the requested types for the selected dates.")
+    if sum(room.max_guests for room in rooms) < guests:
+        raise NoRoomAvailable(f"The free rooms of the requested types cannot sleep {guests}.")
+    booking.rooms.add(*rooms)
+    versions.bump_on_commit(versions.occupancy_key(hotel.pk))
 
     provider = get_payment_provider()
-    Payment.objects.create(
+    payment = Payment.objects.create(
         booking=booking,
         provider=provider.name,
         reference=f"booking-{booking.pk}-{uuid.uuid4().hex[:8]}",
@@ -151,14 +643,88 @@ def _reserve(
         currency_code=settings.PAYMENT_CURRENCY_CODE,
         status=Payment.Status.PENDING,
     )
+    if settings.PAYMENT_INVOICE_MODE == "outbox":
+        # Committed with the booking or not at all: no invoice is ever lost,
+        # and none is requested for a booking that rolled back.
+        PaymentOutbox.objects.create(payment=payment)
     return booking
 
 
+def _invoice_description(booking: Booking) -> str:
+    stay = f"{booking.nights} night(s) from {booking.check_in}"
+    rooms = len(booking.rooms.all())
+    if rooms > 1:
+        stay = f"{rooms} rooms, {stay}"
+    return f"Booking #{booking.pk} at {booking.hotel.name}: {stay}"
+
+
+def _invoice_request(payment: Payment) -> InvoiceRequest:
+    return InvoiceRequest(
+        reference=payment.reference,
+        amount=payment.amount,
+        currency_code=payment.currency_code,
+        description=_invoice_description(payment.booking),
+        redirect_url=f"{settings.PUBLIC_BASE_URL}/api/v1/payments/success/",
+        webhook_url=f"{settings.PUBLIC_BASE_URL}/api/v1/payments/webhook/",
+        validity=_hold_remaining(payment.booking),
+    )
+
+
+def _hold_remaining(booking: Booking) -> int:
+    """Seconds until :func:`expire_pending_bookings` may cancel the booking.
+
+    The invoice is payable for no longer than that: an invoice requested late,
+    from the outbox or after a slow provider call, must not outlive the hold
+    on the rooms it pays for.
+    """
+    expires_at = booking.created_at + timedelta(minutes=settings.BOOKING_HOLD_MINUTES)
+    return max(int((expires_at - timezone.now()).total_seconds()), 0)
+
+
+@transaction.atomic
+def _attach_invoice(payment: Payment, invoice: Invoice) -> bool:
+    """Store the invoice on the payment, if both it and its booking still wait for one.
+
+    The provider was called outside any transaction, and meanwhile the sweep
+    or the guest may have cancelled the booking. The payment is re-read under
+    a lock, so a cancellation either happened before (the invoice is not
+    stored; the caller withdraws it) or waits until it is stored.
+    """
+    current = _for_update(Payment.objects.select_related("booking")).get(pk=payment.pk)
+    if current.status != Payment.Status.PENDING or current.booking.status != Booking.Status.PENDING:
+        return False
+    payment.provider_invoice_id = invoice.provider_invoice_id
+    payment.payment_url = invoice.payment_url
+    payment.save(update_fields=["provider_invoice_id", "payment_url", "updated_at"])
+    return True
+
+
+def _withdraw_invoice(invoice: Invoice) -> None:
+    """Cancel an invoice nobody should pay any more; best effort.
+
+    Should the guest pay it anyway, the payment arrives for a booking that is
+    not pending, and is confirmed or refunded as any late payment is.
+    """
+    try:
+        get_payment_provider().cancel_invoice(invoice.provider_invoice_id)
+    except PaymentError:
+        logger.exception("Could not withdraw invoice %s", invoice.provider_invoice_id)
+
+
+@transaction.atomic
+def _abandon_invoice(payment: Payment) -> None:
+    """No invoice could be had: fail the payment and release the rooms."""
+    payment.status = Payment.Status.FAILED
+    payment.save(update_fields=["status", "updated_at"])
+    cancel_booking(payment.booking)
+
+
 def create_booking(
     *,
     user,
     hotel: Hotel,
-    room_type: RoomType,
+    room_type: RoomType | None = None,
+    lines: Iterable[tuple[RoomType, int]] = (),
     check_in: date,
     check_out: date,
     adults: int,
@@ -166,51 +732,236 @@ def create_booking(
 ) -> Booking:
     """Create a booking and attach a payment link to it.
 
+    Either one ``room_type`` is booked, or ``lines`` of ``(room_type, count)``
+    for a group: all of its rooms are claimed together, in one transaction,
+    and paid with one invoice for the total.
+
     The invoice is requested *after* the database transaction commits, so a
     slow provider never holds row locks. If the provider cannot be reached the
     booking is rolled forward to CANCELLED, which releases the room again.
+    With ``settings.PAYMENT_INVOICE_MODE`` set to ``"outbox"`` the invoice is
+    not requested here at all, and the booking comes back with its payment
+    link still empty: see :func:`process_payment_outbox`.
     """
+    lines = list(lines) or [(room_type, 1)]
     booking = _reserve(
         user=user,
         hotel=hotel,
-        room_type=room_type,
+        lines=lines,
         check_in=check_in,
         check_out=check_out,
         adults=adults,
         children=children,
     )
-    payment = booking.payment
-    provider = get_payment_provider()
+    if settings.PAYMENT_INVOICE_MODE == "outbox":
+        return booking
 
+    payment = booking.payment
     try:
-        invoice = provider.create_invoice(
-            InvoiceRequest(
-                reference=payment.reference,
-                amount=payment.amount,
-                currency_code=payment.currency_code,
-                description=(
-                    f"Booking #{booking.pk} at {hotel.name}: "
-                    f"{booking.nights} night(s) from {check_in}"
-                ),
-                redirect_url=f"{settings.PUBLIC_BASE_URL}/api/v1/payments/success/",
-                webhook_url=f"{settings.PUBLIC_BASE_URL}/api/v1/payments/webhook/",
-            )
-        )
+        invoice = get_payment_provider().create_invoice(_invoice_request(payment))
     except PaymentError:
         logger.exception("Invoice creation failed for booking %s", booking.pk)
-        with transaction.atomic():
-            payment.status = Payment.Status.FAILED
-            payment.save(update_fields=["status", "updated_at"])
-            booking.status = Booking.Status.CANCELLED
-            booking.save(update_fields=["status"])
+        _abandon_invoice(payment)
         raise
 
-    payment.provider_invoice_id = invoice.provider_invoice_id
-    payment.payment_url = invoice.payment_url
-    payment.save(update_fields=["provider_invoice_id", "payment_url", "updated_at"])
+    if not _attach_invoice(payment, invoice):
+        _withdraw_invoice(invoice)
+    return booking
+
+
+# How long a picked outbox entry is left to its worker before another may
+# retry it; comfortably longer than a provider call can take.
+OUTBOX_LEASE = timedelta(minutes=2)
+# First retry delay after a failed invoice request; it doubles with each attempt.
+OUTBOX_RETRY_DELAY = timedelta(seconds=10)
+
+
+def _claim_outbox_entries(limit: int) -> list[PaymentOutbox]:
+    """Take up to ``limit`` due entries, leasing them so no other worker does."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = _for_update(
+            PaymentOutbox.objects.filter(next_attempt_at__lte=now), skip_locked=True
+        ).values_list("pk", flat=True)[:limit]
+        picked = list(due)
+        PaymentOutbox.objects.filter(pk__in=picked).update(next_attempt_at=now + OUTBOX_LEASE)
+    return list(
+        PaymentOutbox.objects.filter(pk__in=picked).select_related("payment__booking__hotel")
+    )
+
+
+def deliver_outbox_entry(entry: PaymentOutbox) -> bool:
+    """Request the invoice an outbox entry stands for; whether one was attached.
+
+    A failed request is retried later with a doubling delay, until
+    ``settings.PAYMENT_OUTBOX_MAX_ATTEMPTS`` is reached and the booking is
+    cancelled as it would have been by a failed synchronous request. An entry
+    whose booking was cancelled, expired or ran out of hold meanwhile is
+    simply dropped; if that happens while the provider is being called, the
+    new invoice is withdrawn rather than attached.
+    """
+    payment = entry.payment
+    if (
+        payment.status != Payment.Status.PENDING
+        or payment.booking.status != Booking.Status.PENDING
+        # The hold ran out before the invoice could be had: the sweep will
+        # cancel the booking, and nobody can pay in zero seconds anyway.
+        or not _hold_remaining(payment.booking)
+    ):
+        entry.delete()
+        return False
+
+    try:
+        invoice = get_payment_provider().create_invoice(_invoice_request(payment))
+    except PaymentError as exc:
+        entry.attempts += 1
+        if entry.attempts >= settings.PAYMENT_OUTBOX_MAX_ATTEMPTS:
+            logger.error("Giving up on the invoice for booking %s: %s", payment.booking_id, exc)
+            with transaction.atomic():
+                _abandon_invoice(payment)
+                entry.delete()
+            return False
+        logger.warning("Invoice for booking %s failed, will retry: %s", payment.booking_id, exc)
+        entry.next_attempt_at = timezone.now() + OUTBOX_RETRY_DELAY * 2 ** (entry.attempts - 1)
+        entry.last_error = str(exc)
+        entry.save(update_fields=["attempts", "next_attempt_at", "last_error"])
+        return False
+
+    with transaction.atomic():
+        attached = _attach_invoice(payment, invoice)
+        entry.delete()
+    if not attached:
+        _withdraw_invoice(invoice)
+    return attached
+
+
+def _deliver_in_thread(entry: PaymentOutbox) -> bool:
+    try:
+        return deliver_outbox_entry(entry)
+    except Exception:
+        # The lease runs out and the entry is retried; one bad row must not
+        # take the rest of the batch down with it.
+        logger.exception("Outbox entry %s could not be processed", entry.pk)
+        return False
+    finally:
+        # Each worker thread opened its own connection.
+        connections.close_all()
+
+
+def process_payment_outbox(*, batch_size: int = 32, workers: int = 8) -> int:
+    """Work off one batch of due outbox entries; returns how many were picked.
+
+    Provider calls are network-bound, so ``workers`` threads make them side
+    by side. With a single worker they are made in the calling thread.
+    """
+    entries = _claim_outbox_entries(batch_size)
+    if workers <= 1:
+        for entry in entries:
+            deliver_outbox_entry(entry)
+    elif entries:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="outbox") as pool:
+            list(pool.map(_deliver_in_thread, entries))
+    return len(entries)
+
+
+@transaction.atomic
+def cancel_booking(booking: Booking) -> Booking:
+    """Cancel a booking and release the nights its rooms were held for."""
+    booking.status = Booking.Status.CANCELLED
+    booking.save(update_fields=["status"])
+    booking.room_nights.all().delete()
+    versions.bump_on_commit(versions.occupancy_key(booking.hotel_id))
     return booking
 
 
+def expire_pending_bookings(*, now: datetime | None = None, batch_size: int = 500) -> int:
+    """Cancel bookings left unpaid for longer than ``settings.BOOKING_HOLD_MINUTES``.
+
+    Their payments are marked EXPIRED and their rooms released. Work is done
+    in batches of ``batch_size``, each its own transaction of set-based
+    UPDATEs and one DELETE, found through the (status, created_at) index.
+    Rows a payment webhook is busy with are locked, and skipped rather than
+    waited for, so overlapping sweeps and webhooks never block each other and
+    the sweep is safe to run every minute. Returns how many were expired.
+    """
+    cutoff = (now or timezone.now()) - timedelta(minutes=settings.BOOKING_HOLD_MINUTES)
+    stale = Payment.objects.filter(
+        status=Payment.Status.PENDING,
+        booking__status=Booking.Status.PENDING,
+        booking__created_at__lt=cutoff,
+    ).order_by("booking__created_at")
+
+    expired = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                _for_update(stale, skip_locked=True).values_list(
+                    "pk", "booking_id", "booking__hotel_id"
+                )[:batch_size]
+            )
+            if not batch:
+                break
+            payment_ids, booking_ids, hotel_ids = zip(*batch, strict=True)
+            Payment.objects.filter(pk__in=payment_ids).update(
+                status=Payment.Status.EXPIRED, updated_at=timezone.now()
+            )
+            Booking.objects.filter(pk__in=booking_ids).update(status=Booking.Status.CANCELLED)
+            RoomNight.objects.filter(booking_id__in=booking_ids).delete()
+            for hotel_id in set(hotel_ids):
+                versions.bump_on_commit(versions.occupancy_key(hotel_id))
+        expired += len(batch)
+        logger.info("Expired %d unpaid booking(s)", len(batch))
+        if len(batch) < batch_size:
+            break
+    return expired
+
+
+# Payment outcomes that end the booking and give its rooms back.
+_RELEASING_PAYMENT_STATUSES = {
+    Payment.Status.FAILED,
+    Payment.Status.EXPIRED,
+    Payment.Status.REVERSED,
+}
+
+
+def _record_payment_status(payment: Payment, status: str) -> list[str]:
+    """Move ``payment`` to ``status`` in memory; returns the fields to save."""
+    payment.status = status
+    payment.updated_at = timezone.now()
+    changed = ["status", "updated_at"]
+    if status == Payment.Status.PAID and payment.paid_at is None:
+        payment.paid_at = payment.updated_at
+        changed.append("paid_at")
+    return changed
+
+
+def _settle_late_payment(payment: Payment, *, expired: bool) -> None:
+    """A payment has succeeded for a booking that is no longer pending.
+
+    A booking the sweep expired while the guest was paying gets its nights
+    back, if nobody has taken them since, and is confirmed. Otherwise — its
+    rooms are gone, or the booking was cancelled on purpose — the payment is
+    flagged ``refund_due`` for the money to be returned.
+    """
+    booking = payment.booking
+    if expired:
+        try:
+            _hold_nights(booking, booking.rooms.all())
+        except NoRoomAvailable:
+            pass
+        else:
+            booking.status = Booking.Status.CONFIRMED
+            booking.save(update_fields=["status"])
+            versions.bump_on_commit(versions.occupancy_key(booking.hotel_id))
+            logger.warning("Booking %s confirmed by a payment after it expired", booking.pk)
+            return
+    payment.refund_due = True
+    payment.save(update_fields=["refund_due", "updated_at"])
+    logger.error(
+        "Payment %s succeeded for cancelled booking %s; refund due", payment.pk, booking.pk
+    )
+
+
 @transaction.atomic
 def apply_payment_event(event: WebhookEvent) -> Payment:
     """Apply a provider status update to the matching payment.
@@ -228,26 +979,201 @@ def apply_payment_event(event: WebhookEvent) -> Payment:
     if payment.status == event.status:
         return payment
 
-    payment.status = event.status
-    updated_fields = ["status", "updated_at"]
-    if event.status == Payment.Status.PAID and payment.paid_at is None:
-        payment.paid_at = timezone.now()
-        updated_fields.append("paid_at")
-    payment.save(update_fields=updated_fields)
+    expired = payment.status == Payment.Status.EXPIRED
+    payment.save(update_fields=_record_payment_status(payment, event.status))
 
     booking = payment.booking
+    if event.status == Payment.Status.PAID and booking.status != Booking.Status.PENDING:
+        _settle_late_payment(payment, expired=expired)
+        return payment
     if event.status == Payment.Status.PAID:
         booking.status = Booking.Status.CONFIRMED
-    elif event.status in {
-        Payment.Status.FAILED,
-        Payment.Status.EXPIRED,
-        Payment.Status.REVERSED,
-    }:
+        booking.save(update_fields=["status"])
+    elif event.status in _RELEASING_PAYMENT_STATUSES:
         # Releases the room for other guests.
-        booking.status = Booking.Status.CANCELLED
+        cancel_booking(booking)
     else:
         return payment
 
-    booking.save(update_fields=["status"])
     logger.info("Booking %s moved to %s via payment webhook", booking.pk, booking.status)
     return payment
+
+
+@transaction.atomic
+def apply_payment_events(events: list[WebhookEvent]) -> int:
+    """:func:`apply_payment_event` for a batch, with a fixed number of statements.
+
+    Every payment the batch mentions is locked by one SELECT ... FOR UPDATE,
+    in primary-key order so that overlapping batches cannot deadlock. Events
+    are then applied in order in memory, and payments and bookings written
+    back with ``bulk_update``; released bookings lose their nights in one
+    DELETE. Events for unknown invoices are logged and skipped. Returns how
+    many events changed a payment.
+    """
+    invoice_ids = {event.provider_invoice_id for event in events if event.provider_invoice_id}
+    references = {event.reference for event in events if not event.provider_invoice_id}
+    payments = list(
+        _for_update(
+            Payment.objects.select_related("booking")
+            .filter(Q(provider_invoice_id__in=invoice_ids) | Q(reference__in=references))
+            .order_by("pk")
+        )
+    )
+    by_invoice = {payment.provider_invoice_id: payment for payment in payments}
+    by_reference = {payment.reference: payment for payment in payments}
+
+    changed_payments: dict[int, Payment] = {}
+    changed_bookings: dict[int, Booking] = {}
+    # Paid after their booking stopped pending: payment -> whether it had expired.
+    late: dict[int, bool] = {}
+    applied = 0
+    for event in events:
+        if event.provider_invoice_id:
+            payment = by_invoice.get(event.provider_invoice_id)
+        else:
+            payment = by_reference.get(event.reference)
+        if payment is None:
+            logger.warning("Webhook for unknown invoice %s", event.provider_invoice_id)
+            continue
+        if payment.status == event.status:
+            continue
+        expired = payment.status == Payment.Status.EXPIRED
+        _record_payment_status(payment, event.status)
+        changed_payments[payment.pk] = payment
+        applied += 1
+
+        booking = payment.booking
+        late.pop(payment.pk, None)
+        if event.status == Payment.Status.PAID and booking.status != Booking.Status.PENDING:
+            late[payment.pk] = expired
+            continue
+        if event.status == Payment.Status.PAID:
+            booking.status = Booking.Status.CONFIRMED
+        elif event.status in _RELEASING_PAYMENT_STATUSES:
+            booking.status = Booking.Status.CANCELLED
+        else:
+            continue
+        changed_bookings[booking.pk] = booking
+
+    Payment.objects.bulk_update(changed_payments.values(), ["status", "updated_at", "paid_at"])
+    Booking.objects.bulk_update(changed_bookings.values(), ["status"])
+    released = [
+        booking
+        for booking in changed_bookings.values()
+        if booking.status in Booking.RELEASING_STATUSES
+    ]
+    if released:
+        RoomNight.objects.filter(booking__in=released).delete()
+        for hotel_id in {booking.hotel_id for booking in released}:
+            versions.bump_on_commit(versions.occupancy_key(hotel_id))
+    # After the releases, so that the nights they free can be held again.
+    for payment_pk, expired in late.items():
+        _settle_late_payment(changed_payments[payment_pk], expired=expired)
+    logger.info(
+        "Applied %d of %d payment event(s); %d booking(s) changed",
+        applied,
+        len(events),
+        len(changed_bookings),
+    )
+    return applied
+
+
+def store_payment_event(provider: str, event: WebhookEvent, payload: dict) -> bool:
+    """Put a verified event in the inbox; ``False`` if it was already there."""
+    _, created = WebhookInbox.objects.get_or_create(
+        provider=provider,
+        provider_invoice_id=event.provider_invoice_id or "",
+        reference="" if event.provider_invoice_id else event.reference or "",
+        status=event.status,
+        defaults={"payload": payload},
+    )
+    return created
+
+
+def process_webhook_inbox(*, batch_size: int = 200) -> int:
+    """Apply one batch of stored webhook events; returns how many were taken.
+
+    The batch is applied in one transaction with :func:`apply_payment_events`
+    and marked processed in the same one, so an event is applied exactly
+    once. Rows another worker has locked are skipped.
+    """
+    with transaction.atomic():
+        batch = list(
+            _for_update(
+                WebhookInbox.objects.filter(processed_at__isnull=True).order_by("received_at"),
+                skip_locked=True,
+            )[:batch_size]
+        )
+        if not batch:
+            return 0
+        apply_payment_events(
+            [
+                WebhookEvent(
+                    provider_invoice_id=row.provider_invoice_id,
+                    reference=row.reference,
+                    status=row.status,
+                )
+                for row in batch
+            ]
+        )
+        WebhookInbox.objects.filter(pk__in=[row.pk for row in batch]).update(
+            processed_at=timezone.now()
+        )
+    return len(batch)
+
+
+def reconcile_payments(
+    *,
+    older_than: timedelta | None = None,
+    workers: int = 8,
+    rate: float | None = None,
+    batch_size: int = 200,
+) -> tuple[int, int, int]:
+    """Settle payments whose webhook never arrived by asking the provider.
+
+    Pending payments with an invoice older than ``older_than`` (by default
+    ``settings.PAYMENT_RECONCILE_AFTER_MINUTES``) are checked ``batch_size`` at
+    a time: ``workers`` threads ask for their invoice status, together making
+    no more than ``rate`` requests per second (``settings.PAYMENT_RECONCILE_RATE``),
+    and the answers go through :func:`apply_payment_events` like a batch of
+    webhooks. Invoices the provider could not be asked about are left for the
+    next run. Returns ``(checked, settled, failed)``.
+    """
+    provider = get_payment_provider()
+    if older_than is None:
+        older_than = timedelta(minutes=settings.PAYMENT_RECONCILE_AFTER_MINUTES)
+    limiter = RateLimiter(rate or settings.PAYMENT_RECONCILE_RATE)
+
+    def status_of(invoice_id: str) -> WebhookEvent | None:
+        limiter.acquire()
+        try:
+            return provider.get_invoice_status(invoice_id)
+        except PaymentError as exc:
+            logger.warning("Could not check invoice %s: %s", invoice_id, exc)
+            return None
+
+    stale = Payment.objects.filter(
+        status=Payment.Status.PENDING,
+        provider=provider.name,
+        provider_invoice_id__isnull=False,
+        created_at__lt=timezone.now() - older_than,
+    ).order_by("pk")
+    checked = settled = failed = 0
+    last_pk = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reconcile") as pool:
+        while batch := list(
+            stale.filter(pk__gt=last_pk).values_list("pk", "provider_invoice_id")[:batch_size]
+        ):
+            last_pk = batch[-1][0]
+            answers = list(pool.map(status_of, [invoice_id for _, invoice_id in batch]))
+            checked += len(batch)
+            failed += answers.count(None)
+            events = [
+                event
+                for event in answers
+                if event is not None and event.status != Payment.Status.PENDING
+            ]
+            if events:
+                settled += apply_payment_events(events)
+    logger.info("Reconciled %d payment(s): %d settled, %d unchecked", checked, settled, failed)
+    return checked, settled, failed
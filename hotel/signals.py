@@ -0,0 +1,116 @@
+"""Model signal handlers that keep derived data in step with the catalogue.
+
+Signals fire for ``save()`` and ``delete()`` on single instances, which covers
+the API and the admin. Bulk ``QuerySet.update()`` calls bypass them.
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import stats, versions
+from .models import Amenity, Hotel, Review, Room, RoomType
+
+# What an instance was last counted as, when that is not known: it was loaded
+# with the relevant fields deferred.
+_UNKNOWN = object()
+_ROOM_FIELDS = ("hotel_id", "price_per_night", "is_available")
+_REVIEW_FIELDS = ("hotel_id", "rating")
+
+
+def _remember(instance, fields):
+    """What the stored row says, as loaded, or ``None`` for an unsaved instance."""
+    # Not _state.adding: the ORM only clears it once post_init has been sent.
+    if instance.pk is None:
+        return None
+    if any(field not in instance.__dict__ for field in fields):
+        return _UNKNOWN
+    return tuple(instance.__dict__[field] for field in fields)
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def room_changed(sender, instance, **kwargs):
+    # Adding a room, taking one out of service or deleting it changes what is
+    # bookable, just as a booking does.
+    versions.bump_on_commit(versions.occupancy_key(instance.hotel_id))
+
+
+@receiver(post_init, sender=Room)
+def room_loaded(sender, instance, **kwargs):
+    instance._counted_as = _remember(instance, _ROOM_FIELDS)
+
+
+@receiver(post_save, sender=Room)
+def room_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = instance._counted_as
+    after = tuple(getattr(instance, field) for field in _ROOM_FIELDS)
+    instance._counted_as = after
+    if before is _UNKNOWN:
+        stats.rebuild({instance.hotel_id})
+        return
+    if before == after:
+        return
+    if before is None or before[0] != after[0]:
+        stats.count_rooms(after[0], 1)
+        if before is not None:
+            stats.count_rooms(before[0], -1)
+    stats.refresh_min_price({after[0], *(before[:1] if before else ())})
+
+
+@receiver(post_delete, sender=Room)
+def room_deleted(sender, instance, **kwargs):
+    stats.count_rooms(instance.hotel_id, -1)
+    stats.refresh_min_price({instance.hotel_id})
+
+
+@receiver(post_init, sender=Review)
+def review_loaded(sender, instance, **kwargs):
+    instance._counted_as = _remember(instance, _REVIEW_FIELDS)
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = instance._counted_as
+    after = (instance.hotel_id, instance.rating)
+    instance._counted_as = after
+    if before is _UNKNOWN:
+        stats.rebuild({instance.hotel_id})
+    elif before != after:
+        if before is not None and before[0] != after[0]:
+            stats.count_reviews(before[0], {before[1]: -1})
+            before = None
+        deltas = {after[1]: 1}
+        if before is not None:
+            deltas[before[1]] = deltas.get(before[1], 0) - 1
+        stats.count_reviews(after[0], deltas)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    stats.count_reviews(instance.hotel_id, {instance.rating: -1})
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=RoomType)
+@receiver(post_delete, sender=RoomType)
+@receiver(post_save, sender=Amenity)
+@receiver(post_delete, sender=Amenity)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def catalogue_changed(sender, **kwargs):
+    # Moves the table's counter on, and with it the ETags of every catalogue
+    # response built from the table (see hotel.mixins.ConditionalGetMixin).
+    versions.touch_on_commit(versions.table_key(sender))
+
+
+@receiver(m2m_changed, sender=Room.amenities.through)
+def room_amenities_changed(sender, action, **kwargs):
+    if action.startswith("post_"):
+        versions.touch_on_commit(versions.table_key(Room))
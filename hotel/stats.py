@@ -0,0 +1,116 @@
+"""Summary columns stored on :class:`~hotel.models.Hotel`.
+
+The catalogue lists and sorts hotels by their rating, review count, cheapest
+room and number of rooms. Aggregating reviews and rooms for every page would
+join and group every row behind the page, so the figures are stored on the
+hotel instead and kept current by the signal handlers in :mod:`hotel.signals`:
+
+* reviews adjust the rating sum, count, histogram and average with ``F()``
+  arithmetic, in one UPDATE per write, so concurrent reviews cannot lose each
+  other's increments;
+* rooms adjust the room count the same way, and recompute the cheapest
+  available price with one correlated subquery, since a minimum cannot be
+  taken back incrementally.
+
+Bulk ``QuerySet.update()``/``bulk_create()`` calls bypass signals, and so these
+columns; :func:`rebuild` (``manage.py rebuild_hotel_stats``) recomputes them.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+
+from django.db.models import (
+    Avg,
+    Count,
+    F,
+    FloatField,
+    IntegerField,
+    Min,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from . import versions
+from .models import Hotel, Review, Room
+
+RATINGS = range(1, 6)
+
+
+def count_reviews(hotel_id: int, deltas: Mapping[int, int]) -> None:
+    """Add ``deltas`` (rating -> reviews added, negative when removed) to a hotel."""
+    added = sum(deltas.values())
+    points = sum(rating * delta for rating, delta in deltas.items())
+    updates = {
+        f"ratings_{rating}": F(f"ratings_{rating}") + delta
+        for rating, delta in deltas.items()
+        if delta
+    }
+    if not updates:
+        return
+    Hotel.objects.filter(pk=hotel_id).update(
+        rating_sum=F("rating_sum") + points,
+        review_count=F("review_count") + added,
+        # SET expressions all read the row as it was, so the average is taken
+        # over the new sum and count here too.
+        average_rating=Cast(F("rating_sum") + points, FloatField())
+        / NullIf(F("review_count") + added, Value(0)),
+        **updates,
+    )
+
+
+def count_rooms(hotel_id: int, delta: int) -> None:
+    Hotel.objects.filter(pk=hotel_id).update(room_count=F("room_count") + delta)
+
+
+def _cheapest_available():
+    return Subquery(
+        Room.objects.filter(hotel=OuterRef("pk"), is_available=True)
+        .order_by()
+        .values("hotel")
+        .annotate(price=Min("price_per_night"))
+        .values("price")
+    )
+
+
+def refresh_min_price(hotel_ids: Iterable[int]) -> None:
+    Hotel.objects.filter(pk__in=set(hotel_ids)).update(min_price_per_night=_cheapest_available())
+
+
+def rebuild(hotel_ids: Iterable[int] | None = None) -> int:
+    """Recompute every summary column from the reviews and rooms; one UPDATE.
+
+    Covers the hotels in ``hotel_ids``, or all of them. Returns how many
+    hotels were updated.
+    """
+
+    def per_hotel(queryset, aggregate):
+        return Subquery(
+            queryset.filter(hotel=OuterRef("pk"))
+            .order_by()
+            .values("hotel")
+            .annotate(value=aggregate)
+            .values("value")
+        )
+
+    hotels = Hotel.objects.all() if hotel_ids is None else Hotel.objects.filter(pk__in=hotel_ids)
+    # An UPDATE sends no signals, so the change is announced here.
+    versions.touch_on_commit(versions.table_key(Hotel))
+    return hotels.update(
+        rating_sum=Coalesce(
+            per_hotel(Review.objects, Sum("rating", output_field=IntegerField())), 0
+        ),
+        review_count=Coalesce(per_hotel(Review.objects, Count("pk")), 0),
+        average_rating=per_hotel(Review.objects, Avg("rating", output_field=FloatField())),
+        **{
+            f"ratings_{rating}": Coalesce(
+                per_hotel(Review.objects.filter(rating=rating), Count("pk")), 0
+            )
+            for rating in RATINGS
+        },
+        room_count=Coalesce(per_hotel(Room.objects, Count("pk")), 0),
+        min_price_per_night=_cheapest_available(),
+    )
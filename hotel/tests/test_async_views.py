@@ -0,0 +1,137 @@
+"""The async read endpoints answer exactly as their sync counterparts do."""
+
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework.throttling import AnonRateThrottle
+
+from hotel.models import Hotel, Room
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def catalogue(hotel, room_type, room, amenity):
+    room.amenities.add(amenity)
+    other = Hotel.objects.create(name="Old Town Inn", location="Lviv", description="Cosy.")
+    for number in range(1, 25):
+        Room.objects.create(
+            hotel=other,
+            room_number=number,
+            room_type=room_type,
+            price_per_night=Decimal("80.00"),
+            max_guests=1 + number % 3,
+        )
+    return hotel, other
+
+
+def _both(client, sync_name, async_name, params=None):
+    sync = client.get(reverse(sync_name), params)
+    asynchronous = client.get(reverse(async_name), params)
+    return sync, asynchronous
+
+
+def test_health(client):
+    response = client.get(reverse("async-health"))
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "database": "ok"}
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"location": "Lviv"},
+        {"search": "cosy"},
+        {"location": "Nowhere"},
+        {"ordering": "-name"},
+        {"ordering": "-min_price_per_night,name"},
+        {"ordering": "room_count"},
+    ],
+)
+def test_hotel_list_matches(client, catalogue, params):
+    sync, asynchronous = _both(client, "hotel-list", "async-hotel-list", params)
+    assert asynchronous.status_code == sync.status_code == 200
+    assert asynchronous.json() == sync.json()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"page": 2},
+        {"max_guests": 2},
+        {"is_available": "true", "page": 1},
+        {"ordering": "-price_per_night,room_number"},
+        {"ordering": "-room_number", "page": 2},
+        {"ordering": "max_guests"},
+    ],
+)
+def test_room_list_matches(client, catalogue, params):
+    sync, asynchronous = _both(client, "room-list", "async-room-list", params)
+    assert asynchronous.status_code == sync.status_code == 200
+    body = asynchronous.json()
+    # Page links point back at the async endpoint, and otherwise agree.
+    for link in ("next", "previous"):
+        if body[link]:
+            assert "/async/" in body[link]
+            body[link] = body[link].replace("/async/", "/")
+    assert body == sync.json()
+    # Each page must come out of the database, not just match an empty one.
+    if "page" not in params:
+        assert body["results"]
+
+
+def test_room_list_keeps_to_a_fixed_number_of_queries(client, catalogue, django_assert_num_queries):
+    # Count, page, amenities; the throttle lives in the cache.
+    with django_assert_num_queries(3):
+        assert client.get(reverse("async-room-list")).status_code == 200
+
+
+def test_out_of_range_page_is_a_404(client, catalogue):
+    response = client.get(reverse("async-room-list"), {"page": 9})
+    assert response.status_code == 404
+
+
+def test_bad_filter_is_a_400(client, catalogue):
+    response = client.get(reverse("async-room-list"), {"hotel": "nope"})
+    assert response.status_code == 400
+    assert "hotel" in response.json()
+
+
+def test_available_room_types_match(client, hotel, room, stay_dates):
+    check_in, check_out = stay_dates
+    params = {"hotel": hotel.pk, "check_in": check_in, "check_out": check_out, "adults": 2}
+    sync, asynchronous = _both(client, "available-room-types", "async-available-room-types", params)
+    assert asynchronous.status_code == 200
+    assert asynchronous.json() == sync.json()
+    assert asynchronous.json()[0]["free_rooms"] == 1
+
+
+def test_search_calendar_and_flexible_match(client, hotel, room, stay_dates):
+    check_in, check_out = stay_dates
+    stay = {"check_in": check_in, "check_out": check_out}
+    for name, params in [
+        ("availability-search", {"location": hotel.location, **stay}),
+        ("availability-calendar", {"hotel": hotel.pk, "days": 14}),
+        ("availability-flexible", {"hotel": hotel.pk, "flex_days": 2, **stay}),
+    ]:
+        sync, asynchronous = _both(client, name, f"async-{name}", params)
+        assert asynchronous.status_code == 200, name
+        assert asynchronous.json() == sync.json(), name
+
+
+def test_invalid_availability_query_is_a_400_like_the_sync_one(client, hotel):
+    params = {"hotel": hotel.pk, "check_in": "2030-01-05", "check_out": "2030-01-01"}
+    sync, asynchronous = _both(client, "available-room-types", "async-available-room-types", params)
+    assert asynchronous.status_code == sync.status_code == 400
+    assert asynchronous.json() == sync.json()
+
+
+def test_anonymous_clients_are_throttled(client, hotel, monkeypatch):
+    # SimpleRateThrottle reads THROTTLE_RATES once, when the class is defined.
+    monkeypatch.setattr(AnonRateThrottle, "THROTTLE_RATES", {"anon": "2/min"})
+    url = reverse("async-hotel-list")
+
+    assert [client.get(url).status_code for _ in range(3)] == [200, 200, 429]
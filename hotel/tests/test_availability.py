@@ -3,9 +3,18 @@ from decimal import Decimal
 
 import pytest
 from django.urls import reverse
+from django.utils import timezone
 
-from hotel.models import Booking, Room, RoomType
-from hotel.services import available_room_types, find_available_rooms
+from hotel.models import Booking, Hotel, Room, RoomNight, RoomType
+from hotel.serializers import MAX_BATCH_QUERIES, MAX_CALENDAR_DAYS, MAX_STAY_NIGHTS
+from hotel.services import (
+    NoRoomAvailable,
+    available_room_types,
+    cancel_booking,
+    create_booking,
+    find_available_rooms,
+    sync_room_nights,
+)
 
 pytestmark = pytest.mark.django_db
 
@@ -20,6 +29,7 @@ def _book(user, hotel, room, check_in, check_out, status=Booking.Status.PENDING)
         status=status,
     )
     booking.rooms.add(room)
+    sync_room_nights(booking)
     return booking
 
 
@@ -101,9 +111,183 @@ def test_available_room_types_lists_only_bookable_types(user, hotel, room, stay_
     assert [t.name for t in types] == ["Double"]
 
 
+def test_reserving_holds_every_night_of_the_stay(user, hotel, room_type, room, stay_dates):
+    check_in, check_out = stay_dates
+    booking = create_booking(
+        user=user,
+        hotel=hotel,
+        room_type=room_type,
+        check_in=check_in,
+        check_out=check_out,
+        adults=2,
+        children=0,
+    )
+
+    held = RoomNight.objects.filter(booking=booking)
+    assert [night.night for night in held] == [check_in, check_in + timedelta(days=1)]
+    assert {night.room_id for night in held} == {room.id}
+
+
+def test_cancelling_releases_the_nights(user, hotel, room_type, room, stay_dates):
+    check_in, check_out = stay_dates
+    booking = _book(user, hotel, room, check_in, check_out)
+
+    cancel_booking(booking)
+
+    assert not RoomNight.objects.exists()
+    found = find_available_rooms(
+        hotel=hotel, room_type=room_type, check_in=check_in, check_out=check_out, guests=2
+    )
+    assert list(found) == [room]
+
+
+def test_a_held_night_cannot_be_claimed_again(user, hotel, room, stay_dates):
+    """The unique (room, night) constraint backs up the locked availability check."""
+    check_in, check_out = stay_dates
+    _book(user, hotel, room, check_in, check_out)
+    overlapping = Booking.objects.create(
+        user=user,
+        hotel=hotel,
+        check_in=check_out - timedelta(days=1),
+        check_out=check_out + timedelta(days=1),
+        adults=1,
+    )
+    overlapping.rooms.add(room)
+
+    with pytest.raises(NoRoomAvailable):
+        sync_room_nights(overlapping)
+    assert not overlapping.room_nights.exists()
+
+
+class TestOptimisticReservation:
+    @pytest.fixture(autouse=True)
+    def _optimistic(self, settings):
+        settings.RESERVATION_ENGINE = "optimistic"
+
+    def _reserve(self, user, hotel, room_type, stay_dates):
+        check_in, check_out = stay_dates
+        return create_booking(
+            user=user,
+            hotel=hotel,
+            room_type=room_type,
+            check_in=check_in,
+            check_out=check_out,
+            adults=2,
+            children=0,
+        )
+
+    def test_books_the_first_free_room(self, user, hotel, room_type, room, stay_dates):
+        booking = self._reserve(user, hotel, room_type, stay_dates)
+        assert booking.rooms.get() == room
+        assert booking.room_nights.count() == 2
+
+    def test_last_room_is_not_sold_twice(
+        self, user, other_user, hotel, room_type, room, stay_dates
+    ):
+        self._reserve(user, hotel, room_type, stay_dates)
+        with pytest.raises(NoRoomAvailable):
+            self._reserve(other_user, hotel, room_type, stay_dates)
+        assert Booking.objects.count() == 1
+
+    def test_moves_on_when_the_snapshot_was_stale(
+        self, user, other_user, hotel, room_type, room, stay_dates, monkeypatch
+    ):
+        """A room taken after occupancy was read is rejected by the constraint, not sold."""
+        spare = Room.objects.create(
+            hotel=hotel,
+            room_number=102,
+            room_type=room_type,
+            price_per_night=Decimal("100.00"),
+            max_guests=2,
+        )
+        self._reserve(user, hotel, room_type, stay_dates)
+        # Pretend occupancy was read before the first booking committed.
+        monkeypatch.setattr("hotel.services._free_candidates", lambda candidates, *args: candidates)
+
+        booking = self._reserve(other_user, hotel, room_type, stay_dates)
+        assert booking.rooms.get() == spare
+
+
+@pytest.mark.parametrize("engine", ["locking", "optimistic", "skip_locked"])
+def test_best_fit_fills_the_gap_between_stays(
+    settings, user, other_user, hotel, room_type, room, stay_dates, engine
+):
+    settings.RESERVATION_ENGINE = engine
+    settings.ROOM_ASSIGNMENT_STRATEGY = "best_fit"
+    snug = Room.objects.create(
+        hotel=hotel,
+        room_number=102,
+        room_type=room_type,
+        price_per_night=Decimal("100.00"),
+        max_guests=2,
+    )
+    check_in, check_out = stay_dates
+    _book(user, hotel, snug, check_in - timedelta(days=2), check_in)
+    _book(user, hotel, snug, check_out, check_out + timedelta(days=2))
+
+    booking = create_booking(
+        user=other_user,
+        hotel=hotel,
+        room_type=room_type,
+        check_in=check_in,
+        check_out=check_out,
+        adults=2,
+        children=0,
+    )
+
+    # First-free would have taken room 101 and left 102 with a two-night hole.
+    assert booking.rooms.get() == snug
+
+
+def test_available_room_types_report_counts_and_prices(user, hotel, room_type, room, stay_dates):
+    for number, price in [(102, "80.00"), (103, "120.00")]:
+        Room.objects.create(
+            hotel=hotel,
+            room_number=number,
+            room_type=room_type,
+            price_per_night=Decimal(price),
+            max_guests=2,
+        )
+    booked = Room.objects.get(room_number=103)
+    check_in, check_out = stay_dates
+    _book(user, hotel, booked, check_in, check_out)
+
+    (double,) = available_room_types(hotel=hotel, check_in=check_in, check_out=check_out, guests=2)
+
+    assert double.free_rooms == 2
+    assert (double.min_price_per_night, double.max_price_per_night) == (
+        Decimal("80.00"),
+        Decimal("100.00"),
+    )
+    # Two nights.
+    assert (double.min_total_price, double.max_total_price) == (
+        Decimal("160.00"),
+        Decimal("200.00"),
+    )
+
+
 class TestAvailabilityEndpoint:
     url = reverse("available-room-types")
 
+    def test_reports_free_rooms_and_prices(self, api_client, hotel, room, stay_dates):
+        check_in, check_out = stay_dates
+        response = api_client.get(
+            self.url,
+            {"hotel": hotel.id, "check_in": check_in, "check_out": check_out, "adults": 2},
+        )
+        assert response.data == [
+            {
+                "id": room.room_type_id,
+                "name": "Double",
+                "description": "Fits two guests.",
+                "free_rooms": 1,
+                "min_price_per_night": "100.00",
+                "max_price_per_night": "100.00",
+                "min_total_price": "200.00",
+                "max_total_price": "200.00",
+            }
+        ]
+
     def test_is_public(self, api_client, hotel, room, stay_dates):
         check_in, check_out = stay_dates
         response = api_client.get(
@@ -133,6 +317,65 @@ class TestAvailabilityEndpoint:
         assert response.status_code == 400
         assert "check_in" in response.data
 
+    def _query(self, client, hotel, stay_dates):
+        check_in, check_out = stay_dates
+        return client.get(
+            self.url,
+            {"hotel": hotel.id, "check_in": check_in, "check_out": check_out, "adults": 2},
+        )
+
+    def test_repeated_queries_are_served_from_the_cache(
+        self, api_client, django_assert_num_queries, hotel, room, stay_dates
+    ):
+        first = self._query(api_client, hotel, stay_dates)
+
+        # Only the hotel lookup made by query validation remains.
+        with django_assert_num_queries(1):
+            second = self._query(api_client, hotel, stay_dates)
+        assert second.data == first.data
+
+    def test_empty_answers_are_cached_too(
+        self, api_client, django_assert_num_queries, hotel, stay_dates
+    ):
+        assert self._query(api_client, hotel, stay_dates).data == []
+        with django_assert_num_queries(1):
+            assert self._query(api_client, hotel, stay_dates).data == []
+
+    def test_a_booking_invalidates_the_cached_answer(
+        self,
+        api_client,
+        auth_client,
+        django_capture_on_commit_callbacks,
+        booking_payload,
+        hotel,
+        room,
+        stay_dates,
+    ):
+        assert len(self._query(api_client, hotel, stay_dates).data) == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert auth_client.post(reverse("booking-list"), booking_payload).status_code == 201
+
+        assert self._query(api_client, hotel, stay_dates).data == []
+
+    def test_a_cancellation_invalidates_the_cached_answer(
+        self,
+        api_client,
+        auth_client,
+        django_capture_on_commit_callbacks,
+        booking_payload,
+        hotel,
+        room,
+        stay_dates,
+    ):
+        booking_id = auth_client.post(reverse("booking-list"), booking_payload).data["id"]
+        assert self._query(api_client, hotel, stay_dates).data == []
+
+        with django_capture_on_commit_callbacks(execute=True):
+            auth_client.post(reverse("booking-cancel", args=[booking_id]))
+
+        assert len(self._query(api_client, hotel, stay_dates).data) == 1
+
     def test_non_integer_guest_count_is_rejected(self, api_client, hotel, stay_dates):
         check_in, check_out = stay_dates
         response = api_client.get(
@@ -145,3 +388,344 @@ class TestAvailabilityEndpoint:
             },
         )
         assert response.status_code == 400
+
+
+class TestAvailabilitySearchEndpoint:
+    url = reverse("availability-search")
+
+    @pytest.fixture
+    def lviv_hotels(self, room_type):
+        suite = RoomType.objects.create(name="Suite")
+        inn = Hotel.objects.create(name="Old Town Inn", location="Lviv")
+        lodge = Hotel.objects.create(name="Castle Lodge", location="Lviv")
+        rooms = [
+            Room.objects.create(
+                hotel=inn,
+                room_number=number,
+                room_type=kind,
+                price_per_night=Decimal(price),
+                max_guests=2,
+            )
+            for number, kind, price in [
+                (1, room_type, "90.00"),
+                (2, room_type, "80.00"),
+                (3, suite, "200.00"),
+            ]
+        ]
+        lodge_room = Room.objects.create(
+            hotel=lodge,
+            room_number=1,
+            room_type=room_type,
+            price_per_night=Decimal("70.00"),
+            max_guests=2,
+        )
+        return inn, lodge, rooms, lodge_room
+
+    def _search(self, client, stay_dates, **params):
+        check_in, check_out = stay_dates
+        return client.get(
+            self.url, {"check_in": check_in, "check_out": check_out, "adults": 2, **params}
+        )
+
+    def test_lists_every_hotel_with_a_free_room(
+        self, api_client, hotel, room, lviv_hotels, stay_dates
+    ):
+        response = self._search(api_client, stay_dates, location="Lviv")
+
+        assert response.status_code == 200
+        assert [item["name"] for item in response.data] == ["Castle Lodge", "Old Town Inn"]
+        inn = response.data[1]
+        assert inn["min_price_per_night"] == "80.00"
+        assert [
+            (t["name"], t["free_rooms"], t["min_price_per_night"]) for t in inn["room_types"]
+        ] == [
+            ("Double", 2, "80.00"),
+            ("Suite", 1, "200.00"),
+        ]
+
+    def test_booked_rooms_and_full_hotels_drop_out(self, api_client, user, lviv_hotels, stay_dates):
+        inn, lodge, rooms, lodge_room = lviv_hotels
+        check_in, check_out = stay_dates
+        _book(user, lodge, lodge_room, check_in, check_out)
+        _book(user, inn, rooms[1], check_in, check_out)
+
+        response = self._search(api_client, stay_dates, location="Lviv")
+
+        assert [item["name"] for item in response.data] == ["Old Town Inn"]
+        assert response.data[0]["room_types"][0] == {
+            "id": rooms[0].room_type_id,
+            "name": "Double",
+            "free_rooms": 1,
+            "min_price_per_night": "90.00",
+        }
+
+    def test_is_a_single_query(
+        self, api_client, django_assert_num_queries, lviv_hotels, stay_dates
+    ):
+        with django_assert_num_queries(1):
+            response = self._search(api_client, stay_dates, location="Lviv")
+        assert len(response.data) == 2
+
+    def test_location_is_required(self, api_client, stay_dates):
+        response = self._search(api_client, stay_dates)
+        assert response.status_code == 400
+        assert "location" in response.data
+
+
+class TestAvailabilityCalendarEndpoint:
+    url = reverse("availability-calendar")
+
+    def test_counts_free_rooms_per_type_and_day(self, api_client, user, hotel, room_type, room):
+        second = Room.objects.create(
+            hotel=hotel,
+            room_number=102,
+            room_type=room_type,
+            price_per_night=Decimal("100.00"),
+            max_guests=2,
+        )
+        start = timezone.localdate() + timedelta(days=7)
+        _book(user, hotel, room, start + timedelta(days=1), start + timedelta(days=3))
+        _book(user, hotel, second, start + timedelta(days=2), start + timedelta(days=4))
+        _book(
+            user,
+            hotel,
+            second,
+            start,
+            start + timedelta(days=1),
+            status=Booking.Status.CANCELLED,
+        )
+
+        response = api_client.get(self.url, {"hotel": hotel.id, "start": start, "days": 5})
+
+        assert response.status_code == 200
+        assert response.data["days"] == 5
+        assert response.data["room_types"] == [
+            {"id": room_type.id, "name": "Double", "total_rooms": 2, "free": [2, 1, 0, 1, 2]}
+        ]
+
+    def test_query_count_does_not_grow_with_the_window(
+        self, api_client, django_assert_max_num_queries, user, hotel, room, stay_dates
+    ):
+        check_in, check_out = stay_dates
+        _book(user, hotel, room, check_in, check_out)
+
+        # Hotel lookup, room counts, overlapping stays.
+        with django_assert_max_num_queries(3):
+            response = api_client.get(self.url, {"hotel": hotel.id, "days": 366})
+        assert len(response.data["room_types"][0]["free"]) == 366
+
+    def test_window_length_is_capped(self, api_client, hotel):
+        response = api_client.get(self.url, {"hotel": hotel.id, "days": 5000})
+        assert response.status_code == 400
+        assert "days" in response.data
+
+
+class TestFlexibleAvailabilityEndpoint:
+    url = reverse("availability-flexible")
+
+    def test_ranks_free_start_dates_by_distance(self, api_client, user, hotel, room, stay_dates):
+        check_in, check_out = stay_dates
+        # The requested two nights and the night before are taken.
+        _book(user, hotel, room, check_in - timedelta(days=1), check_out)
+
+        response = api_client.get(
+            self.url,
+            {
+                "hotel": hotel.id,
+                "check_in": check_in,
+                "check_out": check_out,
+                "flex_days": 3,
+                "adults": 2,
+            },
+        )
+
+        assert response.status_code == 200
+        assert [item["offset"] for item in response.data] == [2, -3, 3]
+        nearest = response.data[0]
+        assert nearest["check_in"] == (check_in + timedelta(days=2)).isoformat()
+        assert nearest["check_out"] == (check_out + timedelta(days=2)).isoformat()
+        assert nearest["free_rooms"] == 1
+        assert nearest["min_total_price"] == "200.00"
+
+    def test_never_offers_dates_in_the_past(self, api_client, hotel, room):
+        today = timezone.localdate()
+        response = api_client.get(
+            self.url,
+            {
+                "hotel": hotel.id,
+                "check_in": today + timedelta(days=1),
+                "check_out": today + timedelta(days=2),
+                "flex_days": 5,
+            },
+        )
+        assert min(item["offset"] for item in response.data) == -1
+
+    def test_loads_the_window_once(
+        self, api_client, django_assert_max_num_queries, user, hotel, room, stay_dates
+    ):
+        check_in, check_out = stay_dates
+        _book(user, hotel, room, check_in, check_out)
+
+        # Hotel lookup, candidate rooms, held nights.
+        with django_assert_max_num_queries(3):
+            api_client.get(
+                self.url,
+                {"hotel": hotel.id, "check_in": check_in, "check_out": check_out, "flex_days": 7},
+            )
+
+    def test_flexibility_is_capped(self, api_client, hotel, stay_dates):
+        check_in, check_out = stay_dates
+        response = api_client.get(
+            self.url,
+            {"hotel": hotel.id, "check_in": check_in, "check_out": check_out, "flex_days": 30},
+        )
+        assert response.status_code == 400
+        assert "flex_days" in response.data
+
+
+class TestBatchAvailabilityEndpoint:
+    url = reverse("availability-batch")
+
+    def _query(self, hotel, check_in, check_out, **extra):
+        return {"hotel": hotel.id, "check_in": check_in, "check_out": check_out, **extra}
+
+    def test_answers_each_query_in_order(self, api_client, user, hotel, room, stay_dates):
+        check_in, check_out = stay_dates
+        _book(user, hotel, room, check_in, check_out)
+        later = check_out + timedelta(days=1)
+
+        response = api_client.post(
+            self.url,
+            {
+                "queries": [
+                    self._query(hotel, check_in, check_out),
+                    self._query(hotel, later, later + timedelta(days=3), adults=2),
+                    self._query(hotel, later, later + timedelta(days=1), adults=5),
+                ]
+            },
+            format="json",
+        )
+
+        assert response.status_code == 200
+        taken, free, too_many = response.data["results"]
+        assert taken == [] and too_many == []
+        assert free == [
+            {
+                "id": room.room_type_id,
+                "name": room.room_type.name,
+                "description": room.room_type.description,
+                "free_rooms": 1,
+                "min_price_per_night": "100.00",
+                "max_price_per_night": "100.00",
+                "min_total_price": "300.00",
+                "max_total_price": "300.00",
+            }
+        ]
+
+    def test_agrees_with_the_single_query_endpoint(
+        self, api_client, user, hotel, room_type, room, stay_dates
+    ):
+        check_in, check_out = stay_dates
+        Room.objects.create(
+            hotel=hotel,
+            room_number=102,
+            room_type=room_type,
+            price_per_night=Decimal("80.00"),
+            max_guests=2,
+        )
+        _book(user, hotel, room, check_in + timedelta(days=1), check_out)
+        stays = [
+            (check_in + timedelta(days=n), check_out + timedelta(days=n)) for n in range(-1, 3)
+        ]
+
+        response = api_client.post(
+            self.url,
+            {"queries": [self._query(hotel, *stay) for stay in stays]},
+            format="json",
+        )
+
+        for stay, answer in zip(stays, response.data["results"], strict=True):
+            single = api_client.get(
+                reverse("available-room-types"),
+                {"hotel": hotel.id, "check_in": stay[0], "check_out": stay[1]},
+            )
+            assert answer == single.data
+
+    def test_queries_do_not_grow_with_the_batch(
+        self, api_client, django_assert_max_num_queries, user, hotel, room, stay_dates
+    ):
+        check_in, check_out = stay_dates
+        other = Hotel.objects.create(name="Other", location="Lviv")
+        queries = [
+            self._query(target, check_in + timedelta(days=n), check_out + timedelta(days=n))
+            for n in range(50)
+            for target in (hotel, other)
+        ]
+
+        # Hotel check, rooms, held nights.
+        with django_assert_max_num_queries(3):
+            response = api_client.post(self.url, {"queries": queries}, format="json")
+        assert len(response.data["results"]) == 100
+
+    def test_reports_errors_by_position(self, api_client, hotel, stay_dates):
+        check_in, check_out = stay_dates
+        response = api_client.post(
+            self.url,
+            {
+                "queries": [
+                    self._query(hotel, check_in, check_out),
+                    self._query(hotel, check_out, check_in),
+                ]
+            },
+            format="json",
+        )
+
+        assert response.status_code == 400
+        assert set(response.data["queries"]) == {1}
+        assert "check_out" in response.data["queries"][1]
+
+    def test_reports_unknown_hotels_by_position(self, api_client, hotel, stay_dates):
+        query = self._query(hotel, *stay_dates)
+        response = api_client.post(
+            self.url, {"queries": [query, query | {"hotel": 999999}]}, format="json"
+        )
+
+        assert response.status_code == 400
+        assert set(response.data["queries"]) == {1}
+        assert "hotel" in response.data["queries"][1]
+
+    @pytest.mark.parametrize(
+        ("starts_in", "nights"), [(-1, 2), (7, MAX_STAY_NIGHTS + 1)], ids=["past", "too-long"]
+    )
+    def test_stays_are_checked_like_bookings(self, api_client, hotel, starts_in, nights):
+        check_in = timezone.localdate() + timedelta(days=starts_in)
+        response = api_client.post(
+            self.url,
+            {"queries": [self._query(hotel, check_in, check_in + timedelta(days=nights))]},
+            format="json",
+        )
+
+        assert response.status_code == 400
+        assert set(response.data["queries"]) == {0}
+
+    def test_span_per_hotel_is_capped(self, api_client, hotel, stay_dates):
+        check_in, check_out = stay_dates
+        later = check_in + timedelta(days=MAX_CALENDAR_DAYS)
+        other = Hotel.objects.create(name="Other", location="Lviv")
+        queries = [
+            self._query(hotel, check_in, check_out),
+            self._query(other, later, later + timedelta(days=1)),
+        ]
+        assert api_client.post(self.url, {"queries": queries}, format="json").status_code == 200
+
+        queries.append(self._query(hotel, later, later + timedelta(days=1)))
+        response = api_client.post(self.url, {"queries": queries}, format="json")
+        assert response.status_code == 400
+        assert "queries" in response.data
+
+    def test_batch_size_is_capped(self, api_client, hotel, stay_dates):
+        query = self._query(hotel, *stay_dates)
+        response = api_client.post(
+            self.url, {"queries": [query] * (MAX_BATCH_QUERIES + 1)}, format="json"
+        )
+        assert response.status_code == 400
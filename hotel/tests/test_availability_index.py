@@ -0,0 +1,135 @@
+"""The optional in-process availability index must agree with the database."""
+
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from hotel import availability_index
+from hotel.models import Booking, Room
+from hotel.services import (
+    available_room_types,
+    cancel_booking,
+    create_booking,
+    find_available_rooms,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def index_enabled(settings):
+    settings.AVAILABILITY_INDEX = True
+    availability_index.clear()
+    yield
+    availability_index.clear()
+
+
+def _free(hotel, room_type, check_in, check_out, guests=2):
+    return list(
+        find_available_rooms(
+            hotel=hotel,
+            room_type=room_type,
+            check_in=check_in,
+            check_out=check_out,
+            guests=guests,
+        )
+    )
+
+
+def _book(user, hotel, room_type, check_in, check_out):
+    return create_booking(
+        user=user,
+        hotel=hotel,
+        room_type=room_type,
+        check_in=check_in,
+        check_out=check_out,
+        adults=2,
+        children=0,
+    )
+
+
+def test_answers_from_memory_once_loaded(
+    django_assert_num_queries, hotel, room_type, room, stay_dates
+):
+    check_in, check_out = stay_dates
+    assert _free(hotel, room_type, check_in, check_out) == [room]
+
+    # Only the primary-key lookup of the answer is left for the database.
+    with django_assert_num_queries(1):
+        assert _free(hotel, room_type, check_in, check_out) == [room]
+
+
+def test_a_booking_invalidates_the_index(commit, user, hotel, room_type, room, stay_dates):
+    check_in, check_out = stay_dates
+    assert _free(hotel, room_type, check_in, check_out) == [room]
+
+    with commit():
+        _book(user, hotel, room_type, check_in, check_out)
+
+    assert _free(hotel, room_type, check_in, check_out) == []
+    # Back-to-back stays still fit.
+    assert _free(hotel, room_type, check_out, check_out + timedelta(days=2)) == [room]
+    assert _free(hotel, room_type, check_in - timedelta(days=2), check_in) == [room]
+
+
+def test_a_cancellation_invalidates_the_index(commit, user, hotel, room_type, room, stay_dates):
+    check_in, check_out = stay_dates
+    with commit():
+        booking = _book(user, hotel, room_type, check_in, check_out)
+    assert _free(hotel, room_type, check_in, check_out) == []
+
+    with commit():
+        cancel_booking(booking)
+
+    assert booking.status == Booking.Status.CANCELLED
+    assert _free(hotel, room_type, check_in, check_out) == [room]
+
+
+def test_room_edits_invalidate_the_index(commit, hotel, room_type, room, stay_dates):
+    check_in, check_out = stay_dates
+    assert _free(hotel, room_type, check_in, check_out) == [room]
+
+    with commit():
+        room.is_available = False
+        room.save(update_fields=["is_available"])
+
+    assert _free(hotel, room_type, check_in, check_out) == []
+
+
+def test_room_types_come_from_the_index(commit, user, hotel, room_type, room, stay_dates):
+    suite = Room.objects.create(
+        hotel=hotel,
+        room_number=201,
+        room_type=type(room_type).objects.create(name="Suite"),
+        price_per_night=Decimal("250.00"),
+        max_guests=4,
+    )
+    check_in, check_out = stay_dates
+    with commit():
+        _book(user, hotel, room_type, check_in, check_out)
+
+    types = available_room_types(hotel=hotel, check_in=check_in, check_out=check_out, guests=2)
+    assert [t.name for t in types] == [suite.room_type.name]
+
+
+def test_past_dates_fall_back_to_the_database(hotel, room):
+    yesterday = timezone.localdate() - timedelta(days=1)
+    answer = availability_index.free_rooms(
+        hotel_id=hotel.id,
+        room_type_id=None,
+        check_in=yesterday,
+        check_out=yesterday + timedelta(days=2),
+        guests=1,
+    )
+    assert answer is None
+
+
+def test_switched_off_it_answers_nothing(settings, hotel, room, stay_dates):
+    settings.AVAILABILITY_INDEX = False
+    check_in, check_out = stay_dates
+    answer = availability_index.free_rooms(
+        hotel_id=hotel.id, room_type_id=None, check_in=check_in, check_out=check_out, guests=1
+    )
+    assert answer is None
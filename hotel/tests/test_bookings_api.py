@@ -5,7 +5,7 @@ import pytest
 from django.urls import reverse
 from django.utils import timezone
 
-from hotel.models import Booking, Payment, Room
+from hotel.models import Booking, Payment, Room, RoomNight, RoomType
 
 pytestmark = pytest.mark.django_db
 
@@ -102,6 +102,104 @@ def test_second_room_of_the_same_type_is_still_bookable(
     assert Booking.objects.count() == 2
 
 
+@pytest.fixture
+def group_rooms(hotel, room_type, room):
+    """Three more rooms: another Double and two Singles."""
+    single = RoomType.objects.create(name="Single", description="One bed.")
+    Room.objects.create(
+        hotel=hotel,
+        room_number=102,
+        room_type=room_type,
+        price_per_night=Decimal("120.00"),
+        max_guests=2,
+    )
+    for number in (201, 202):
+        Room.objects.create(
+            hotel=hotel,
+            room_number=number,
+            room_type=single,
+            price_per_night=Decimal("60.00"),
+            max_guests=1,
+        )
+    return single
+
+
+@pytest.mark.parametrize("engine", ["locking", "optimistic", "skip_locked"])
+def test_group_booking_claims_every_room_with_one_payment(
+    auth_client, settings, booking_payload, room_type, group_rooms, engine
+):
+    settings.RESERVATION_ENGINE = engine
+    del booking_payload["room_type"]
+    booking_payload["adults"] = 5
+    booking_payload["lines"] = [
+        {"room_type": room_type.id, "count": 2},
+        {"room_type": group_rooms.id, "count": 1},
+    ]
+
+    response = auth_client.post(LIST_URL, booking_payload, format="json")
+
+    assert response.status_code == 201, response.data
+    assert [room["room_number"] for room in response.data["rooms"]] == [101, 102, 201]
+    # Two nights of 100.00 + 120.00 + 60.00.
+    assert Decimal(response.data["payment"]["amount"]) == Decimal("560.00")
+    assert Payment.objects.count() == 1
+    assert RoomNight.objects.count() == 6
+
+
+def test_group_booking_is_all_or_nothing(auth_client, booking_payload, room_type, group_rooms):
+    del booking_payload["room_type"]
+    booking_payload["lines"] = [
+        {"room_type": room_type.id, "count": 2},
+        {"room_type": group_rooms.id, "count": 3},
+    ]
+
+    response = auth_client.post(LIST_URL, booking_payload, format="json")
+
+    assert response.status_code == 400
+    assert "lines" in response.data
+    assert not Booking.objects.exists()
+    assert not RoomNight.objects.exists()
+
+
+def test_group_rooms_must_sleep_the_whole_party(auth_client, booking_payload, group_rooms):
+    del booking_payload["room_type"]
+    booking_payload["adults"] = 3
+    booking_payload["lines"] = [{"room_type": group_rooms.id, "count": 2}]
+
+    response = auth_client.post(LIST_URL, booking_payload, format="json")
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("engine", ["locking", "optimistic", "skip_locked"])
+def test_group_gets_the_rooms_that_sleep_it(
+    auth_client, settings, booking_payload, hotel, room_type, room, engine
+):
+    """The lowest room numbers are passed over when they cannot sleep the party."""
+    settings.RESERVATION_ENGINE = engine
+    for number, sleeps in ((102, 1), (103, 4)):
+        Room.objects.create(
+            hotel=hotel,
+            room_number=number,
+            room_type=room_type,
+            price_per_night=Decimal("100.00"),
+            max_guests=sleeps,
+        )
+    del booking_payload["room_type"]
+    booking_payload["adults"] = 6
+    booking_payload["lines"] = [{"room_type": room_type.id, "count": 2}]
+
+    response = auth_client.post(LIST_URL, booking_payload, format="json")
+
+    assert response.status_code == 201, response.data
+    assert sorted(room["room_number"] for room in response.data["rooms"]) == [101, 103]
+
+
+def test_booking_takes_room_type_or_lines_not_both(auth_client, booking_payload, room_type, room):
+    booking_payload["lines"] = [{"room_type": room_type.id, "count": 1}]
+    response = auth_client.post(LIST_URL, booking_payload, format="json")
+    assert response.status_code == 400
+
+
 def test_users_see_only_their_own_bookings(
     auth_client, api_client, user, other_user, booking_payload, room
 ):
@@ -109,13 +207,13 @@ def test_users_see_only_their_own_bookings(
 
     api_client.force_authenticate(user=other_user)
     response = api_client.get(LIST_URL)
-    assert response.data["count"] == 0
+    assert response.data["results"] == []
 
 
 def test_staff_see_every_booking(auth_client, staff_client, booking_payload, room):
     auth_client.post(LIST_URL, booking_payload)
     response = staff_client.get(LIST_URL)
-    assert response.data["count"] == 1
+    assert len(response.data["results"]) == 1
 
 
 def test_other_users_booking_is_not_reachable(
@@ -166,4 +264,4 @@ def test_booking_list_does_not_scale_queries_with_rows(
 
     with django_assert_max_num_queries(8):
         response = auth_client.get(LIST_URL)
-    assert response.data["count"] == 5
+    assert len(response.data["results"]) == 5
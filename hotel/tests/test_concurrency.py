@@ -8,12 +8,15 @@ These tests need real committed transactions and a backend with
 
 import os
 import threading
+import time
+from datetime import timedelta
 from decimal import Decimal
 
 import pytest
-from django.db import connection, connections
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
 
-from hotel.models import Booking, Payment, Room
+from hotel.models import Booking, Payment, Room, RoomNight
 from hotel.services import NoRoomAvailable, create_booking
 
 # CI sets REQUIRE_LOCKING_TESTS=1 on the PostgreSQL run. With it set the skip is
@@ -56,9 +59,16 @@ def _run_concurrently(attempts):
     return results
 
 
+@pytest.fixture(params=["locking", "optimistic", "skip_locked"])
+def reservation_engine(request, settings):
+    """Every race is run once per engine: all three must give the same answer."""
+    settings.RESERVATION_ENGINE = request.param
+    return request.param
+
+
 @pytest.mark.django_db(transaction=True)
 def test_two_requests_cannot_take_the_last_room(
-    user, other_user, hotel, room_type, room, stay_dates
+    user, other_user, hotel, room_type, room, stay_dates, reservation_engine
 ):
     check_in, check_out = stay_dates
     common = {
@@ -80,7 +90,7 @@ def test_two_requests_cannot_take_the_last_room(
 
 @pytest.mark.django_db(transaction=True)
 def test_two_rooms_serve_two_concurrent_requests(
-    user, other_user, hotel, room_type, room, stay_dates
+    user, other_user, hotel, room_type, room, stay_dates, reservation_engine
 ):
     """The lock must serialise competing requests, not block legitimate ones."""
     Room.objects.create(
@@ -108,3 +118,101 @@ def test_two_rooms_serve_two_concurrent_requests(
     assigned = {booking.rooms.get().id for booking in Booking.objects.all()}
     assert len(assigned) == 2
     assert Payment.objects.values("reference").distinct().count() == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_skip_locked_waits_for_a_room_locked_for_other_dates(
+    settings, user, other_user, hotel, room_type, room, stay_dates
+):
+    """The only free room is not turned down because another stay has it locked."""
+    settings.RESERVATION_ENGINE = "skip_locked"
+    check_in, check_out = stay_dates
+    locked, release = threading.Event(), threading.Event()
+
+    def book_later_stay():
+        # What a competing booking for the following week does: lock the
+        # room, hold its own nights, and commit a moment later.
+        try:
+            with transaction.atomic():
+                list(Room.objects.select_for_update().filter(pk=room.pk))
+                later = Booking.objects.create(
+                    user=other_user,
+                    hotel=hotel,
+                    check_in=check_in + timedelta(days=7),
+                    check_out=check_out + timedelta(days=7),
+                    adults=2,
+                )
+                RoomNight.objects.create(room=room, booking=later, night=later.check_in)
+                locked.set()
+                release.wait(timeout=10)
+        finally:
+            connections.close_all()
+
+    holder = threading.Thread(target=book_later_stay)
+    holder.start()
+    assert locked.wait(timeout=10)
+    threading.Timer(0.5, release.set).start()
+
+    booking = create_booking(
+        user=user,
+        hotel=hotel,
+        room_type=room_type,
+        check_in=check_in,
+        check_out=check_out,
+        adults=2,
+        children=0,
+    )
+    holder.join(timeout=10)
+
+    assert booking.rooms.get() == room
+    assert RoomNight.objects.filter(room=room).count() == 1 + (check_out - check_in).days
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fifty_bookers_share_out_the_rooms_of_a_type(
+    hotel, room_type, stay_dates, reservation_engine, record_property
+):
+    """Throughput under contention: 50 guests race for the 20 rooms of one type.
+
+    Run with ``-rP`` to compare the engines' bookings per second.
+    """
+    for number in range(101, 121):
+        Room.objects.create(
+            hotel=hotel,
+            room_number=number,
+            room_type=room_type,
+            price_per_night=Decimal("100.00"),
+            max_guests=2,
+        )
+    check_in, check_out = stay_dates
+    users = [
+        get_user_model().objects.create_user(
+            username=f"booker{index}",
+            email=f"booker{index}@example.com",
+            password="Sup3rSecret!pass",
+        )
+        for index in range(50)
+    ]
+    attempts = [
+        {
+            "user": user,
+            "hotel": hotel,
+            "room_type": room_type,
+            "check_in": check_in,
+            "check_out": check_out,
+            "adults": 2,
+            "children": 0,
+        }
+        for user in users
+    ]
+
+    started = time.perf_counter()
+    results = _run_concurrently(attempts)
+    elapsed = time.perf_counter() - started
+
+    outcomes = [outcome for outcome, _ in results]
+    assert outcomes.count("booked") == 20, results
+    assert outcomes.count("rejected") == 30, results
+    assigned = [booking.rooms.get().id for booking in Booking.objects.all()]
+    assert len(set(assigned)) == 20
+    record_property("bookings_per_second", round(len(attempts) / elapsed, 1))
@@ -0,0 +1,109 @@
+"""ETag and Last-Modified on the catalogue, and 304s that cost no query."""
+
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from hotel.models import Review, Room
+
+pytestmark = pytest.mark.django_db
+
+HOTELS_URL = reverse("hotel-list")
+ROOMS_URL = reverse("room-list")
+
+
+def test_list_and_detail_carry_validators(api_client, hotel):
+    for url in (HOTELS_URL, reverse("hotel-detail", args=[hotel.pk])):
+        response = api_client.get(url)
+        assert response.status_code == 200
+        assert response["ETag"].startswith('"')
+        assert response["Last-Modified"].endswith("GMT")
+
+
+def test_matching_etag_is_a_304_without_queries(api_client, hotel, django_assert_num_queries):
+    etag = api_client.get(HOTELS_URL)["ETag"]
+
+    with django_assert_num_queries(0):
+        response = api_client.get(HOTELS_URL, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    assert not response.content
+
+
+def test_etag_depends_on_the_query_string(api_client, hotel):
+    plain = api_client.get(HOTELS_URL)["ETag"]
+    searched = api_client.get(HOTELS_URL, {"search": "sea"})["ETag"]
+    assert plain != searched
+
+
+def test_last_modified_revalidates_too(api_client, room_type):
+    url = reverse("roomtype-list")
+    last_modified = api_client.get(url)["Last-Modified"]
+
+    response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+    assert response.status_code == 304
+
+
+def test_a_review_changes_the_hotel_etag(api_client, hotel, user, commit):
+    etag = api_client.get(HOTELS_URL)["ETag"]
+
+    with commit():
+        Review.objects.create(user=user, hotel=hotel, rating=5)
+
+    response = api_client.get(HOTELS_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["results"][0]["review_count"] == 1
+    assert response["ETag"] != etag
+
+
+def test_unrelated_writes_keep_the_etag(api_client, hotel, room_type, commit):
+    url = reverse("amenity-list")
+    etag = api_client.get(url)["ETag"]
+    hotels_etag = api_client.get(HOTELS_URL)["ETag"]
+
+    with commit():
+        Room.objects.create(
+            hotel=hotel,
+            room_number=7,
+            room_type=room_type,
+            price_per_night=Decimal("90.00"),
+            max_guests=2,
+        )
+
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    # The hotel list does show rooms: the count and the cheapest price.
+    assert api_client.get(HOTELS_URL, HTTP_IF_NONE_MATCH=hotels_etag).status_code == 200
+
+
+def test_adding_an_amenity_to_a_room_changes_the_room_etag(api_client, room, amenity, commit):
+    detail = reverse("room-detail", args=[room.pk])
+    etag = api_client.get(detail)["ETag"]
+
+    with commit():
+        room.amenities.add(amenity)
+
+    response = api_client.get(detail, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["amenities"] == [amenity.pk]
+
+
+def test_a_review_changes_the_etag_of_rooms_with_their_hotel(api_client, room, user, commit):
+    params = {"expand": "hotel"}
+    etag = api_client.get(ROOMS_URL, params)["ETag"]
+
+    with commit():
+        Review.objects.create(user=user, hotel=room.hotel, rating=5)
+
+    response = api_client.get(ROOMS_URL, params, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert response.json()["results"][0]["hotel"]["review_count"] == 1
+
+
+def test_missing_objects_get_no_validators(api_client, hotel):
+    response = api_client.get(reverse("hotel-detail", args=[hotel.pk + 100]))
+    assert response.status_code == 404
+    assert "ETag" not in response
@@ -0,0 +1,191 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.urls import reverse
+from django.utils import timezone
+
+from hotel.models import Booking, Payment, Room, RoomNight
+from hotel.payments import WebhookEvent
+from hotel.services import (
+    apply_payment_event,
+    apply_payment_events,
+    cancel_booking,
+    expire_pending_bookings,
+)
+
+pytestmark = pytest.mark.django_db
+
+BOOKINGS_URL = reverse("booking-list")
+
+
+@pytest.fixture
+def book(auth_client, booking_payload, room):
+    def book(minutes_ago=0):
+        response = auth_client.post(BOOKINGS_URL, booking_payload)
+        assert response.status_code == 201, response.data
+        booking = Booking.objects.get(pk=response.data["id"])
+        # created_at is auto_now_add, so it can only be backdated by an UPDATE.
+        Booking.objects.filter(pk=booking.pk).update(
+            created_at=timezone.now() - timedelta(minutes=minutes_ago)
+        )
+        return booking
+
+    return book
+
+
+def test_unpaid_booking_expires_and_frees_its_room(settings, book, auth_client, booking_payload):
+    settings.BOOKING_HOLD_MINUTES = 30
+    booking = book(minutes_ago=31)
+
+    assert expire_pending_bookings() == 1
+
+    booking.refresh_from_db()
+    assert booking.status == Booking.Status.CANCELLED
+    assert booking.payment.status == Payment.Status.EXPIRED
+    assert not RoomNight.objects.exists()
+    assert auth_client.post(BOOKINGS_URL, booking_payload).status_code == 201
+
+
+def test_bookings_within_the_hold_are_left_alone(settings, book):
+    settings.BOOKING_HOLD_MINUTES = 30
+    booking = book(minutes_ago=29)
+
+    assert expire_pending_bookings() == 0
+    booking.refresh_from_db()
+    assert booking.status == Booking.Status.PENDING
+
+
+def test_paid_bookings_never_expire(settings, book):
+    settings.BOOKING_HOLD_MINUTES = 30
+    booking = book()
+    Payment.objects.filter(booking=booking).update(status=Payment.Status.PAID)
+    Booking.objects.filter(pk=booking.pk).update(status=Booking.Status.CONFIRMED)
+
+    assert expire_pending_bookings(now=timezone.now() + timedelta(days=1)) == 0
+    assert RoomNight.objects.filter(booking=booking).count() == booking.nights
+
+
+def test_expires_in_batches(settings, book, hotel, room_type, django_assert_max_num_queries):
+    settings.BOOKING_HOLD_MINUTES = 30
+    for number in range(102, 106):
+        Room.objects.create(
+            hotel=hotel,
+            room_number=number,
+            room_type=room_type,
+            price_per_night=Decimal("100.00"),
+            max_guests=2,
+        )
+    for _ in range(5):
+        book(minutes_ago=45)
+
+    # Three batches of a SELECT, two UPDATEs and a DELETE, each in its own transaction.
+    with django_assert_max_num_queries(3 * (4 + 2) + 2):
+        assert expire_pending_bookings(batch_size=2) == 5
+    assert not Booking.objects.filter(status=Booking.Status.PENDING).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_each_batch_commits_on_its_own(settings, book, hotel, room_type, monkeypatch):
+    settings.BOOKING_HOLD_MINUTES = 30
+    for number in (102, 103):
+        Room.objects.create(
+            hotel=hotel,
+            room_number=number,
+            room_type=room_type,
+            price_per_night=Decimal("100.00"),
+            max_guests=2,
+        )
+    for _ in range(3):
+        book(minutes_ago=45)
+
+    # The second batch fails: the first one must have been committed already.
+    deletes = []
+    delete = QuerySet.delete
+
+    def failing_delete(queryset):
+        deletes.append(queryset.model)
+        if len(deletes) == 2:
+            raise RuntimeError("connection lost")
+        return delete(queryset)
+
+    monkeypatch.setattr(QuerySet, "delete", failing_delete)
+    with pytest.raises(RuntimeError):
+        expire_pending_bookings(batch_size=2)
+    monkeypatch.undo()
+
+    assert Booking.objects.filter(status=Booking.Status.CANCELLED).count() == 2
+    assert Booking.objects.filter(status=Booking.Status.PENDING).count() == 1
+
+
+def test_command_reports_what_it_expired(settings, book):
+    settings.BOOKING_HOLD_MINUTES = 30
+    book(minutes_ago=40)
+    out = StringIO()
+
+    call_command("expire_pending_bookings", stdout=out)
+
+    assert "Expired 1 unpaid booking(s)." in out.getvalue()
+
+
+APPLY_ONE_AND_IN_A_BATCH = [apply_payment_event, lambda event: apply_payment_events([event])]
+
+
+def paid(booking):
+    payment = Payment.objects.get(booking=booking)
+    return WebhookEvent(
+        provider_invoice_id=payment.provider_invoice_id,
+        reference=payment.reference,
+        status=Payment.Status.PAID,
+    )
+
+
+@pytest.mark.parametrize(
+    "apply", [apply_payment_event, lambda event: apply_payment_events([event])]
+)
+def test_payment_after_expiry_confirms_while_the_room_is_free(settings, book, apply):
+    settings.BOOKING_HOLD_MINUTES = 30
+    booking = book(minutes_ago=31)
+    expire_pending_bookings()
+
+    apply(paid(booking))
+
+    booking.refresh_from_db()
+    assert booking.status == Booking.Status.CONFIRMED
+    assert RoomNight.objects.filter(booking=booking).count() == booking.nights
+    assert not Payment.objects.get(booking=booking).refund_due
+
+
+@pytest.mark.parametrize(
+    "apply", [apply_payment_event, lambda event: apply_payment_events([event])]
+)
+def test_payment_after_expiry_is_refunded_once_the_room_is_resold(settings, book, apply):
+    settings.BOOKING_HOLD_MINUTES = 30
+    booking = book(minutes_ago=31)
+    expire_pending_bookings()
+    resold = book()
+
+    apply(paid(booking))
+
+    booking.refresh_from_db()
+    payment = Payment.objects.get(booking=booking)
+    assert booking.status == Booking.Status.CANCELLED
+    assert payment.status == Payment.Status.PAID
+    assert payment.refund_due
+    # The room stays sold once, to the second guest.
+    assert set(RoomNight.objects.values_list("booking_id", flat=True)) == {resold.pk}
+
+
+def test_payment_for_a_cancelled_booking_is_refunded(book):
+    booking = book()
+    cancel_booking(booking)
+
+    apply_payment_event(paid(booking))
+
+    booking.refresh_from_db()
+    assert booking.status == Booking.Status.CANCELLED
+    assert Payment.objects.get(booking=booking).refund_due
+    assert not RoomNight.objects.exists()
@@ -0,0 +1,84 @@
+"""?fields= and ?expand=, and the queries they save."""
+
+import pytest
+from django.urls import reverse
+
+from hotel.models import Review
+
+pytestmark = pytest.mark.django_db
+
+ROOMS_URL = reverse("room-list")
+BOOKINGS_URL = reverse("booking-list")
+
+
+def test_fields_trims_every_object(api_client, room, amenity):
+    room.amenities.add(amenity)
+
+    response = api_client.get(ROOMS_URL, {"fields": "id, price_per_night,nope"})
+
+    assert response.data["results"] == [{"id": room.pk, "price_per_night": "100.00"}]
+
+
+def test_without_fields_everything_is_returned(api_client, room):
+    row = api_client.get(ROOMS_URL).data["results"][0]
+    assert {"hotel_name", "room_type_name", "amenities", "amenities_detail"} <= set(row)
+
+
+def test_unrequested_relations_are_not_fetched(
+    api_client, room, amenity, django_assert_num_queries
+):
+    room.amenities.add(amenity)
+
+    # One COUNT and one SELECT of rooms alone: no amenities prefetch, and
+    # hotels joined for the default ordering only.
+    with django_assert_num_queries(2) as queries:
+        api_client.get(ROOMS_URL, {"fields": "id,room_number"})
+
+    sql = queries.captured_queries[-1]["sql"]
+    assert "hotel_roomtype" not in sql
+    assert '"hotel_hotel"."location"' not in sql
+
+
+def test_expand_embeds_the_related_object(api_client, room, hotel, room_type):
+    response = api_client.get(
+        reverse("room-detail", args=[room.pk]), {"fields": "id", "expand": "hotel,room_type"}
+    )
+
+    assert response.data == {
+        "id": room.pk,
+        "hotel": api_client.get(reverse("hotel-detail", args=[hotel.pk])).data,
+        "room_type": {"id": room_type.pk, "name": "Double", "description": "Fits two guests."},
+    }
+
+
+def test_expand_ignores_fields_that_cannot_be_expanded(api_client, room):
+    row = api_client.get(ROOMS_URL, {"expand": "amenities"}).data["results"][0]
+    assert row["amenities"] == []
+
+
+def test_booking_list_skips_rooms_and_payment(
+    auth_client, booking_payload, room, django_assert_num_queries
+):
+    auth_client.post(BOOKINGS_URL, booking_payload)
+
+    # Only the page itself: no payment join, no rooms prefetch.
+    with django_assert_num_queries(1):
+        response = auth_client.get(BOOKINGS_URL, {"fields": "id,check_in,check_out"})
+
+    assert list(response.data["results"][0]) == ["id", "check_in", "check_out"]
+
+
+def test_writes_are_answered_in_full(auth_client, booking_payload, room):
+    response = auth_client.post(f"{BOOKINGS_URL}?fields=id", booking_payload)
+
+    assert response.status_code == 201
+    assert {"rooms", "payment"} <= set(response.data)
+
+
+def test_review_hotel_expands(api_client, user, hotel):
+    Review.objects.create(user=user, hotel=hotel, rating=4)
+
+    row = api_client.get(reverse("review-list"), {"expand": "hotel"}).data["results"][0]
+
+    assert row["hotel"]["name"] == "Seaside Grand"
+    assert row["username"] == "guest"
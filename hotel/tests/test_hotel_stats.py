@@ -0,0 +1,154 @@
+"""Review and room summaries stored on the hotel, and kept in step with writes."""
+
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from hotel import stats
+from hotel.models import Hotel, Review, Room
+
+pytestmark = pytest.mark.django_db
+
+SUMMARY_FIELDS = (
+    "rating_sum",
+    "review_count",
+    "average_rating",
+    "ratings_1",
+    "ratings_2",
+    "ratings_3",
+    "ratings_4",
+    "ratings_5",
+    "room_count",
+    "min_price_per_night",
+)
+
+
+def _summary(hotel):
+    return Hotel.objects.filter(pk=hotel.pk).values(*SUMMARY_FIELDS).get()
+
+
+def assert_matches_rebuild(hotel):
+    kept = _summary(hotel)
+    stats.rebuild([hotel.pk])
+    assert kept == _summary(hotel)
+
+
+def _room(hotel, room_type, number, price, **extra):
+    return Room.objects.create(
+        hotel=hotel,
+        room_number=number,
+        room_type=room_type,
+        price_per_night=Decimal(price),
+        max_guests=2,
+        **extra,
+    )
+
+
+def test_reviews_are_counted_as_they_come_and_go(hotel, user, other_user):
+    first = Review.objects.create(user=user, hotel=hotel, rating=5)
+    Review.objects.create(user=other_user, hotel=hotel, rating=2)
+
+    hotel.refresh_from_db()
+    assert (hotel.review_count, hotel.rating_sum, hotel.average_rating) == (2, 7, 3.5)
+    assert hotel.rating_histogram == {1: 0, 2: 1, 3: 0, 4: 0, 5: 1}
+
+    first.rating = 4
+    first.save()
+    hotel.refresh_from_db()
+    assert (hotel.review_count, hotel.average_rating) == (2, 3.0)
+    assert hotel.rating_histogram[4] == 1 and hotel.rating_histogram[5] == 0
+    assert_matches_rebuild(hotel)
+
+    first.delete()
+    Review.objects.get(user=other_user).delete()
+    hotel.refresh_from_db()
+    assert (hotel.review_count, hotel.rating_sum, hotel.average_rating) == (0, 0, None)
+    assert_matches_rebuild(hotel)
+
+
+def test_a_review_moved_to_another_hotel_is_counted_there(hotel, user):
+    other = Hotel.objects.create(name="Old Town Inn", location="Lviv")
+    review = Review.objects.create(user=user, hotel=hotel, rating=3)
+
+    review.hotel = other
+    review.save()
+
+    assert_matches_rebuild(hotel)
+    assert_matches_rebuild(other)
+    assert _summary(other)["review_count"] == 1
+
+
+def test_saving_a_partly_loaded_review_still_counts_it_right(hotel, user):
+    Review.objects.create(user=user, hotel=hotel, rating=3)
+
+    review = Review.objects.only("id", "comment").get()
+    review.rating = 1
+    review.save()
+
+    hotel.refresh_from_db()
+    assert hotel.rating_histogram[1] == 1 and hotel.rating_histogram[3] == 0
+
+
+def test_rooms_keep_the_count_and_cheapest_price(hotel, room_type):
+    cheap = _room(hotel, room_type, 1, "80.00")
+    _room(hotel, room_type, 2, "120.00")
+    assert _summary(hotel)["room_count"] == 2
+    assert _summary(hotel)["min_price_per_night"] == Decimal("80.00")
+
+    cheap.is_available = False
+    cheap.save()
+    assert _summary(hotel)["min_price_per_night"] == Decimal("120.00")
+
+    cheap.delete()
+    Room.objects.get().delete()
+    assert _summary(hotel)["room_count"] == 0
+    assert _summary(hotel)["min_price_per_night"] is None
+    assert_matches_rebuild(hotel)
+
+
+def test_hotel_list_reads_no_reviews_or_rooms(
+    api_client, hotel, room, user, other_user, django_assert_num_queries
+):
+    Review.objects.create(user=user, hotel=hotel, rating=4)
+    Review.objects.create(user=other_user, hotel=hotel, rating=5)
+
+    # The count and the page; no join, no GROUP BY.
+    with django_assert_num_queries(2) as captured:
+        response = api_client.get(reverse("hotel-list"), {"ordering": "-average_rating"})
+
+    entry = response.data["results"][0]
+    assert entry["average_rating"] == 4.5
+    assert entry["room_count"] == 1
+    assert entry["min_price_per_night"] == "100.00"
+    assert all("hotel_review" not in query["sql"] for query in captured.captured_queries)
+
+
+def test_hotels_sort_by_stored_rating_and_price(api_client, hotel, room_type, user):
+    other = Hotel.objects.create(name="Old Town Inn", location="Lviv")
+    _room(hotel, room_type, 1, "150.00")
+    _room(other, room_type, 1, "60.00")
+    Review.objects.create(user=user, hotel=other, rating=5)
+
+    by_rating = api_client.get(reverse("hotel-list"), {"ordering": "-average_rating"})
+    by_price = api_client.get(reverse("hotel-list"), {"ordering": "min_price_per_night"})
+
+    assert [h["name"] for h in by_rating.data["results"]][0] == "Old Town Inn"
+    assert [h["name"] for h in by_price.data["results"]] == ["Old Town Inn", "Seaside Grand"]
+
+
+def test_rebuild_command_repairs_what_bulk_writes_skipped(hotel, room_type, user):
+    _room(hotel, room_type, 1, "90.00")
+    Review.objects.create(user=user, hotel=hotel, rating=4)
+    Review.objects.update(rating=2)
+    Room.objects.update(price_per_night=Decimal("70.00"))
+    out = StringIO()
+
+    call_command("rebuild_hotel_stats", stdout=out)
+
+    hotel.refresh_from_db()
+    assert hotel.rating_histogram[2] == 1 and hotel.average_rating == 2.0
+    assert hotel.min_price_per_night == Decimal("70.00")
+    assert "Rebuilt the summaries of 1 hotels." in out.getvalue()
@@ -5,7 +5,7 @@ import pytest
 from django.db import IntegrityError
 from django.utils import timezone
 
-from hotel.models import Booking, Review, Room
+from hotel.models import Booking, Review, Room, RoomNight
 
 pytestmark = pytest.mark.django_db
 
@@ -49,3 +49,16 @@ def test_one_review_per_user_per_hotel(user, hotel):
     Review.objects.create(user=user, hotel=hotel, rating=5, comment="Great.")
     with pytest.raises(IntegrityError):
         Review.objects.create(user=user, hotel=hotel, rating=1, comment="Changed my mind.")
+
+
+def test_a_room_night_can_only_be_held_once(user, hotel, room, stay_dates):
+    check_in, check_out = stay_dates
+    first = Booking.objects.create(
+        user=user, hotel=hotel, check_in=check_in, check_out=check_out, adults=1
+    )
+    second = Booking.objects.create(
+        user=user, hotel=hotel, check_in=check_in, check_out=check_out, adults=1
+    )
+    RoomNight.objects.create(room=room, booking=first, night=check_in)
+    with pytest.raises(IntegrityError):
+        RoomNight.objects.create(room=room, booking=second, night=check_in)
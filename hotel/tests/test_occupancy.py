@@ -0,0 +1,108 @@
+"""In-memory occupancy arithmetic, checked without a database."""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from hotel import occupancy
+
+START = date(2030, 5, 1)
+
+
+def day(offset):
+    return START + timedelta(days=offset)
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request, monkeypatch):
+    """Run each test through both passes; they must agree."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(occupancy, "numpy", None)
+    return request.param
+
+
+def test_no_stays_leaves_every_room_free(backend):
+    free = occupancy.free_counts(start=START, days=3, capacity={"double": 2}, stays=[])
+    assert free == {"double": [2, 2, 2]}
+
+
+def test_a_stay_takes_its_nights_but_not_its_check_out_day(backend):
+    free = occupancy.free_counts(
+        start=START, days=5, capacity={"double": 2}, stays=[("double", day(1), day(3))]
+    )
+    assert free == {"double": [2, 1, 1, 2, 2]}
+
+
+def test_overlapping_stays_add_up(backend):
+    stays = [("double", day(0), day(2)), ("double", day(1), day(4)), ("suite", day(2), day(3))]
+    free = occupancy.free_counts(
+        start=START, days=4, capacity={"double": 3, "suite": 1}, stays=stays
+    )
+    assert free == {"double": [2, 1, 2, 2], "suite": [1, 1, 0, 1]}
+
+
+def test_stays_are_clipped_to_the_window(backend):
+    stays = [("double", day(-3), day(1)), ("double", day(2), day(30))]
+    free = occupancy.free_counts(start=START, days=4, capacity={"double": 1}, stays=stays)
+    assert free == {"double": [0, 1, 0, 0]}
+
+
+def test_stays_outside_the_window_or_capacity_are_ignored(backend):
+    stays = [("double", day(-5), day(-1)), ("double", day(9), day(12)), ("gone", day(0), day(2))]
+    free = occupancy.free_counts(start=START, days=4, capacity={"double": 1}, stays=stays)
+    assert free == {"double": [1, 1, 1, 1]}
+
+
+def test_windows_slide_across_taken_nights():
+    # Room "a" is taken on days 2 and 3; room "b" on day 0.
+    held = [("a", day(2)), ("a", day(3)), ("b", day(0))]
+    windows = occupancy.free_windows(
+        first_start=START,
+        starts=5,
+        nights=2,
+        prices={"a": Decimal("80.00"), "b": Decimal("120.00")},
+        held=held,
+    )
+    assert windows == [
+        (day(0), 1, Decimal("80.00")),
+        (day(1), 1, Decimal("120.00")),
+        (day(2), 1, Decimal("120.00")),
+        (day(3), 1, Decimal("120.00")),
+        (day(4), 2, Decimal("80.00")),
+    ]
+
+
+def test_start_dates_with_nothing_free_are_left_out():
+    held = [("a", day(offset)) for offset in range(1, 3)]
+    windows = occupancy.free_windows(
+        first_start=START, starts=3, nights=2, prices={"a": Decimal("50.00")}, held=held
+    )
+    assert [start for start, _, _ in windows] == []
+
+
+def test_nights_outside_the_window_or_rooms_are_ignored():
+    held = [("a", day(-1)), ("a", day(9)), ("gone", day(0))]
+    windows = occupancy.free_windows(
+        first_start=START, starts=2, nights=1, prices={"a": Decimal("50.00")}, held=held
+    )
+    assert [(start, free) for start, free, _ in windows] == [(day(0), 1), (day(1), 1)]
+
+
+def test_best_fit_prefers_the_room_the_stay_closes_a_gap_in():
+    # "a" is booked right up to the stay and again right after it; "b" leaves
+    # a night either side; "c" has nothing nearby.
+    held = [("a", day(-1)), ("a", day(2)), ("b", day(-2)), ("b", day(3))]
+    order = occupancy.best_fit_order(
+        ["c", "b", "a"], check_in=day(0), check_out=day(2), held=held, reach=14
+    )
+    assert order == ["a", "b", "c"]
+
+
+def test_best_fit_keeps_the_given_order_on_ties():
+    order = occupancy.best_fit_order(
+        ["b", "a", "c"], check_in=day(0), check_out=day(2), held=[("x", day(2))], reach=14
+    )
+    assert order == ["b", "a", "c"]
@@ -0,0 +1,70 @@
+"""Cursor pages over the histories, and the numbered pages kept beside them."""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from hotel.models import Hotel, Review
+from hotel.pagination import NewestFirstPagination
+
+pytestmark = pytest.mark.django_db
+
+LIST_URL = reverse("review-list")
+
+
+@pytest.fixture
+def reviews(user, monkeypatch):
+    monkeypatch.setattr(NewestFirstPagination, "page_size", 5)
+    hotels = Hotel.objects.bulk_create(
+        Hotel(name=f"Hotel {number}", location="Odesa") for number in range(12)
+    )
+    # Bulk-created rows share a timestamp, so only the id tells them apart.
+    return Review.objects.bulk_create(
+        Review(user=user, hotel=hotel, rating=number % 5 + 1) for number, hotel in enumerate(hotels)
+    )
+
+
+def walk(client, url, params=None):
+    ids, response = [], client.get(url, params)
+    while True:
+        ids += [row["id"] for row in response.data["results"]]
+        if not response.data["next"]:
+            return ids
+        response = client.get(response.data["next"])
+
+
+def test_cursor_pages_cover_every_row_once_newest_first(api_client, reviews):
+    first = api_client.get(LIST_URL)
+
+    assert set(first.data) == {"next", "previous", "results"}
+    assert walk(api_client, LIST_URL) == sorted((review.pk for review in reviews), reverse=True)
+
+
+def test_cursor_pages_do_not_count_or_offset(api_client, reviews):
+    next_url = api_client.get(LIST_URL).data["next"]
+
+    with CaptureQueriesContext(connection) as queries:
+        api_client.get(next_url)
+
+    sql = " ".join(query["sql"] for query in queries.captured_queries).upper()
+    assert "COUNT(" not in sql
+    assert "OFFSET" not in sql
+
+
+def test_ordering_by_a_repeated_column_still_visits_every_row(api_client, reviews):
+    ids = walk(api_client, LIST_URL, {"ordering": "rating"})
+
+    assert sorted(ids) == sorted(review.pk for review in reviews)
+    ratings = [Review.objects.get(pk=pk).rating for pk in ids]
+    assert ratings == sorted(ratings)
+
+
+def test_page_numbers_still_work(api_client, reviews):
+    response = api_client.get(LIST_URL, {"page": 2})
+
+    assert response.data["count"] == 12
+    assert [row["id"] for row in response.data["results"]] == [
+        review.pk for review in sorted(reviews, key=lambda review: -review.pk)[5:10]
+    ]
+    assert "page=3" in response.data["next"]
@@ -0,0 +1,382 @@
+"""The Monobank client against a local stub of its API."""
+
+import base64
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+
+import pytest
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from hotel.models import Booking, Payment
+from hotel.payments import (
+    InvoiceRequest,
+    MonobankPaymentProvider,
+    PaymentError,
+    get_payment_provider,
+    monobank,
+)
+from hotel.payments.http import CircuitBreaker, RateLimiter
+from hotel.services import reconcile_payments
+
+
+class StubAcquirer(ThreadingHTTPServer):
+    """Answers each path from a queue of (status, body) replies; repeats the last one."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.replies: dict[str, list[tuple[int, dict]]] = {}
+        self.seen: list[tuple[str, str, int]] = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reply(self, path, *replies):
+        self.replies[path] = list(replies)
+
+    def next_reply(self, path):
+        queue = self.replies.get(path) or [(404, {})]
+        return queue.pop(0) if len(queue) > 1 else queue[0]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API.
+
+    def _answer(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self.server.seen.append((self.command, self.path, self.client_address[1]))
+        status, body = self.server.next_reply(self.path)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = _answer
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = StubAcquirer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_provider(stub):
+    def make(**breaker):
+        breaker = CircuitBreaker(**{"failure_threshold": 5, "reset_after": 60, **breaker})
+        return MonobankPaymentProvider(token="test-token", api_url=stub.url, breaker=breaker)
+
+    return make
+
+
+INVOICE_PATH = "/api/merchant/invoice/create"
+PUBKEY_PATH = "/api/merchant/pubkey"
+
+
+def _invoice_request():
+    return InvoiceRequest(
+        reference="booking-1",
+        amount=Decimal("200.00"),
+        currency_code=980,
+        description="Booking #1",
+        redirect_url="http://testserver/success/",
+        webhook_url="http://testserver/webhook/",
+    )
+
+
+def _created(number=1):
+    return 200, {"invoiceId": f"inv{number}", "pageUrl": f"https://pay.example/{number}"}
+
+
+def test_invoices_share_one_kept_alive_connection(stub, make_provider):
+    stub.reply(INVOICE_PATH, _created())
+    provider = make_provider()
+
+    for _ in range(3):
+        provider.create_invoice(_invoice_request())
+
+    assert len(stub.seen) == 3
+    assert len({port for _, _, port in stub.seen}) == 1
+
+
+def _key_reply(private_key):
+    pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return 200, {"key": base64.b64encode(pem).decode()}
+
+
+def _sign(private_key, body):
+    return base64.b64encode(private_key.sign(body, ec.ECDSA(hashes.SHA256()))).decode()
+
+
+def test_idempotent_reads_are_retried(stub, make_provider):
+    cache.clear()
+    stub.reply(PUBKEY_PATH, (503, {}), _key_reply(ec.generate_private_key(ec.SECP256R1())))
+
+    key = make_provider()._public_key()
+
+    assert isinstance(key, ec.EllipticCurvePublicKey)
+    assert [method for method, _, _ in stub.seen] == ["GET", "GET"]
+
+
+def test_invoice_creation_is_never_sent_twice(stub, make_provider):
+    stub.reply(INVOICE_PATH, (503, {}))
+
+    with pytest.raises(PaymentError):
+        make_provider().create_invoice(_invoice_request())
+    assert len(stub.seen) == 1
+
+
+def test_circuit_opens_and_fails_fast(stub, make_provider):
+    stub.reply(INVOICE_PATH, (502, {}))
+    provider = make_provider(failure_threshold=2)
+
+    for _ in range(2):
+        with pytest.raises(PaymentError):
+            provider.create_invoice(_invoice_request())
+    with pytest.raises(PaymentError, match="unavailable"):
+        provider.create_invoice(_invoice_request())
+
+    assert len(stub.seen) == 2
+
+
+def test_circuit_closes_after_a_successful_trial(stub, make_provider):
+    stub.reply(INVOICE_PATH, (502, {}), (502, {}), _created())
+    provider = make_provider(failure_threshold=2, reset_after=0.05)
+    for _ in range(2):
+        with pytest.raises(PaymentError):
+            provider.create_invoice(_invoice_request())
+
+    time.sleep(0.1)
+
+    assert provider.create_invoice(_invoice_request()).provider_invoice_id == "inv1"
+    assert not provider._breaker.is_open
+
+
+def test_client_errors_do_not_open_the_circuit(stub, make_provider):
+    stub.reply(INVOICE_PATH, (400, {"errText": "bad amount"}))
+    provider = make_provider(failure_threshold=2)
+
+    for _ in range(3):
+        with pytest.raises(PaymentError):
+            provider.create_invoice(_invoice_request())
+    assert len(stub.seen) == 3
+
+
+def test_breaker_lets_one_trial_through_at_a_time():
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=0)
+    breaker.record_failure()
+
+    breaker.before_call()
+    with pytest.raises(Exception, match="consecutive failures"):
+        breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+
+
+def test_provider_is_shared_until_its_settings_change(settings):
+    settings.PAYMENT_PROVIDER = "monobank"
+    settings.MONOBANK_TOKEN = "first-token"
+    provider = get_payment_provider()
+    assert get_payment_provider() is provider
+
+    settings.MONOBANK_TOKEN = "second-token"
+    assert get_payment_provider().token == "second-token"
+
+
+# --------------------------------------------------------------------------
+# Webhook public key
+# --------------------------------------------------------------------------
+
+BODY = b'{"invoiceId": "inv1", "status": "success"}'
+
+
+@pytest.fixture
+def signing_key(stub):
+    cache.clear()
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    stub.reply(PUBKEY_PATH, _key_reply(private_key))
+    return private_key
+
+
+def test_key_is_fetched_and_parsed_once(stub, make_provider, signing_key, monkeypatch):
+    parsed = []
+    load = serialization.load_pem_public_key
+    monkeypatch.setattr(
+        monobank.serialization, "load_pem_public_key", lambda pem: parsed.append(pem) or load(pem)
+    )
+    provider = make_provider()
+
+    for _ in range(5):
+        assert provider.verify_webhook(BODY, {"X-Sign": _sign(signing_key, BODY)})
+
+    assert len(stub.seen) == 1
+    assert len(parsed) == 1
+
+
+def test_concurrent_misses_share_one_fetch(stub, make_provider, signing_key):
+    provider = make_provider()
+    start = threading.Barrier(10)
+
+    def load():
+        start.wait()
+        provider._public_key()
+
+    threads = [threading.Thread(target=load) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(stub.seen) == 1
+
+
+def test_rotated_key_is_picked_up_on_a_failed_signature(stub, make_provider, signing_key):
+    provider = make_provider()
+    assert provider.verify_webhook(BODY, {"X-Sign": _sign(signing_key, BODY)})
+    rotated = ec.generate_private_key(ec.SECP256R1())
+    stub.reply(PUBKEY_PATH, _key_reply(rotated))
+    provider._key_loaded_at -= monobank._PUBKEY_REFETCH_INTERVAL
+
+    assert provider.verify_webhook(BODY, {"X-Sign": _sign(rotated, BODY)})
+    assert len(stub.seen) == 2
+
+
+def test_forged_signatures_cannot_force_refetches(stub, make_provider, signing_key):
+    provider = make_provider()
+    forger = ec.generate_private_key(ec.SECP256R1())
+
+    for _ in range(3):
+        assert not provider.verify_webhook(BODY, {"X-Sign": _sign(forger, BODY)})
+
+    assert len(stub.seen) == 1
+
+
+# --------------------------------------------------------------------------
+# Reconciliation of payments whose webhook was lost
+# --------------------------------------------------------------------------
+
+
+def _status_path(invoice_id):
+    return f"/api/merchant/invoice/status?invoiceId={invoice_id}"
+
+
+def test_invoice_status_is_read_like_a_webhook(stub, make_provider):
+    stub.reply(_status_path("inv1"), (200, {"invoiceId": "inv1", "status": "success"}))
+
+    event = make_provider().get_invoice_status("inv1")
+
+    assert (event.provider_invoice_id, event.status) == ("inv1", Payment.Status.PAID)
+
+
+def test_invoice_is_withdrawn(stub, make_provider):
+    stub.reply("/api/merchant/invoice/remove", (200, {}))
+
+    make_provider().cancel_invoice("inv1")
+
+    assert stub.seen[-1][:2] == ("POST", "/api/merchant/invoice/remove")
+
+
+def test_rate_limiter_spaces_calls_across_threads():
+    limiter = RateLimiter(50)
+    started = time.monotonic()
+
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Six slots at 20ms apart: the last is 100ms after the first.
+    assert time.monotonic() - started >= 0.1
+
+
+@pytest.fixture
+def stale_payments(user, hotel, stay_dates):
+    check_in, check_out = stay_dates
+    payments = []
+    for number in range(1, 5):
+        booking = Booking.objects.create(
+            user=user, hotel=hotel, check_in=check_in, check_out=check_out, adults=1
+        )
+        payments.append(
+            Payment.objects.create(
+                booking=booking,
+                provider="monobank",
+                reference=f"booking-{number}",
+                provider_invoice_id=f"inv{number}",
+                amount=Decimal("200.00"),
+            )
+        )
+    Payment.objects.filter(pk__in=[p.pk for p in payments[:3]]).update(
+        created_at=timezone.now() - timedelta(hours=1)
+    )
+    return payments
+
+
+@pytest.mark.django_db
+def test_reconciliation_settles_stale_payments(stub, make_provider, stale_payments, monkeypatch):
+    provider = make_provider()
+    monkeypatch.setattr("hotel.services.get_payment_provider", lambda: provider)
+    stub.reply(_status_path("inv1"), (200, {"invoiceId": "inv1", "status": "success"}))
+    stub.reply(_status_path("inv2"), (404, {"errText": "invoice not found"}))
+    stub.reply(_status_path("inv3"), (200, {"invoiceId": "inv3", "status": "processing"}))
+
+    assert reconcile_payments(rate=100, batch_size=2) == (3, 1, 1)
+
+    statuses = dict(Payment.objects.values_list("provider_invoice_id", "status"))
+    assert statuses == {
+        "inv1": Payment.Status.PAID,
+        "inv2": Payment.Status.PENDING,
+        "inv3": Payment.Status.PENDING,
+        "inv4": Payment.Status.PENDING,
+    }
+    assert Booking.objects.get(payment__provider_invoice_id="inv1").status == (
+        Booking.Status.CONFIRMED
+    )
+    # The payment made a moment ago was left alone.
+    assert _status_path("inv4") not in {path for _, path, _ in stub.seen}
+
+
+@pytest.fixture
+def pending_payment(user, hotel, stay_dates):
+    check_in, check_out = stay_dates
+    booking = Booking.objects.create(
+        user=user, hotel=hotel, check_in=check_in, check_out=check_out, adults=1
+    )
+    return Payment.objects.create(
+        booking=booking,
+        provider="fake",
+        reference="booking-fake",
+        provider_invoice_id="fake_1",
+        amount=Decimal("200.00"),
+    )
+
+
+@pytest.mark.django_db
+def test_reconcile_command_reports_what_it_did(pending_payment):
+    out = StringIO()
+
+    call_command("reconcile_payments", "--older-than", "0", stdout=out)
+
+    assert "Checked 1 pending payments: 0 settled, 0 unchecked." in out.getvalue()
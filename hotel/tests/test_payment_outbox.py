@@ -0,0 +1,169 @@
+"""Invoices requested off the request path, through the payment outbox."""
+
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from hotel.models import Booking, Payment, PaymentOutbox, RoomNight
+from hotel.payments import FakePaymentProvider, PaymentError
+from hotel.services import cancel_booking, process_payment_outbox
+
+pytestmark = pytest.mark.django_db
+
+BOOKINGS_URL = reverse("booking-list")
+
+
+class RecordingProvider(FakePaymentProvider):
+    calls = 0
+    failing = False
+
+    def create_invoice(self, request):
+        type(self).calls += 1
+        if self.failing:
+            raise PaymentError("provider unreachable")
+        return super().create_invoice(request)
+
+
+@pytest.fixture
+def provider(settings, monkeypatch):
+    settings.PAYMENT_INVOICE_MODE = "outbox"
+
+    class Provider(RecordingProvider):
+        pass
+
+    monkeypatch.setattr("hotel.services.get_payment_provider", Provider)
+    return Provider
+
+
+@pytest.fixture
+def booking(auth_client, booking_payload, room, provider):
+    response = auth_client.post(BOOKINGS_URL, booking_payload)
+    assert response.status_code == 201, response.data
+    return Booking.objects.get(pk=response.data["id"])
+
+
+def _make_due():
+    PaymentOutbox.objects.update(next_attempt_at=timezone.now())
+
+
+def test_booking_returns_before_the_invoice_exists(auth_client, booking_payload, room, provider):
+    response = auth_client.post(BOOKINGS_URL, booking_payload)
+
+    assert response.status_code == 201
+    assert response.data["payment"]["status"] == Payment.Status.PENDING
+    assert response.data["payment"]["payment_url"] == ""
+    assert provider.calls == 0
+    assert PaymentOutbox.objects.count() == 1
+
+
+def test_worker_attaches_the_invoice(auth_client, booking, provider):
+    assert process_payment_outbox(workers=1) == 1
+
+    payment = Payment.objects.get(booking=booking)
+    assert payment.payment_url and payment.provider_invoice_id
+    assert not PaymentOutbox.objects.exists()
+    # What the polling client sees.
+    detail = auth_client.get(reverse("booking-detail", args=[booking.pk]))
+    assert detail.data["payment"]["payment_url"] == payment.payment_url
+
+
+def test_picked_entries_are_leased_to_their_worker(booking, provider, monkeypatch):
+    monkeypatch.setattr("hotel.services.deliver_outbox_entry", lambda entry: True)
+    assert process_payment_outbox(workers=1) == 1
+    # Still in the outbox, but not due again until the lease runs out.
+    assert process_payment_outbox(workers=1) == 0
+
+
+def test_failures_are_retried_with_a_growing_delay(booking, provider):
+    provider.failing = True
+
+    process_payment_outbox(workers=1)
+    first = PaymentOutbox.objects.get()
+    _make_due()
+    process_payment_outbox(workers=1)
+    second = PaymentOutbox.objects.get()
+
+    assert second.attempts == 2
+    assert "provider unreachable" in second.last_error
+    assert second.next_attempt_at - timezone.now() > timedelta(seconds=15)
+    assert first.next_attempt_at - timezone.now() < timedelta(seconds=15)
+    assert Booking.objects.get().status == Booking.Status.PENDING
+
+
+def test_booking_is_cancelled_once_attempts_run_out(settings, booking, provider):
+    settings.PAYMENT_OUTBOX_MAX_ATTEMPTS = 2
+    provider.failing = True
+
+    for _ in range(2):
+        _make_due()
+        process_payment_outbox(workers=1)
+
+    booking.refresh_from_db()
+    assert booking.status == Booking.Status.CANCELLED
+    assert booking.payment.status == Payment.Status.FAILED
+    assert not RoomNight.objects.exists()
+    assert not PaymentOutbox.objects.exists()
+
+
+def test_late_invoices_are_payable_only_for_the_rest_of_the_hold(settings, booking, provider):
+    settings.BOOKING_HOLD_MINUTES = 30
+    seen = []
+    provider.create_invoice = lambda self, request: (
+        seen.append(request) or (FakePaymentProvider.create_invoice(self, request))
+    )
+    Booking.objects.filter(pk=booking.pk).update(created_at=timezone.now() - timedelta(minutes=25))
+
+    process_payment_outbox(workers=1)
+
+    assert 4 * 60 <= seen[0].validity <= 5 * 60
+
+
+def test_entries_past_the_hold_are_dropped(settings, booking, provider):
+    settings.BOOKING_HOLD_MINUTES = 30
+    Booking.objects.filter(pk=booking.pk).update(created_at=timezone.now() - timedelta(minutes=31))
+
+    process_payment_outbox(workers=1)
+
+    assert provider.calls == 0
+    assert not PaymentOutbox.objects.exists()
+
+
+def test_cancelled_bookings_are_not_invoiced(booking, provider):
+    cancel_booking(booking)
+
+    process_payment_outbox(workers=1)
+
+    assert provider.calls == 0
+    assert not PaymentOutbox.objects.exists()
+
+
+def test_invoice_for_a_booking_cancelled_mid_call_is_withdrawn(booking, provider):
+    withdrawn = []
+
+    def create_invoice(self, request):
+        # The sweep, or the guest, gets there while the provider is answering.
+        cancel_booking(Booking.objects.get(pk=booking.pk))
+        return FakePaymentProvider.create_invoice(self, request)
+
+    provider.create_invoice = create_invoice
+    provider.cancel_invoice = lambda self, invoice_id: withdrawn.append(invoice_id)
+
+    assert process_payment_outbox(workers=1) == 1
+
+    payment = Payment.objects.get()
+    assert payment.payment_url == ""
+    assert payment.provider_invoice_id is None
+    assert len(withdrawn) == 1
+    assert not PaymentOutbox.objects.exists()
+
+
+def test_command_works_off_what_is_due(booking, provider):
+    out = StringIO()
+    call_command("run_payment_outbox", "--once", "--workers", "1", stdout=out)
+
+    assert "Worked off 1 outbox entries." in out.getvalue()
+    assert Payment.objects.get().payment_url
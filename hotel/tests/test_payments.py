@@ -19,7 +19,9 @@ from hotel.payments import (
     PaymentError,
     get_payment_provider,
 )
+from hotel.payments.base import WebhookEvent
 from hotel.payments.monobank import _PUBKEY_CACHE_KEY
+from hotel.services import apply_payment_event
 
 WEBHOOK_URL = reverse("payment-webhook")
 BOOKINGS_URL = reverse("booking-list")
@@ -184,6 +186,29 @@ def test_failed_payment_cancels_the_booking_and_frees_the_room(
     assert auth_client.post(BOOKINGS_URL, booking_payload).status_code == 201
 
 
+@pytest.mark.django_db(transaction=True)
+def test_payment_event_is_applied_in_one_transaction(pending_booking, monkeypatch):
+    """Outside any test transaction, as the webhook view calls it."""
+    payment = pending_booking.payment
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(Booking, "save", fail)
+    with pytest.raises(RuntimeError):
+        apply_payment_event(
+            WebhookEvent(
+                provider_invoice_id=payment.provider_invoice_id,
+                reference=payment.reference,
+                status=Payment.Status.PAID,
+            )
+        )
+
+    # The payment was saved before the booking failed to be, and rolled back.
+    payment.refresh_from_db()
+    assert payment.status == Payment.Status.PENDING
+
+
 @pytest.mark.django_db
 def test_webhook_for_an_unknown_invoice_is_a_404(api_client):
     response = post_webhook(api_client, {"invoiceId": "nope", "status": "success"})
@@ -205,7 +230,7 @@ def test_malformed_webhook_body_is_a_400(api_client):
 @pytest.mark.django_db
 def test_payment_records_are_staff_only(auth_client, staff_client, pending_booking):
     assert auth_client.get(reverse("payment-list")).status_code == 403
-    assert staff_client.get(reverse("payment-list")).data["count"] == 1
+    assert len(staff_client.get(reverse("payment-list")).data["results"]) == 1
 
 
 @pytest.mark.django_db
@@ -213,6 +238,24 @@ def test_invoice_amount_matches_the_stay(pending_booking):
     assert pending_booking.payment.amount == Decimal("200.00")
 
 
+@pytest.mark.django_db
+def test_invoice_is_payable_for_the_booking_hold(
+    auth_client, booking_payload, room, settings, monkeypatch
+):
+    settings.BOOKING_HOLD_MINUTES = 20
+    requests_seen = []
+
+    class RecordingProvider(FakePaymentProvider):
+        def create_invoice(self, request):
+            requests_seen.append(request)
+            return super().create_invoice(request)
+
+    monkeypatch.setattr("hotel.services.get_payment_provider", RecordingProvider)
+    assert auth_client.post(BOOKINGS_URL, booking_payload).status_code == 201
+    # What is left of the hold, measured from the booking's creation.
+    assert 20 * 60 - 5 <= requests_seen[0].validity <= 20 * 60
+
+
 # --------------------------------------------------------------------------
 # Provider failures must not leave a room held
 # --------------------------------------------------------------------------
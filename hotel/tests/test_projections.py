@@ -0,0 +1,87 @@
+"""The projected list pages render exactly what the serializers render."""
+
+from decimal import Decimal
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+
+from hotel.models import Amenity, Hotel, Review, Room
+from hotel.projections import ReviewProjection
+from hotel.views import HotelViewSet, ReviewViewSet, RoomViewSet
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def catalogue(hotel, room_type, room, amenity, user, other_user):
+    empty = Hotel.objects.create(name="Empty Inn", location="Kyiv")
+    pool = Amenity.objects.create(name="Pool", description="")
+    bath = Amenity.objects.create(name="Bathtub", description="Deep.")
+    room.amenities.add(pool, amenity, bath)
+    Room.objects.create(
+        hotel=empty,
+        room_number=7,
+        room_type=room_type,
+        price_per_night=Decimal("59.5"),
+        max_guests=1,
+        is_available=False,
+    )
+    Review.objects.create(user=user, hotel=hotel, rating=4, comment="Quiet.")
+    Review.objects.create(user=other_user, hotel=hotel, rating=2)
+    Review.objects.create(user=user, hotel=empty, rating=5, comment="Cosy.")
+
+
+def both_ways(client, monkeypatch, viewset, url, params=None):
+    projected = client.get(url, params)
+    with monkeypatch.context() as patch:
+        patch.setattr(viewset, "projection_class", None)
+        serialized = client.get(url, params)
+    assert projected.status_code == serialized.status_code == 200
+    return projected.content, serialized.content
+
+
+@pytest.mark.parametrize(
+    ("viewset", "url", "params"),
+    [
+        (HotelViewSet, "hotel-list", None),
+        (HotelViewSet, "hotel-list", {"ordering": "-average_rating"}),
+        (HotelViewSet, "hotel-list", {"fields": "id,rating_histogram,min_price_per_night"}),
+        (RoomViewSet, "room-list", None),
+        (RoomViewSet, "room-list", {"is_available": "true"}),
+        (RoomViewSet, "room-list", {"fields": "id,amenities"}),
+        (ReviewViewSet, "review-list", None),
+        (ReviewViewSet, "review-list", {"ordering": "rating"}),
+        (ReviewViewSet, "review-list", {"page": 1, "fields": "username,created_at"}),
+    ],
+)
+def test_projection_matches_serializer(auth_client, catalogue, monkeypatch, viewset, url, params):
+    # Authenticated, so that neither response comes from the response cache.
+    projected, serialized = both_ways(auth_client, monkeypatch, viewset, reverse(url), params)
+    assert projected == serialized
+
+
+def test_cursor_pages_match(auth_client, catalogue, monkeypatch):
+    monkeypatch.setattr(ReviewViewSet.pagination_class, "page_size", 2)
+    url = auth_client.get(reverse("review-list")).data["next"]
+
+    projected, serialized = both_ways(auth_client, monkeypatch, ReviewViewSet, url)
+
+    assert projected == serialized
+
+
+def test_room_page_reads_amenities_in_one_query(auth_client, catalogue, django_assert_num_queries):
+    # COUNT, the page, and every amenity of the page.
+    with django_assert_num_queries(3):
+        auth_client.get(reverse("room-list"))
+
+
+def test_projection_must_cover_every_serializer_field():
+    with pytest.raises(ImproperlyConfigured, match="comment"):
+
+        class Incomplete(ReviewProjection):
+            columns = {
+                name: lookup
+                for name, lookup in ReviewProjection.columns.items()
+                if name != "comment"
+            }
@@ -0,0 +1,118 @@
+"""Rendered catalogue responses served from the cache to anonymous clients."""
+
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from hotel.models import Hotel
+from HotelBookingAPI.settings import cache_from_url
+
+pytestmark = pytest.mark.django_db
+
+HOTELS_URL = reverse("hotel-list")
+
+
+def test_a_repeat_request_is_served_without_queries(
+    api_client, hotel, room, django_assert_num_queries
+):
+    for url in (HOTELS_URL, reverse("room-list"), reverse("hotel-detail", args=[hotel.pk])):
+        first = api_client.get(url)
+
+        with django_assert_num_queries(0):
+            second = api_client.get(url)
+
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert second["Content-Type"] == first["Content-Type"]
+        assert second["ETag"] == first["ETag"]
+
+
+def test_parameter_order_shares_one_entry(api_client, hotel, django_assert_num_queries):
+    first = api_client.get(f"{HOTELS_URL}?search=sea&ordering=name")
+
+    with django_assert_num_queries(0):
+        second = api_client.get(f"{HOTELS_URL}?ordering=name&search=sea")
+
+    assert second.content == first.content
+
+
+def test_a_write_replaces_the_entry(api_client, hotel, commit):
+    api_client.get(HOTELS_URL)
+
+    with commit():
+        Hotel.objects.create(name="Harbour View", location="Lviv")
+
+    names = [row["name"] for row in api_client.get(HOTELS_URL).json()["results"]]
+    assert "Harbour View" in names
+
+
+def test_the_other_workers_entry_is_reused(api_client, hotel, django_assert_num_queries):
+    first = api_client.get(HOTELS_URL)
+    caches["local"].clear()
+
+    with django_assert_num_queries(0):
+        second = api_client.get(HOTELS_URL)
+
+    assert second.content == first.content
+
+
+def test_authenticated_requests_bypass_the_cache(auth_client, hotel):
+    # Neither stored for an authenticated client...
+    etag = auth_client.get(HOTELS_URL)["ETag"]
+    assert caches["default"].get(f"response:{etag.strip(chr(34))}") is None
+
+    # ...nor served to one from what an anonymous client left.
+    APIClient().get(HOTELS_URL)
+    with CaptureQueriesContext(connection) as queries:
+        response = auth_client.get(HOTELS_URL)
+
+    assert response.status_code == 200
+    assert queries.captured_queries
+
+
+def test_errors_are_not_cached(api_client, django_assert_num_queries):
+    url = reverse("hotel-detail", args=[999])
+    assert api_client.get(url).status_code == 404
+
+    with django_assert_num_queries(1):
+        assert api_client.get(url).status_code == 404
+
+
+def test_zero_ttl_disables_the_cache(api_client, hotel, settings, django_assert_num_queries):
+    settings.CATALOGUE_CACHE_TTL = 0
+    api_client.get(HOTELS_URL)
+
+    with django_assert_num_queries(2):
+        api_client.get(HOTELS_URL)
+
+
+@pytest.mark.parametrize(
+    ("url", "backend", "location"),
+    [
+        ("", "locmem.LocMemCache", ""),
+        ("redis://redis:6379/0", "redis.RedisCache", "redis://redis:6379/0"),
+        ("file:///var/tmp/cache", "filebased.FileBasedCache", "/var/tmp/cache"),
+        ("db://cache_table", "db.DatabaseCache", "cache_table"),
+    ],
+)
+def test_cache_url(url, backend, location):
+    assert cache_from_url(url, debug=True) == {
+        "BACKEND": f"django.core.cache.backends.{backend}",
+        "LOCATION": location,
+    }
+
+
+def test_unknown_cache_url_is_refused():
+    with pytest.raises(RuntimeError):
+        cache_from_url("memcached://localhost:11211", debug=True)
+
+
+def test_cache_url_is_required_when_debug_is_off():
+    """Per-process caches would give each gunicorn worker its own ETags and responses."""
+    with pytest.raises(RuntimeError, match="CACHE_URL"):
+        cache_from_url("", debug=False)
+
+    assert cache_from_url("locmem://", debug=False)["BACKEND"].endswith("LocMemCache")
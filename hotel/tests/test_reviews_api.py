@@ -16,7 +16,7 @@ def test_reviews_are_publicly_readable(api_client, user, hotel):
     Review.objects.create(user=user, hotel=hotel, rating=5, comment="Lovely stay.")
     response = api_client.get(LIST_URL)
     assert response.status_code == 200
-    assert response.data["count"] == 1
+    assert len(response.data["results"]) == 1
 
 
 def test_anonymous_cannot_post_a_review(api_client, hotel):
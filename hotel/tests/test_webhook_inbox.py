@@ -0,0 +1,128 @@
+"""Payment webhooks stored by the endpoint and applied in batches by a worker."""
+
+import json
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from hotel.models import Booking, Payment, Room, RoomNight, WebhookInbox
+from hotel.payments import WebhookEvent
+from hotel.services import apply_payment_events, process_webhook_inbox
+
+pytestmark = pytest.mark.django_db
+
+WEBHOOK_URL = reverse("payment-webhook")
+BOOKINGS_URL = reverse("booking-list")
+
+
+@pytest.fixture(autouse=True)
+def inbox_mode(settings):
+    settings.PAYMENT_WEBHOOK_MODE = "inbox"
+
+
+@pytest.fixture
+def bookings(auth_client, booking_payload, hotel, room_type, room):
+    for number in (102, 103):
+        Room.objects.create(
+            hotel=hotel,
+            room_number=number,
+            room_type=room_type,
+            price_per_night=Decimal("100.00"),
+            max_guests=2,
+        )
+    made = []
+    for _ in range(3):
+        response = auth_client.post(BOOKINGS_URL, booking_payload)
+        assert response.status_code == 201, response.data
+        made.append(Booking.objects.get(pk=response.data["id"]))
+    return made
+
+
+def post_webhook(client, payload):
+    return client.post(WEBHOOK_URL, data=json.dumps(payload), content_type="application/json")
+
+
+def test_webhook_is_stored_and_not_applied(api_client, bookings):
+    payment = bookings[0].payment
+    payload = {"invoiceId": payment.provider_invoice_id, "status": "success"}
+
+    response = post_webhook(api_client, payload)
+
+    assert response.status_code == 200
+    entry = WebhookInbox.objects.get()
+    assert entry.status == Payment.Status.PAID
+    assert entry.payload == payload
+    payment.refresh_from_db()
+    assert payment.status == Payment.Status.PENDING
+
+
+def test_replayed_webhook_is_stored_once(api_client, bookings):
+    payload = {"invoiceId": bookings[0].payment.provider_invoice_id, "status": "success"}
+
+    assert post_webhook(api_client, payload).status_code == 200
+    assert post_webhook(api_client, payload).status_code == 200
+
+    assert WebhookInbox.objects.count() == 1
+
+
+def test_worker_applies_a_batch(api_client, bookings, django_assert_max_num_queries):
+    paid, failed, untouched = bookings
+    post_webhook(api_client, {"invoiceId": paid.payment.provider_invoice_id, "status": "success"})
+    post_webhook(api_client, {"invoiceId": failed.payment.provider_invoice_id, "status": "failure"})
+
+    # Select, lock, two bulk updates, one delete, mark processed, plus savepoints.
+    with django_assert_max_num_queries(10):
+        assert process_webhook_inbox() == 2
+
+    for booking in bookings:
+        booking.refresh_from_db()
+    assert paid.status == Booking.Status.CONFIRMED
+    assert paid.payment.status == Payment.Status.PAID
+    assert paid.payment.paid_at is not None
+    assert failed.status == Booking.Status.CANCELLED
+    assert not RoomNight.objects.filter(booking=failed).exists()
+    assert untouched.status == Booking.Status.PENDING
+    assert not WebhookInbox.objects.filter(processed_at__isnull=True).exists()
+    # Nothing left to do.
+    assert process_webhook_inbox() == 0
+
+
+def test_later_events_in_a_batch_win(bookings):
+    payment = bookings[0].payment
+    events = [
+        WebhookEvent(payment.provider_invoice_id, payment.reference, status)
+        for status in (Payment.Status.PAID, Payment.Status.REVERSED)
+    ]
+
+    assert apply_payment_events(events) == 2
+
+    payment.refresh_from_db()
+    assert payment.status == Payment.Status.REVERSED
+    assert Booking.objects.get(pk=bookings[0].pk).status == Booking.Status.CANCELLED
+
+
+def test_unknown_invoices_are_skipped(bookings):
+    payment = bookings[0].payment
+    events = [
+        WebhookEvent("nope", "", Payment.Status.PAID),
+        WebhookEvent(payment.provider_invoice_id, payment.reference, Payment.Status.PAID),
+    ]
+
+    assert apply_payment_events(events) == 1
+    payment.refresh_from_db()
+    assert payment.status == Payment.Status.PAID
+
+
+def test_command_works_off_the_inbox(api_client, bookings):
+    payment = bookings[0].payment
+    post_webhook(api_client, {"invoiceId": payment.provider_invoice_id, "status": "success"})
+    out = StringIO()
+
+    call_command("process_webhook_inbox", "--once", stdout=out)
+
+    assert "Applied 1 webhook events." in out.getvalue()
+    payment.refresh_from_db()
+    assert payment.status == Payment.Status.PAID
@@ -0,0 +1,80 @@
+"""Change counters kept in the cache.
+
+Anything that keeps derived data around — an in-process index, a cached
+response — remembers the counter it was built against and compares it with
+the current one before trusting itself. Writers only have to bump the counter.
+
+The counters live in the default cache, so they are only as shared as that
+cache is: with a per-process backend, a worker sees its own bumps and nobody
+else's.
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def occupancy_key(hotel_id: int) -> str:
+    """Counter bumped whenever a room of the hotel is taken, released or edited."""
+    return f"version:occupancy:{hotel_id}"
+
+
+def table_key(model) -> str:
+    """Counter bumped whenever a row of the model's table is written."""
+    return f"version:table:{model._meta.label_lower}"
+
+
+def get(key: str) -> int:
+    """The current value of a counter, starting one if it does not exist yet."""
+    value = cache.get(key)
+    if value is None:
+        # Seeded from the clock rather than from 1: a counter that was evicted
+        # and restarted must not come back to a value a reader already holds.
+        cache.add(key, time.time_ns(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Nobody has read the counter yet, so any fresh value will do.
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_on_commit(key: str) -> None:
+    """Bump once the surrounding transaction commits, or now outside of one.
+
+    Bumping earlier would let a reader rebuild from data that does not yet
+    include the change, and then keep that stale copy as current.
+    """
+    transaction.on_commit(lambda: bump(key))
+
+
+def stamps(keys: list[str]) -> list[int]:
+    """The current values of several counters, in one cache round trip.
+
+    Table counters are only ever set to the clock (see :func:`touch`), so
+    their values double as the time, in nanoseconds, of the last write.
+    """
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def touch(key: str) -> None:
+    """Move a counter on to the current time, rather than by one."""
+    # Never backwards, even if this host's clock is behind the last writer's.
+    cache.set(key, max(time.time_ns(), (cache.get(key) or 0) + 1), timeout=None)
+
+
+def touch_on_commit(key: str) -> None:
+    """:func:`touch` once the surrounding transaction commits, as :func:`bump_on_commit`."""
+    transaction.on_commit(lambda: touch(key))
@@ -3,8 +3,9 @@ from __future__ import annotations
 import json
 import logging
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import OperationalError, connection
-from django.db.models import Avg, Count
 from django.shortcuts import render
 from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import mixins, status, viewsets
@@ -12,14 +13,27 @@ from rest_framework.decorators import action, api_view, permission_classes, thro
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from . import services
+from . import services, versions
+from .fieldsets import EXPAND_PARAM, FIELDS_PARAM, expands, wants
+from .mixins import CachedResponseMixin, ProjectedListMixin
 from .models import Amenity, Booking, Hotel, Payment, Review, Room, RoomType
+from .pagination import NewestFirstPagination
 from .payments import PaymentError, get_payment_provider
 from .permissions import IsAdminOrReadOnly, IsOwnerOrReadOnly, IsStaff
+from .projections import HotelProjection, ReviewProjection, RoomProjection
 from .serializers import (
     AmenitySerializer,
+    AvailabilityBatchResultSerializer,
+    AvailabilityBatchSerializer,
+    AvailabilityCalendarSerializer,
     AvailabilityQuerySerializer,
+    AvailabilitySearchQuerySerializer,
+    AvailableRoomTypeSerializer,
     BookingSerializer,
+    CalendarQuerySerializer,
+    FlexibleQuerySerializer,
+    FlexibleStaySerializer,
+    HotelAvailabilitySerializer,
     HotelSerializer,
     PaymentSerializer,
     ReviewSerializer,
@@ -30,47 +44,85 @@ from .serializers import (
 logger = logging.getLogger(__name__)
 
 
-class HotelViewSet(viewsets.ModelViewSet):
+def fieldsets(*expandable: str):
+    """Document ``?fields=`` (and ``?expand=``) on a viewset's list and detail reads."""
+    parameters = [
+        OpenApiParameter(
+            FIELDS_PARAM, str, description="Comma-separated fields to return; all by default."
+        )
+    ]
+    if expandable:
+        parameters.append(
+            OpenApiParameter(
+                EXPAND_PARAM,
+                str,
+                description=(
+                    "Comma-separated related objects to embed in place of their id: "
+                    + ", ".join(f"`{name}`" for name in expandable)
+                    + "."
+                ),
+            )
+        )
+    return extend_schema_view(
+        list=extend_schema(parameters=parameters), retrieve=extend_schema(parameters=parameters)
+    )
+
+
+@fieldsets()
+class HotelViewSet(CachedResponseMixin, ProjectedListMixin, viewsets.ModelViewSet):
     """Public hotel catalogue. Staff may create, update and delete."""
 
+    # Reviews and rooms feed the summaries stored on each hotel.
+    conditional_models = (Hotel, Review, Room)
     serializer_class = HotelSerializer
+    projection_class = HotelProjection
     permission_classes = [IsAdminOrReadOnly]
     filterset_fields = ["location"]
     search_fields = ["name", "location", "description"]
-    ordering_fields = ["name", "average_rating"]
+    ordering_fields = ["name", "average_rating", "review_count", "min_price_per_night"]
     ordering = ["name"]
-
-    def get_queryset(self):
-        # Django drops Meta.ordering from aggregate queries, so it is restored
-        # here to keep pagination stable.
-        return Hotel.objects.annotate(
-            average_rating=Avg("reviews__rating"),
-            review_count=Count("reviews", distinct=True),
-        ).order_by("name")
+    # The rating and price figures are stored on the hotel (see hotel.stats),
+    # so a page of hotels reads no reviews or rooms.
+    queryset = Hotel.objects.all()
 
 
-class RoomViewSet(viewsets.ModelViewSet):
+@fieldsets("hotel", "room_type")
+class RoomViewSet(CachedResponseMixin, ProjectedListMixin, viewsets.ModelViewSet):
     """Public room catalogue. Staff may create, update and delete."""
 
+    # Review too: ?expand=hotel embeds the hotel's review figures.
+    conditional_models = (Room, Hotel, RoomType, Amenity, Review)
     serializer_class = RoomSerializer
+    projection_class = RoomProjection
     permission_classes = [IsAdminOrReadOnly]
     filterset_fields = ["hotel", "room_type", "is_available", "max_guests"]
     ordering_fields = ["price_per_night", "room_number"]
 
     def get_queryset(self):
         # select_related/prefetch_related keep the list endpoint at a constant
-        # number of queries instead of one per row.
-        return Room.objects.select_related("hotel", "room_type").prefetch_related("amenities")
-
-
-class RoomTypeViewSet(viewsets.ModelViewSet):
+        # number of queries instead of one per row, for the fields requested.
+        queryset = Room.objects.all()
+        if wants(self.request, "hotel_name") or expands(self.request, "hotel"):
+            queryset = queryset.select_related("hotel")
+        if wants(self.request, "room_type_name") or expands(self.request, "room_type"):
+            queryset = queryset.select_related("room_type")
+        if wants(self.request, "amenities", "amenities_detail"):
+            queryset = queryset.prefetch_related("amenities")
+        return queryset
+
+
+@fieldsets()
+class RoomTypeViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    conditional_models = (RoomType,)
     queryset = RoomType.objects.all()
     serializer_class = RoomTypeSerializer
     permission_classes = [IsAdminOrReadOnly]
     search_fields = ["name"]
 
 
-class AmenityViewSet(viewsets.ModelViewSet):
+@fieldsets()
+class AmenityViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    conditional_models = (Amenity,)
     queryset = Amenity.objects.all()
     serializer_class = AmenitySerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -86,6 +138,7 @@ class AmenityViewSet(viewsets.ModelViewSet):
         )
     ),
 )
+@fieldsets("hotel")
 class BookingViewSet(
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
@@ -96,6 +149,7 @@ class BookingViewSet(
 
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
+    pagination_class = NewestFirstPagination
     filterset_fields = ["status", "hotel"]
     ordering_fields = ["created_at", "check_in"]
 
@@ -103,9 +157,13 @@ class BookingViewSet(
         # drf-spectacular introspects the view without a real request.
         if getattr(self, "swagger_fake_view", False):
             return Booking.objects.none()
-        queryset = Booking.objects.select_related("hotel", "payment", "user").prefetch_related(
-            "rooms__hotel", "rooms__room_type"
-        )
+        queryset = Booking.objects.select_related("user")
+        if wants(self.request, "hotel_name") or expands(self.request, "hotel"):
+            queryset = queryset.select_related("hotel")
+        if wants(self.request, "payment"):
+            queryset = queryset.select_related("payment")
+        if wants(self.request, "rooms"):
+            queryset = queryset.prefetch_related("rooms__hotel", "rooms__room_type")
         user = self.request.user
         if user.is_staff:
             return queryset
@@ -130,31 +188,40 @@ class BookingViewSet(
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        booking.status = Booking.Status.CANCELLED
-        booking.save(update_fields=["status"])
+        services.cancel_booking(booking)
         logger.info("Booking %s cancelled by user %s", booking.pk, request.user.pk)
         return Response(self.get_serializer(booking).data)
 
 
+@fieldsets()
 class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
     """Payment records. Staff only: these are financial records."""
 
     queryset = Payment.objects.select_related("booking").all()
     serializer_class = PaymentSerializer
     permission_classes = [IsStaff]
+    pagination_class = NewestFirstPagination
     filterset_fields = ["status", "provider"]
     ordering_fields = ["created_at", "amount"]
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+@fieldsets("hotel")
+class ReviewViewSet(ProjectedListMixin, viewsets.ModelViewSet):
     """Anyone may read reviews; authors may edit only their own."""
 
     serializer_class = ReviewSerializer
+    projection_class = ReviewProjection
+    pagination_class = NewestFirstPagination
     filterset_fields = ["hotel", "rating"]
     ordering_fields = ["created_at", "rating"]
 
     def get_queryset(self):
-        return Review.objects.select_related("user", "hotel")
+        queryset = Review.objects.all()
+        if wants(self.request, "username"):
+            queryset = queryset.select_related("user")
+        if expands(self.request, "hotel"):
+            queryset = queryset.select_related("hotel")
+        return queryset
 
     def get_permissions(self):
         # Reading is public, writing requires a login, and editing requires
@@ -175,8 +242,11 @@ class ReviewViewSet(viewsets.ModelViewSet):
         OpenApiParameter("adults", int, description="Defaults to 1."),
         OpenApiParameter("children", int, description="Defaults to 0."),
     ],
-    responses={200: RoomTypeSerializer(many=True)},
-    description="Room types with at least one free room for the requested stay.",
+    responses={200: AvailableRoomTypeSerializer(many=True)},
+    description=(
+        "Room types with at least one free room for the requested stay, with the "
+        "number of free rooms, their nightly price range and the price of the stay."
+    ),
 )
 @api_view(["GET"])
 @permission_classes([AllowAny])
@@ -184,14 +254,165 @@ def available_room_types(request):
     query = AvailabilityQuerySerializer(data=request.query_params)
     query.is_valid(raise_exception=True)
     data = query.validated_data
+    hotel = data["hotel"]
+    guests = data["adults"] + data["children"]
+
+    # Crawlers and aggregators repeat the same questions all day. The key
+    # embeds the hotel's occupancy counter, which every booking, cancellation
+    # and room edit bumps, so an answer is reused only while it still holds.
+    # Empty answers are cached too: "nothing free" is asked just as often.
+    cache_key = ":".join(
+        str(part)
+        for part in (
+            "availability:room-types",
+            hotel.pk,
+            versions.get(versions.occupancy_key(hotel.pk)),
+            data["check_in"],
+            data["check_out"],
+            guests,
+        )
+    )
+    payload = cache.get(cache_key)
+    if payload is None:
+        room_types = services.available_room_types(
+            hotel=hotel,
+            check_in=data["check_in"],
+            check_out=data["check_out"],
+            guests=guests,
+        )
+        payload = list(AvailableRoomTypeSerializer(room_types, many=True).data)
+        cache.set(cache_key, payload, settings.AVAILABILITY_CACHE_TTL)
+    return Response(payload)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter("location", str, required=True, description="Hotel location, e.g. Lviv."),
+        OpenApiParameter("check_in", str, required=True, description="YYYY-MM-DD."),
+        OpenApiParameter("check_out", str, required=True, description="YYYY-MM-DD."),
+        OpenApiParameter("adults", int, description="Defaults to 1."),
+        OpenApiParameter("children", int, description="Defaults to 0."),
+    ],
+    responses={200: HotelAvailabilitySerializer(many=True)},
+    description=(
+        "Every hotel in a location with a free room for the requested stay, with "
+        "the free room types and the cheapest nightly price."
+    ),
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def search_availability(request):
+    query = AvailabilitySearchQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    data = query.validated_data
+
+    hotels = services.search_availability(
+        location=data["location"],
+        check_in=data["check_in"],
+        check_out=data["check_out"],
+        guests=data["adults"] + data["children"],
+    )
+    return Response(HotelAvailabilitySerializer(hotels, many=True).data)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter("hotel", int, required=True, description="Hotel id."),
+        OpenApiParameter("start", str, description="YYYY-MM-DD. Defaults to today."),
+        OpenApiParameter("days", int, description="Length of the window. Defaults to 90."),
+        OpenApiParameter("adults", int, description="Defaults to 1."),
+        OpenApiParameter("children", int, description="Defaults to 0."),
+    ],
+    responses={200: AvailabilityCalendarSerializer},
+    description=(
+        "Free rooms of every room type in a hotel for each day of a window, for "
+        "date pickers. Day *n* of `free` is the night starting `start` + *n* days."
+    ),
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def availability_calendar(request):
+    query = CalendarQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    data = query.validated_data
 
-    room_types = services.available_room_types(
+    room_types = services.availability_calendar(
         hotel=data["hotel"],
+        start=data["start"],
+        days=data["days"],
+        guests=data["adults"] + data["children"],
+    )
+    calendar = {
+        "hotel": data["hotel"].pk,
+        "start": data["start"],
+        "days": data["days"],
+        "room_types": room_types,
+    }
+    return Response(AvailabilityCalendarSerializer(calendar).data)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter("hotel", int, required=True, description="Hotel id."),
+        OpenApiParameter("check_in", str, required=True, description="YYYY-MM-DD."),
+        OpenApiParameter(
+            "check_out", str, required=True, description="YYYY-MM-DD; sets the stay length."
+        ),
+        OpenApiParameter("flex_days", int, description="Days either way, up to 7. Defaults to 3."),
+        OpenApiParameter("room_type", int, description="Restrict to one room type."),
+        OpenApiParameter("adults", int, description="Defaults to 1."),
+        OpenApiParameter("children", int, description="Defaults to 0."),
+    ],
+    responses={200: FlexibleStaySerializer(many=True)},
+    description=(
+        "Flexible dates: every stay of the requested length starting within "
+        "`flex_days` of `check_in` that has a free room, nearest first."
+    ),
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def flexible_availability(request):
+    query = FlexibleQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    data = query.validated_data
+
+    stays = services.flexible_availability(
+        hotel=data["hotel"],
+        room_type=data["room_type"],
         check_in=data["check_in"],
         check_out=data["check_out"],
+        flex_days=data["flex_days"],
         guests=data["adults"] + data["children"],
     )
-    return Response(RoomTypeSerializer(room_types, many=True).data)
+    return Response(FlexibleStaySerializer(stays, many=True).data)
+
+
+@extend_schema(
+    request=AvailabilityBatchSerializer,
+    responses={200: AvailabilityBatchResultSerializer},
+    description=(
+        "Availability for many stays in one request, for channel managers. "
+        "`results[n]` answers `queries[n]` in the shape of `/availability/room-types/`."
+    ),
+)
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def batch_availability(request):
+    batch = AvailabilityBatchSerializer(data=request.data)
+    batch.is_valid(raise_exception=True)
+
+    answers = services.batch_available_room_types(
+        [
+            {
+                "hotel_id": query["hotel"],
+                "check_in": query["check_in"],
+                "check_out": query["check_out"],
+                "guests": query["adults"] + query["children"],
+            }
+            for query in batch.validated_data["queries"]
+        ]
+    )
+    return Response(AvailabilityBatchResultSerializer({"results": answers}).data)
 
 
 @extend_schema(
@@ -231,6 +452,11 @@ def payment_webhook(request):
             {"detail": "Payload identifies no invoice."}, status=status.HTTP_400_BAD_REQUEST
         )
 
+    if settings.PAYMENT_WEBHOOK_MODE == "inbox":
+        # Applied later by `manage.py process_webhook_inbox`; a replay is a no-op.
+        services.store_payment_event(provider.name, event, payload)
+        return Response({"detail": "Payment event accepted."})
+
     try:
         services.apply_payment_event(event)
     except Payment.DoesNotExist: